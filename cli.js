@@ -1,29 +1,11 @@
 #!/usr/bin/env node
 
-const { spawn } = require("child_process");
 const fs = require("fs");
-const path = require("path");
+const { request, isRunning, ensureDaemon, subscribeLogs, pidFile, logsDir } = require("./daemon_client");
 
-const [,, command, arg] = process.argv;
+const [,, command, arg, ...extraArgs] = process.argv;
 
-const scriptMap = {
-  lp: "scripts/auto_LP.py",
-  swap: "scripts/auto_swap.py",
-  swap_lp: "scripts/auto_swap_lp.py",
-};
-
-const pidFile = ".pid";
-const logsDir = "logs";
-
-// Utility: cek apakah proses masih hidup
-function isRunning(pid) {
-  try {
-    process.kill(pid, 0);
-    return true;
-  } catch (e) {
-    return false;
-  }
-}
+const strategies = ["swap", "lp", "swap_lp", "swap_lp_remove"];
 
 function showHelp() {
   console.log(`
@@ -33,73 +15,84 @@ function showHelp() {
   auto swap       - Menjalankan auto swap
   auto lp         - Menjalankan auto LP
   auto swap_lp    - Menjalankan gabungan swap dan LP
-  stop            - Menghentikan proses yang sedang berjalan
-  status          - Cek status proses yang sedang berjalan
+  auto swap_lp_remove
+                  - Swap + LP, sesekali remove LP
+  auto <strategi> [paralel]
+                  - Jumlah round paralel per wallet (semua wallet di PRIVATE_KEYS / keys.txt ikut jalan)
+  stop [strategi] - Menghentikan strategi (tanpa argumen: semua)
+  status          - Cek daemon dan strategi yang sedang berjalan
+  list            - Daftar strategi
+  logs            - Ikuti log daemon secara realtime
+  shutdown        - Matikan daemon
 `);
 }
 
-function ensureLogsDir() {
-  if (!fs.existsSync(logsDir)) {
-    fs.mkdirSync(logsDir);
+function print(response) {
+  if (!response.ok) {
+    console.log(`❌ ${response.error}`);
+    process.exitCode = 1;
+  } else if (response.message) {
+    console.log(response.message);
   }
 }
 
-// Jalankan proses auto trading
-if (command === "auto" && scriptMap[arg]) {
-  if (fs.existsSync(pidFile)) {
-    const existingPid = parseInt(fs.readFileSync(pidFile).toString(), 10);
-    if (isRunning(existingPid)) {
-      console.log("⚠️ Masih ada proses berjalan. Jalankan 'stop' dulu.");
-      process.exit(1);
-    } else {
-      fs.unlinkSync(pidFile); // bersihkan pid file lama
-    }
-  }
+async function main() {
+  // `auto pool <strategi>` dipertahankan: daemon selalu menjalankan semua wallet
+  const strategy = command === "auto" && arg === "pool" ? extraArgs.shift() : arg;
 
-  ensureLogsDir();
+  if (command === "auto" && strategies.includes(strategy)) {
+    const pid = await ensureDaemon();
+    if (pid) console.log(`🧠 Daemon dijalankan (PID: ${pid}), log: ${logsDir}/daemon.out.log`);
+    const concurrency = extraArgs[0] ? parseInt(extraArgs[0], 10) : undefined;
+    print(await request({ cmd: "start", strategy, concurrency }));
 
-  const script = scriptMap[arg];
-  const outLog = fs.openSync(path.join(logsDir, `${arg}.out.log`), 'a');
-  const errLog = fs.openSync(path.join(logsDir, `${arg}.err.log`), 'a');
-
-  const child = spawn("python3", ["-u", script], {
-    detached: true,
-    stdio: ['ignore', outLog, errLog],
-  });
+  } else if (command === "stop") {
+    if (!(await isRunning())) {
+      console.log("ℹ️ Tidak ada proses yang sedang berjalan.");
+      return;
+    }
+    const response = await request({ cmd: "stop", strategy: arg });
+    if (response.ok) console.log(`🛑 Dihentikan: ${response.stopped.join(", ")}`);
+    else print(response);
+
+  } else if (command === "status") {
+    if (!(await isRunning())) {
+      console.log("ℹ️ Daemon tidak berjalan.");
+      if (fs.existsSync(pidFile)) fs.unlinkSync(pidFile);
+      return;
+    }
+    const status = await request({ cmd: "status" });
+    console.log(`✅ Daemon berjalan (PID: ${status.pid}), ${status.wallets.length} wallet`);
+    const running = Object.entries(status.running);
+    if (running.length === 0) console.log("ℹ️ Belum ada strategi yang berjalan.");
+    for (const [name, run] of running) {
+      console.log(`  • ${name} x${run.concurrency} — ${run.alive ? "jalan" : "berhenti"} (${run.uptime}s)`);
+    }
+    if (status.metrics) console.log(`  ${status.metrics}`);
+    for (const rpc of status.rpc || []) {
+      console.log(`  🌐 ${rpc.url} — ${rpc.latency_ms ?? "-"} ms, error ${(rpc.error_rate * 100).toFixed(1)}%${rpc.healthy ? "" : " (cooldown)"}`);
+    }
 
-  fs.writeFileSync(pidFile, child.pid.toString());
-  console.log(`🚀 Menjalankan ${arg} (PID: ${child.pid})`);
-  console.log(`📄 Log output: ${logsDir}/${arg}.out.log`);
+  } else if (command === "list") {
+    console.log(strategies.join("\n"));
 
-  child.unref();
+  } else if (command === "logs") {
+    subscribeLogs((line) => console.log(line), () => process.exit(0));
 
-} else if (command === "stop") {
-  if (fs.existsSync(pidFile)) {
-    const pid = parseInt(fs.readFileSync(pidFile).toString(), 10);
-    try {
-      process.kill(pid);
-      console.log(`🛑 Proses (PID: ${pid}) berhasil dihentikan`);
-      fs.unlinkSync(pidFile);
-    } catch (err) {
-      console.error("❌ Gagal menghentikan proses:", err.message);
+  } else if (command === "shutdown") {
+    if (!(await isRunning())) {
+      console.log("ℹ️ Daemon tidak berjalan.");
+      return;
     }
-  } else {
-    console.log("ℹ️ Tidak ada proses yang sedang berjalan.");
-  }
+    print(await request({ cmd: "shutdown" }));
+    if (fs.existsSync(pidFile)) fs.unlinkSync(pidFile);
 
-} else if (command === "status") {
-  if (fs.existsSync(pidFile)) {
-    const pid = parseInt(fs.readFileSync(pidFile).toString(), 10);
-    if (isRunning(pid)) {
-      console.log(`✅ Proses sedang berjalan (PID: ${pid})`);
-    } else {
-      console.log("⚠️ PID tersimpan tapi proses sudah mati. Menghapus .pid.");
-      fs.unlinkSync(pidFile);
-    }
   } else {
-    console.log("ℹ️ Tidak ada proses yang sedang berjalan.");
+    showHelp();
   }
-
-} else {
-  showHelp();
 }
+
+main().catch((err) => {
+  console.error("❌", err.message);
+  process.exit(1);
+});
@@ -0,0 +1,115 @@
+// Client untuk scripts/daemon.py: satu baris JSON per request lewat TCP localhost,
+// selalu dengan token kontrol daemon.
+// Dipakai oleh cli.js, pages/api/run.ts dan pages/api/socket_io.ts.
+require("dotenv").config();
+
+const net = require("net");
+const fs = require("fs");
+const path = require("path");
+const { spawn } = require("child_process");
+
+const DAEMON_HOST = process.env.DAEMON_HOST || "127.0.0.1";
+const DAEMON_PORT = parseInt(process.env.DAEMON_PORT || "8765", 10);
+const DAEMON_TOKEN_FILE = process.env.DAEMON_TOKEN_FILE || ".daemon_token";
+const pidFile = ".pid";
+const logsDir = "logs";
+
+// Token kontrol: DAEMON_TOKEN dari .env, atau file yang ditulis daemon saat start
+function daemonToken() {
+  if (process.env.DAEMON_TOKEN) return process.env.DAEMON_TOKEN;
+  try {
+    return fs.readFileSync(DAEMON_TOKEN_FILE, "utf8").trim();
+  } catch (e) {
+    return "";
+  }
+}
+
+function request(payload, timeoutMs = 5000) {
+  return new Promise((resolve, reject) => {
+    const socket = net.createConnection({ host: DAEMON_HOST, port: DAEMON_PORT });
+    let buffer = "";
+    // utf8 decoder: emoji yang terpotong di batas chunk tidak jadi rusak
+    socket.setEncoding("utf8");
+
+    socket.setTimeout(timeoutMs, () => {
+      socket.destroy();
+      reject(new Error("Daemon tidak merespon"));
+    });
+    socket.on("connect", () => socket.write(JSON.stringify({ ...payload, token: daemonToken() }) + "\n"));
+    socket.on("data", (data) => {
+      buffer += data;
+      const newline = buffer.indexOf("\n");
+      if (newline !== -1) {
+        socket.end();
+        resolve(JSON.parse(buffer.slice(0, newline)));
+      }
+    });
+    socket.on("error", reject);
+  });
+}
+
+async function isRunning() {
+  try {
+    await request({ cmd: "status" }, 1000);
+    return true;
+  } catch (e) {
+    return false;
+  }
+}
+
+// Jalankan daemon di background kalau belum ada; engine & cache dibuat sekali di sini
+async function ensureDaemon(cwd = process.cwd()) {
+  if (await isRunning()) return null;
+
+  const dir = path.join(cwd, logsDir);
+  if (!fs.existsSync(dir)) fs.mkdirSync(dir);
+  const outLog = fs.openSync(path.join(dir, "daemon.out.log"), "a");
+  const errLog = fs.openSync(path.join(dir, "daemon.err.log"), "a");
+
+  const child = spawn("python3", ["-u", "-m", "scripts.daemon"], {
+    cwd,
+    detached: true,
+    stdio: ["ignore", outLog, errLog],
+    env: { ...process.env, PYTHONPATH: cwd },
+  });
+  fs.writeFileSync(path.join(cwd, pidFile), child.pid.toString());
+  child.unref();
+
+  for (let i = 0; i < 60; i++) {
+    await new Promise((r) => setTimeout(r, 250));
+    if (await isRunning()) return child.pid;
+  }
+  throw new Error(`Daemon gagal start, cek ${logsDir}/daemon.err.log`);
+}
+
+// Stream log + event daemon (satu JSON per baris); kembalikan socket supaya pemanggil bisa menutupnya.
+// onLine(baris log, seq), onEvent({type, ts, wallet, strategy, ...}, seq) — lihat scripts/events.py
+// since: seq terakhir yang sudah diterima; history daemon sampai seq itu tidak dikirim ulang
+function subscribeLogs(onLine, onClose = () => {}, onEvent = null, since = 0) {
+  const socket = net.createConnection({ host: DAEMON_HOST, port: DAEMON_PORT });
+  let buffer = "";
+  socket.setEncoding("utf8");
+
+  socket.on("connect", () => socket.write(JSON.stringify({ cmd: "logs", since, token: daemonToken() }) + "\n"));
+  socket.on("data", (data) => {
+    buffer += data;
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (!line) continue;
+      const message = JSON.parse(line);
+      if (message.error) {
+        onLine(`⚠️ ${message.error}`);
+      } else if (message.event) {
+        if (onEvent) onEvent(message.event, message.seq);
+      } else {
+        onLine(message.log, message.seq);
+      }
+    }
+  });
+  socket.on("error", () => socket.destroy());
+  socket.on("close", onClose);
+  return socket;
+}
+
+module.exports = { request, isRunning, ensureDaemon, subscribeLogs, pidFile, logsDir };
@@ -1,7 +1,5 @@
 import { Server } from "socket.io";
-import { spawn } from "child_process";
-
-const pidMap: Record<string, any> = {};
+import { ensureDaemon, isRunning, request, subscribeLogs } from "../../daemon_client";
 
 export const config = {
   api: {
@@ -9,6 +7,13 @@ export const config = {
   },
 };
 
+// Pesan terakhir (log + event) yang dikirim ulang ke browser yang baru connect
+const RING_SIZE = 500;
+// Paket yang masih antre di koneksi satu browser; lewat dari ini log dilewati untuk browser itu
+const MAX_PENDING_PACKETS = 200;
+
+type Message = { channel: "output" | "event"; payload: any };
+
 export default function handler(req: any, res: any) {
   if (!res.socket.server.io) {
     const io = new Server(res.socket.server, {
@@ -18,57 +23,80 @@ export default function handler(req: any, res: any) {
 
     res.socket.server.io = io;
 
-    io.on("connection", (socket) => {
+    const ring: Message[] = [];
+    const dropped = new Map<string, number>();
+
+    // Browser lambat: paket tidak ditumpuk tanpa batas, cukup dihitung lalu dilaporkan
+    const send = (socket: any, message: Message) => {
+      const pending = socket.conn?.writeBuffer?.length ?? 0;
+      if (pending > MAX_PENDING_PACKETS) {
+        dropped.set(socket.id, (dropped.get(socket.id) ?? 0) + 1);
+        return;
+      }
+      const skipped = dropped.get(socket.id);
+      if (skipped) {
+        dropped.delete(socket.id);
+        socket.emit("output", `⚠️ ${skipped} pesan dilewati (koneksi lambat)`);
+      }
+      socket.emit(message.channel, message.payload);
+    };
+
+    const broadcast = (message: Message) => {
+      ring.push(message);
+      if (ring.length > RING_SIZE) ring.shift();
+      for (const socket of io.sockets.sockets.values()) send(socket, message);
+    };
+
+    // Satu stream dari daemon (sudah dipotong per baris), diteruskan ke semua browser.
+    // Reconnect minta history sesudah lastSeq saja, supaya ring tidak berisi pesan ganda.
+    let logStream = null;
+    let lastSeq = 0;
+    const followLogs = () => {
+      if (logStream) return;
+      logStream = subscribeLogs(
+        (line: string, seq: number) => {
+          lastSeq = seq ?? lastSeq;
+          broadcast({ channel: "output", payload: line });
+        },
+        () => {
+          logStream = null;
+        },
+        (event: any, seq: number) => {
+          lastSeq = seq ?? lastSeq;
+          broadcast({ channel: "event", payload: event });
+        },
+        lastSeq
+      );
+    };
+
+    io.on("connection", async (socket) => {
       console.log("✅ Socket connected", socket.id);
-
-      socket.on("start-script", (type: string) => {
-        const scriptMap = {
-          swap: "scripts/auto_swap.py",
-          lp: "scripts/auto_LP.py",
-          swap_lp: "scripts/auto_swap_lp.py",
-        };
-
-        const scriptPath = scriptMap[type];
-        if (!scriptPath) {
-          socket.emit("output", `❌ Unknown script: ${type}`);
-          return;
-        }
-
-        if (pidMap[type]) {
-          socket.emit("output", `⚠️ Script '${type}' already running`);
-          return;
+      for (const message of ring) send(socket, message);
+
+      socket.on("disconnect", () => dropped.delete(socket.id));
+
+      socket.on("start-script", async (type: string) => {
+        try {
+          await ensureDaemon();
+          followLogs();
+          const response = await request({ cmd: "start", strategy: type });
+          socket.emit("output", response.ok ? response.message : `⚠️ ${response.error}`);
+        } catch (err) {
+          socket.emit("output", `❌ ${err.message}`);
         }
-
-        const child = spawn("python3", ["-u", scriptPath], {
-  env: { ...process.env, PYTHONPATH: process.cwd() }
-});
-
-
-        pidMap[type] = child;
-
-        child.stdout.on("data", (data) => {
-          socket.emit("output", data.toString());
-        });
-
-        child.stderr.on("data", (data) => {
-          socket.emit("output", "⚠️ Error: " + data.toString());
-        });
-
-        child.on("close", (code) => {
-          socket.emit("output", `👋 Script '${type}' finished with code ${code}`);
-          delete pidMap[type];
-        });
       });
 
-      socket.on("stop-script", (type: string) => {
-        if (pidMap[type]) {
-          pidMap[type].kill();
-          delete pidMap[type];
-          socket.emit("output", `🛑 Script '${type}' stopped`);
-        } else {
+      socket.on("stop-script", async (type: string) => {
+        try {
+          const response = await request({ cmd: "stop", strategy: type });
+          socket.emit("output", response.ok ? `🛑 Script '${type}' stopped` : `ℹ️ No running script for '${type}'`);
+        } catch (err) {
           socket.emit("output", `ℹ️ No running script for '${type}'`);
         }
       });
+
+      // Daemon sudah jalan (mis. dari CLI) → ikuti stream-nya tanpa menunggu start dari UI
+      if (await isRunning()) followLogs();
     });
   }
 
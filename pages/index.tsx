@@ -5,8 +5,15 @@ const socket = io(undefined!, {
   path: "/api/socket_io", // Path harus sesuai dengan backend WebSocket handler
 });
 
+// Browser hanya menyimpan sekian baris / tx terakhir supaya memori tidak terus naik
+const MAX_LOG_LINES = 1000;
+const MAX_TX_ROWS = 50;
+
+type TxRow = { hash: string; action: string; wallet?: string; strategy?: string; status?: number; seconds?: number };
+
 export default function Home() {
   const [logs, setLogs] = useState<string[]>([]);
+  const [txs, setTxs] = useState<TxRow[]>([]);
   const [loading, setLoading] = useState<string | null>(null);
   const logRef = useRef<HTMLDivElement>(null);
 
@@ -24,11 +31,24 @@ export default function Home() {
 
   useEffect(() => {
     socket.on("output", (data: string) => {
-      setLogs((prev) => [...prev, data]);
+      setLogs((prev) => [...prev, data].slice(-MAX_LOG_LINES));
+    });
+
+    // Event terstruktur dari daemon (scripts/events.py): tx dikirim → dikonfirmasi
+    socket.on("event", (event: any) => {
+      if (event.type === "tx_sent") {
+        const row = { hash: event.hash, action: event.action, wallet: event.wallet, strategy: event.strategy };
+        setTxs((prev) => [row, ...prev.filter((tx) => tx.hash !== event.hash)].slice(0, MAX_TX_ROWS));
+      } else if (event.type === "tx_confirmed") {
+        setTxs((prev) =>
+          prev.map((tx) => (tx.hash === event.hash ? { ...tx, status: event.status, seconds: event.seconds } : tx))
+        );
+      }
     });
 
     return () => {
       socket.off("output");
+      socket.off("event");
     };
   }, []);
 
@@ -87,6 +107,21 @@ export default function Home() {
           <div key={index}>{line}</div>
         ))}
       </div>
+      <h3>Tx terakhir</h3>
+      <table style={{ fontFamily: "monospace", fontSize: 12 }}>
+        <tbody>
+          {txs.map((tx) => (
+            <tr key={tx.hash}>
+              <td>{tx.status === undefined ? "⏳" : tx.status === 1 ? "✅" : "❌"}</td>
+              <td>{tx.strategy}</td>
+              <td>{tx.action}</td>
+              <td>{tx.wallet?.slice(0, 8)}</td>
+              <td>{tx.hash.slice(0, 12)}…</td>
+              <td>{tx.seconds !== undefined ? `${tx.seconds}s` : ""}</td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
     </main>
   );
 }
@@ -0,0 +1,109 @@
+import os
+from scripts.multicall import Multicall
+
+MAX_UINT256 = 2 ** 256 - 1
+
+# Jumlah approve per token (wei). Default unlimited; isi APPROVE_CAP untuk membatasi.
+APPROVE_CAP = int(os.getenv("APPROVE_CAP", str(MAX_UINT256)))
+# APPROVE_ON_START=1 → approve semua TOKEN_OUTS + WETH sekali di awal
+APPROVE_ON_START = os.getenv("APPROVE_ON_START", "0") == "1"
+
+ALLOWANCE_ABI = [
+    {"name": "allowance", "outputs": [{"type": "uint256"}], "inputs": [{"type": "address"}, {"type": "address"}], "stateMutability": "view", "type": "function"},
+]
+
+
+class AllowanceManager:
+    """
+    Ledger allowance router per token.
+
+    Allowance dibaca dari chain sekali (batch), lalu dikurangi lokal setiap
+    swap / add LP terkonfirmasi. Read atau approve baru hanya terjadi kalau
+    ledger bilang allowance tidak cukup. Approve selalu sebesar `cap` supaya
+    round berikutnya tidak perlu approve lagi.
+    """
+
+    def __init__(self, web3, owner, spender, cap=APPROVE_CAP):
+        self.web3 = web3
+        self.owner = owner
+        self.spender = spender
+        self.cap = cap
+        self.allowances = {}
+        self.pending = []  # (token, amount) dari tx yang belum terkonfirmasi
+
+    def known(self, token):
+        return token in self.allowances
+
+    def set(self, token, amount):
+        self.allowances[token] = amount
+
+    def read(self, token):
+        contract = self.web3.eth.contract(address=token, abi=ALLOWANCE_ABI)
+        self.allowances[token] = contract.functions.allowance(self.owner, self.spender).call()
+        return self.allowances[token]
+
+    def warm(self, tokens):
+        """Baca allowance semua token yang belum ada di ledger dalam satu batch."""
+        tokens = [token for token in tokens if not self.known(token)]
+        if not tokens or self.web3 is None:
+            return
+        batch = Multicall(self.web3).batch()
+        for token in tokens:
+            contract = self.web3.eth.contract(address=token, abi=ALLOWANCE_ABI)
+            batch.add(contract.functions.allowance(self.owner, self.spender))
+        for token, allowance in zip(tokens, batch.execute()):
+            if allowance is not None:
+                self.allowances[token] = allowance
+
+    def needs_approval(self, token, amount):
+        if not self.known(token):
+            self.read(token)
+        return self.allowances[token] < amount
+
+    def approve_amount(self, amount):
+        return max(amount, self.cap)
+
+    def approved(self, token, amount):
+        """Catat approve yang sudah di-broadcast (nonce-nya lebih dulu dari tx pemakainya)."""
+        self.allowances[token] = amount
+
+    def spend(self, token, amount):
+        if token not in self.allowances:
+            return
+        # Token standar tidak mengurangi allowance unlimited
+        if self.allowances[token] != MAX_UINT256:
+            self.allowances[token] = max(self.allowances[token] - amount, 0)
+
+    def forget(self, token):
+        """Paksa baca ulang dari chain, mis. setelah tx revert."""
+        self.allowances.pop(token, None)
+
+    def track(self, token, amount):
+        """Catat pemakaian allowance oleh tx yang baru di-broadcast."""
+        self.pending.append((token, amount))
+
+    def settle(self, status):
+        """
+        Dipanggil setelah receipt tx terakhir yang ditunggu. Sukses → kurangi
+        ledger; revert → baca ulang token terkait di pemakaian berikutnya.
+        """
+        for token, amount in self.pending:
+            if status == 1:
+                self.spend(token, amount)
+            else:
+                self.forget(token)
+        self.pending = []
+
+    def warm_up(self, tokens, approve_fn):
+        """
+        Approve sekali untuk semua token yang allowance-nya di bawah setengah cap.
+        `approve_fn(token, amount)` mengirim approve dan mengembalikan tx hash.
+        """
+        self.warm(tokens)
+        sent = []
+        for token in tokens:
+            if self.allowances.get(token, 0) < self.cap // 2:
+                tx_hash = approve_fn(token, self.cap)
+                if tx_hash is not None:
+                    sent.append(tx_hash)
+        return sent
@@ -0,0 +1,541 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+from datetime import datetime
+from dotenv import load_dotenv
+from web3 import AsyncWeb3, Web3
+from scripts.token_outs import TOKEN_OUTS
+from scripts.nonce_manager import NonceManager
+from scripts.rpc import AsyncMultiEndpointProvider, rpc_urls
+from scripts.receipt_tracker import AsyncReceiptTracker
+from scripts.realtime import AsyncRealtimeSender
+from scripts.gas_policy import AsyncGasPolicy
+from scripts.presign import AsyncTxSigner
+from scripts.liquidity_index import AsyncLiquidityIndex
+from scripts.lp_positions import LpPositions
+from scripts.quoter import plan_zap
+from scripts.scheduler import AsyncScheduler, TokenBucket, rounds_per_minute
+from scripts.metrics import METRICS, MetricsMiddleware
+from scripts import events
+from scripts.token_registry import TokenRegistry
+from scripts.allowance_manager import AllowanceManager
+
+# ==================== SETUP ====================
+load_dotenv()
+
+def require_env(key: str) -> str:
+    value = os.getenv(key)
+    if value is None:
+        raise EnvironmentError(f"❌ Missing env var: {key}")
+    return value
+
+RPC_URL = require_env("RPC_URL")
+CHAIN_ID = int(require_env("CHAIN_ID"))
+ROUTER_ADDRESS = Web3.to_checksum_address(require_env("ROUTER_ADDRESS"))
+FACTORY_ADDRESS = os.getenv("FACTORY_ADDRESS")
+WETH_ADDRESS = Web3.to_checksum_address("0x776401b9bc8aae31a685731b7147d4445fd9fb19")
+EXPLORER_TX = "https://web3.okx.com/explorer/megaeth-testnet/tx/"
+
+SLIPPAGE = 0.1  # 10%
+# NATIVE_ETH=1 (default): swap / add LP langsung dengan ETH, tanpa wrap + approve WETH
+NATIVE_ETH = os.getenv("NATIVE_ETH", "1") == "1"
+MIN_BALANCE = Web3.to_wei('0.001', 'ether')
+MAX_WETH_FOR_LP = Web3.to_wei(0.00008, 'ether')
+TOTAL_ETH_TO_USE = Web3.to_wei(0.00005, 'ether')
+
+# ==================== ABIs ====================
+with open("scripts/abi/uniswap_v2_router.json") as f:
+    router_abi = json.load(f)
+
+ERC20_ABI = [
+    {"name": "symbol", "outputs": [{"type": "string"}], "inputs": [], "stateMutability": "view", "type": "function"},
+    {"name": "allowance", "outputs": [{"type": "uint256"}], "inputs": [{"type": "address"}, {"type": "address"}], "stateMutability": "view", "type": "function"},
+    {"name": "approve", "outputs": [{"type": "bool"}], "inputs": [{"type": "address"}, {"type": "uint256"}], "stateMutability": "nonpayable", "type": "function"},
+    {"name": "balanceOf", "outputs": [{"type": "uint256"}], "inputs": [{"type": "address"}], "stateMutability": "view", "type": "function"},
+]
+
+WETH_ABI = ERC20_ABI + [
+    {"name": "deposit", "outputs": [], "inputs": [], "stateMutability": "payable", "type": "function"},
+]
+
+factory_abi = [{
+    "name": "getPair",
+    "type": "function",
+    "inputs": [
+        { "name": "tokenA", "type": "address" },
+        { "name": "tokenB", "type": "address" }
+    ],
+    "outputs": [
+        { "name": "pair", "type": "address" }
+    ],
+    "stateMutability": "view"
+}]
+
+# ==================== ENGINE ====================
+class AsyncEngine:
+    """
+    Menjalankan strategi swap / lp / swap_lp / swap_lp_remove sebagai coroutine.
+
+    Satu proses bisa menjalankan beberapa round sekaligus (`concurrency`) tanpa
+    thread; read yang saling independen (balance, quote, symbol)
+    di-await bersamaan dengan asyncio.gather.
+    """
+
+    def __init__(self, private_key, concurrency=4, w3=None, registry=None, receipts=None, sender=None, gas=None, index=None, pacing=None):
+        # w3, registry token, receipt tracker, sender, gas policy, liquidity index dan
+        # bucket laju global (`pacing`) bisa di-share antar wallet (lihat wallet_pool.py)
+        if w3 is None:
+            w3 = AsyncWeb3(AsyncMultiEndpointProvider(rpc_urls(RPC_URL)))
+            w3.middleware_onion.add(MetricsMiddleware, "metrics")
+        self.w3 = w3
+        self.receipts = receipts or AsyncReceiptTracker(self.w3)
+        self.sender = sender or AsyncRealtimeSender(self.w3, self.receipts)
+        self.gas = gas or AsyncGasPolicy(self.w3, self.receipts, CHAIN_ID)
+        # Registry dipakai sebagai cache disk saja; yang belum ada dibaca lewat AsyncWeb3
+        self.registry = registry or TokenRegistry(None, CHAIN_ID, WETH_ADDRESS, FACTORY_ADDRESS)
+        self.private_key = private_key
+        self.account = self.w3.eth.account.from_key(private_key)
+        self.address = self.account.address
+        self.concurrency = concurrency
+        self.nonces = NonceManager(self.w3, self.address, self.receipts)
+        self.signer = AsyncTxSigner(self.w3, self.account, CHAIN_ID, self.nonces, self.gas, self.sender)
+        self.allowances = AllowanceManager(None, self.address, ROUTER_ADDRESS)
+        self.router = self.w3.eth.contract(address=ROUTER_ADDRESS, abi=router_abi)
+        self.weth = self.w3.eth.contract(address=WETH_ADDRESS, abi=WETH_ABI)
+        self.factory = None
+        if FACTORY_ADDRESS:
+            self.factory = self.w3.eth.contract(address=Web3.to_checksum_address(FACTORY_ADDRESS), abi=factory_abi)
+        self.index = index or AsyncLiquidityIndex(self.w3, self.registry, WETH_ADDRESS, self.factory, TOKEN_OUTS)
+        self.pacing = pacing
+        # Bucket ROUNDS_PER_MINUTE wallet ini, di-share semua strategi yang jalan di wallet ini
+        self.bucket = None
+        # Posisi LP wallet ini (swap_lp_remove), ditarik beberapa pair per siklus
+        self.positions = LpPositions(CHAIN_ID, self.address, WETH_ADDRESS, self.registry)
+        # Callback opsional per round selesai: on_round(strategi, detik, error) — dipakai bench.py
+        self.on_round = None
+        self.lp_counter = 0
+        self.target_remove_interval = random.randint(2, 5)
+
+    def log(self, worker_id, message):
+        print(f"[{self.address[:8]}|w{worker_id}] {message}")
+
+    # ---------- tx ----------
+    async def send_tx(self, fn, action, params=None):
+        return await self.signer.send(fn, action, params)
+
+    async def wait(self, tx_hash, timeout=None):
+        nonce = self.nonces.nonce_of(tx_hash)
+        try:
+            with METRICS.step("receipt_wait"):
+                receipt = await self.receipts.wait(tx_hash, timeout=timeout)
+        except Exception:
+            if nonce is not None:
+                self.nonces.drop(nonce)
+            raise
+        if nonce is not None:
+            self.nonces.confirm(nonce)
+        return receipt
+
+    # ---------- reads ----------
+    def erc20(self, token):
+        return self.w3.eth.contract(address=token, abi=ERC20_ABI)
+
+    async def get_token_symbol(self, token):
+        symbol = self.registry.get(token, "symbol")
+        if symbol is not None:
+            return symbol
+        try:
+            symbol = await self.erc20(token).functions.symbol().call()
+        except Exception:
+            return "UNKNOWN"
+        self.registry.update(token, symbol=symbol)
+        self.registry.save()
+        return symbol
+
+    async def get_allowance(self, token):
+        return await self.erc20(token).functions.allowance(self.address, ROUTER_ADDRESS).call()
+
+    async def get_amount_out(self, amount_in, path):
+        with METRICS.step("quote"):
+            amounts = await self.router.functions.getAmountsOut(amount_in, path).call()
+        return amounts[-1]
+
+    async def plan_zap(self, token, total_eth):
+        """
+        Rencana swap → add LP dari reserve pair terbaru (lihat quoter.plan_zap).
+        Tanpa pair (tanpa FACTORY_ADDRESS): setengah-setengah dengan quote router.
+        """
+        try:
+            reserves = await self.index.fetch_reserves(token)
+        except Exception:
+            reserves = None
+        if reserves is not None:
+            return plan_zap(total_eth, *reserves, SLIPPAGE)
+        half_eth = total_eth // 2
+        amount_out = await self.get_amount_out(half_eth, [WETH_ADDRESS, token])
+        if amount_out == 0:
+            return None
+        # Sisi token LP = hasil swap minimum, supaya add LP tidak revert kalau swap kena slippage
+        amount_out_min = int(amount_out * (1 - SLIPPAGE))
+        return {"swap_in": half_eth, "token_out": amount_out, "amount_out_min": amount_out_min,
+                "weth_for_lp": half_eth, "token_for_lp": amount_out_min}
+
+    async def zap(self, token, total_eth):
+        """Wrap → swap → approve → add LP di-broadcast berurutan; hash add LP dikembalikan."""
+        plan = await self.plan_zap(token, total_eth)
+        if plan is None:
+            return None
+        await self.fund_weth(total_eth)
+        await self.swap_weth_to_token(token, plan["swap_in"], plan["amount_out_min"])
+        await self.approve_token(token, plan["token_for_lp"])
+        return await self.add_liquidity(token, plan["weth_for_lp"], plan["token_for_lp"])
+
+    # ---------- helpers ----------
+    async def wrap_eth(self, amount):
+        tx_hash = await self.send_tx(self.weth.functions.deposit(), "wrap", {'value': amount})
+        return tx_hash
+
+    async def approve_token(self, token, amount):
+        if not self.allowances.known(token):
+            self.allowances.set(token, await self.get_allowance(token))
+        if not self.allowances.needs_approval(token, amount):
+            self.allowances.spend(token, amount)
+            return None
+        # Round lain bisa in-flight bersamaan, approve cukup untuk semuanya
+        # supaya approve baru tidak menimpa allowance round lain
+        approve_amount = self.allowances.approve_amount(amount * self.concurrency)
+        tx_hash = await self.send_tx(self.erc20(token).functions.approve(ROUTER_ADDRESS, approve_amount), "approve")
+        # Round paralel tidak bisa menunggu receipt masing-masing, jadi
+        # allowance langsung dipotong saat dipakai (bukan saat konfirmasi)
+        self.allowances.approved(token, approve_amount)
+        self.allowances.spend(token, amount)
+        return tx_hash
+
+    async def fund_weth(self, amount):
+        """Siapkan WETH untuk router (wrap + approve); tidak perlu di mode NATIVE_ETH."""
+        if NATIVE_ETH:
+            return None
+        await self.wrap_eth(amount)
+        return await self.approve_token(WETH_ADDRESS, amount)
+
+    async def swap_weth_to_token(self, token_out, amount_in, amount_out_min):
+        if NATIVE_ETH:
+            return await self.send_tx(self.router.functions.swapExactETHForTokens(
+                amount_out_min, [WETH_ADDRESS, token_out], self.address, int(time.time()) + 600
+            ), "swap", {'value': amount_in})
+        return await self.send_tx(self.router.functions.swapExactTokensForTokens(
+            amount_in, amount_out_min, [WETH_ADDRESS, token_out], self.address, int(time.time()) + 600
+        ), "swap")
+
+    async def add_liquidity(self, token, weth_amount, token_amount):
+        if NATIVE_ETH:
+            return await self.send_tx(self.router.functions.addLiquidityETH(
+                token,
+                token_amount,
+                int(token_amount * (1 - SLIPPAGE)),
+                int(weth_amount * (1 - SLIPPAGE)),
+                self.address,
+                int(time.time()) + 600
+            ), "add_liquidity", {'value': weth_amount})
+        return await self.send_tx(self.router.functions.addLiquidity(
+            WETH_ADDRESS,
+            token,
+            weth_amount,
+            token_amount,
+            int(weth_amount * (1 - SLIPPAGE)),
+            int(token_amount * (1 - SLIPPAGE)),
+            self.address,
+            int(time.time()) + 600
+        ), "add_liquidity")
+
+    # ==================== STRATEGIES ====================
+    async def round_swap(self, worker_id, token_out):
+        amount_in = Web3.to_wei(random.uniform(0.000025, 0.00005), 'ether')
+        amount_out, symbol = await asyncio.gather(
+            self.get_amount_out(amount_in, [WETH_ADDRESS, token_out]),
+            self.get_token_symbol(token_out),
+        )
+        amount_out_min = int(amount_out * (1 - SLIPPAGE))
+        if amount_out_min < 1:
+            self.log(worker_id, "⚠️ amountOut terlalu kecil. Skip.")
+            return None
+
+        await self.fund_weth(amount_in)
+        tx_hash = await self.swap_weth_to_token(token_out, amount_in, amount_out_min)
+        self.log(worker_id, f"💱 Swap {Web3.from_wei(amount_in, 'ether')} WETH → {symbol}: {EXPLORER_TX}{tx_hash.hex()}")
+        return tx_hash
+
+    async def prepare_swap(self, worker_id, token_out, nonces=None):
+        """
+        Quote + sign round swap berikutnya selagi round sekarang menunggu
+        receipt. Hanya mode NATIVE_ETH (satu tx); jalur WETH tergantung ledger
+        allowance saat broadcast sehingga tetap dijalankan langsung.
+        """
+        if not NATIVE_ETH:
+            return None
+        path = [WETH_ADDRESS, token_out]
+        amount_in = Web3.to_wei(random.uniform(0.000025, 0.00005), 'ether')
+        amount_out, symbol = await asyncio.gather(
+            self.get_amount_out(amount_in, path),
+            self.get_token_symbol(token_out),
+        )
+        amount_out_min = int(amount_out * (1 - SLIPPAGE))
+        if amount_out_min < 1:
+            if nonces:
+                self.signer.release(nonces)
+            return None
+
+        async def check():
+            # Harga bergerak melewati slippage → tx pre-signed pasti revert
+            return await self.get_amount_out(amount_in, path) >= amount_out_min
+
+        fn = self.router.functions.swapExactETHForTokens(amount_out_min, path, self.address, int(time.time()) + 600)
+        return await self.signer.prepare(
+            [(fn, "swap", {'value': amount_in})],
+            meta={"token": token_out, "symbol": symbol, "amount_in": amount_in},
+            check=check,
+            nonces=nonces,
+        )
+
+    async def run_prepared(self, worker_id, prepared, prepare_fn):
+        if not await self.signer.valid(prepared):
+            if not self.signer.nonce_valid(prepared):
+                self.log(worker_id, "♻️ Nonce berubah, round pre-signed dibuang")
+                return None
+            # Quote / umur basi: sign ulang dengan nonce yang sama
+            prepared = await prepare_fn(worker_id, prepared.meta["token"], nonces=prepared.nonces)
+            if prepared is None:
+                return None
+        tx_hash = (await self.signer.broadcast(prepared))[-1]
+        meta = prepared.meta
+        self.log(worker_id, f"⚡ Swap pre-signed {Web3.from_wei(meta['amount_in'], 'ether')} ETH → {meta['symbol']}: {EXPLORER_TX}{tx_hash.hex()}")
+        return tx_hash
+
+    async def round_lp(self, worker_id, token):
+        target_eth = Web3.to_wei(0.000025, 'ether')
+        token_amount, symbol = await asyncio.gather(
+            self.get_amount_out(target_eth, [WETH_ADDRESS, token]),
+            self.get_token_symbol(token),
+        )
+
+        await self.fund_weth(target_eth)
+        await self.approve_token(token, int(token_amount * 1.10))
+        tx_hash = await self.add_liquidity(token, target_eth, token_amount)
+        self.log(worker_id, f"✅ Add LP WETH + {symbol}: {EXPLORER_TX}{tx_hash.hex()}")
+        return tx_hash
+
+    async def round_swap_lp(self, worker_id, token_out):
+        total_eth = min(TOTAL_ETH_TO_USE, MAX_WETH_FOR_LP * 2)
+        tx_hash, symbol = await asyncio.gather(
+            self.zap(token_out, total_eth),
+            self.get_token_symbol(token_out),
+        )
+        if tx_hash is None:
+            self.log(worker_id, f"⚠️ Swap {symbol} menghasilkan 0 token, skip loop")
+            return None
+        self.log(worker_id, f"✅ Swap + Add LP WETH + {symbol}: {EXPLORER_TX}{tx_hash.hex()}")
+        return tx_hash
+
+    async def round_swap_lp_remove(self, worker_id, token):
+        eth_amount = Web3.to_wei(0.00003, 'ether')
+        # Modal round = 2x eth_amount (swap + LP)
+        tx_hash, symbol = await asyncio.gather(
+            self.zap(token, eth_amount * 2),
+            self.get_token_symbol(token),
+        )
+        if tx_hash is None:
+            self.log(worker_id, f"⚠️ Swap {symbol} menghasilkan 0 token, skip loop")
+            return None
+        self.log(worker_id, f"✅ Swap + Add LP WETH + {symbol}: {EXPLORER_TX}{tx_hash.hex()}")
+
+        pair = self.registry.get(token, "pair")
+        if pair:
+            self.positions.track_add(self.receipts, tx_hash, token, pair, self.index.reserves.get(token))
+
+        self.lp_counter += 1
+        if self.lp_counter < self.target_remove_interval or self.factory is None:
+            return tx_hash
+        # Reset sebelum await supaya worker lain tidak ikut memicu remove
+        self.lp_counter = 0
+        self.target_remove_interval = random.randint(3, 5)
+
+        await self.wait(tx_hash)
+        return await self.remove_positions(worker_id)
+
+    async def plan_removals(self):
+        """Sweep posisi LP (lihat LpPositions) dan reserve pair-nya dibaca bersamaan."""
+        tokens = self.positions.candidates(TOKEN_OUTS)
+        if not tokens:
+            return []
+        results = await asyncio.gather(
+            self.positions.refresh_async(self.w3, tokens),
+            *(self.index.fetch_reserves(token) for token in tokens),
+            return_exceptions=True,
+        )
+        reserves = {token: r for token, r in zip(tokens, results[1:]) if isinstance(r, tuple)}
+        return self.positions.plan(reserves)
+
+    async def remove_positions(self, worker_id):
+        plans = await self.plan_removals()
+        if not plans:
+            self.log(worker_id, "ℹ️ Tidak ada posisi LP untuk ditarik")
+            return None
+        # Pair yang tidak sampai di-track (error / cancel) dilepas dari in-flight
+        tracked = 0
+        try:
+            # Allowance LP yang belum ada di ledger dibaca sekaligus
+            unknown = [plan["pair"] for plan in plans if not self.allowances.known(plan["pair"])]
+            for pair, allowance in zip(unknown, await asyncio.gather(*(self.get_allowance(p) for p in unknown))):
+                self.allowances.set(pair, allowance)
+
+            # Approve + remove semua pair di-broadcast berurutan; receipt cukup ditunggu sekali
+            tx_hash = None
+            for plan in plans:
+                token = plan["token"]
+                await self.approve_token(plan["pair"], plan["liquidity"])
+                tx_hash = await self.send_tx(self.router.functions.removeLiquidityETH(
+                    token,
+                    plan["liquidity"],
+                    plan["amount_token_min"],
+                    plan["amount_eth_min"],
+                    self.address,
+                    int(time.time()) + 1000
+                ), "remove_liquidity")
+                self.positions.track_remove(self.receipts, tx_hash, token)
+                tracked += 1
+                symbol = await self.get_token_symbol(token)
+                self.log(worker_id, f"🔥 Remove LP {symbol} (~{plan['value_eth'] / 10 ** 18:.8f} ETH): {EXPLORER_TX}{tx_hash.hex()}")
+        finally:
+            for plan in plans[tracked:]:
+                self.positions.release(plan["token"])
+        return tx_hash
+
+    # ==================== LOOP ====================
+    def strategy(self, name):
+        strategies = {
+            "swap": self.round_swap,
+            "lp": self.round_lp,
+            "swap_lp": self.round_swap_lp,
+            "swap_lp_remove": self.round_swap_lp_remove,
+        }
+        if name not in strategies:
+            raise ValueError(f"❌ Strategi tidak dikenal: {name}")
+        return strategies[name]
+
+    async def collect(self, worker_id, next_round):
+        if next_round is None:
+            return None
+        try:
+            return await next_round
+        except Exception as e:
+            self.log(worker_id, f"⚠️ Gagal menyiapkan round berikutnya: {e}")
+            return None
+
+    def round_done(self, name, started, error=None):
+        events.emit("round_done", seconds=round(time.perf_counter() - started, 3), ok=error is None)
+        if self.on_round is not None:
+            self.on_round(name, time.perf_counter() - started, error)
+
+    async def prepare_next(self, worker_id, scheduler, prepare_fn):
+        """
+        Pacing + cek saldo round berikutnya dulu, baru nonce di-reserve dan
+        di-sign; hasilnya di-broadcast begitu receipt round sekarang ada.
+        Nonce tidak ditahan selama menunggu scheduler / saldo.
+        """
+        await scheduler.wait()
+        if await self.w3.eth.get_balance(self.address) < MIN_BALANCE:
+            return None
+        return await prepare_fn(worker_id, self.index.choose())
+
+    async def worker(self, name, worker_id, scheduler, rounds=None):
+        """Loop round strategi; `rounds` = berhenti setelah sekian round (None = terus)."""
+        round_fn = self.strategy(name)
+        # Semua event dari worker ini (dan task turunannya) membawa wallet/strategi/worker
+        events.bind(wallet=self.address, strategy=name, worker=worker_id)
+        # Strategi dengan prepare_*: round N+1 di-sign selagi round N menunggu receipt
+        prepare_fn = {"swap": self.prepare_swap}.get(name)
+        prepared = None
+        next_round = None
+        done = 0
+        try:
+            while rounds is None or done < rounds:
+                try:
+                    started = time.perf_counter()
+                    # Round pre-signed sudah lewat pacing + cek saldo saat disiapkan
+                    if prepared is None:
+                        await scheduler.wait()
+                        started = time.perf_counter()
+                        balance = await self.w3.eth.get_balance(self.address)
+                        if balance < MIN_BALANCE:
+                            self.log(worker_id, "⚠️ Saldo terlalu kecil.")
+                            await scheduler.backoff("balance")
+                            continue
+
+                    self.log(worker_id, f"====== [ROUND] {datetime.now().isoformat()} ======")
+                    events.emit("round_start")
+                    tx_hash = None
+                    if prepared is not None:
+                        tx_hash = await self.run_prepared(worker_id, prepared, prepare_fn)
+                        prepared = None
+                    if tx_hash is None:
+                        tx_hash = await round_fn(worker_id, self.index.choose())
+
+                    next_round = None
+                    if prepare_fn is not None:
+                        next_round = asyncio.create_task(self.prepare_next(worker_id, scheduler, prepare_fn))
+                    if tx_hash is not None:
+                        receipt = await self.wait(tx_hash)
+                        if receipt.status == 0:
+                            self.log(worker_id, "⚠️ Tx terakhir revert.")
+                    prepared, next_round = await self.collect(worker_id, next_round), None
+                    scheduler.succeeded()
+                    done += 1
+                    self.round_done(name, started)
+                except Exception as e:
+                    self.log(worker_id, f"❌ ERROR: {e}")
+                    done += 1
+                    self.round_done(name, started, e)
+                    # Round yang sudah disiapkan tidak ditahan selama backoff: nonce-nya dikembalikan
+                    pending = prepared or await self.collect(worker_id, next_round)
+                    if pending is not None:
+                        self.signer.discard(pending)
+                    prepared = next_round = None
+                    await scheduler.failed(e)
+        finally:
+            # Strategi di-stop: nonce yang di-reserve round pre-signed dikembalikan
+            # (prepare yang dibatalkan di tengah jalan mengembalikan nonce-nya sendiri)
+            if prepared is not None:
+                self.signer.discard(prepared)
+            if next_round is not None:
+                if not next_round.done():
+                    next_round.cancel()
+                elif not next_round.cancelled() and next_round.exception() is None and next_round.result() is not None:
+                    self.signer.discard(next_round.result())
+
+    def wallet_bucket(self, concurrency):
+        """Bucket laju wallet; strategi dengan default laju lebih tinggi (round paralel lebih banyak) menaikkannya."""
+        per_minute = rounds_per_minute(concurrency)
+        if self.bucket is None:
+            self.bucket = TokenBucket(per_minute)
+        else:
+            self.bucket.rate = max(self.bucket.rate, per_minute / 60)
+        return self.bucket
+
+    async def run(self, name, concurrency=None, rounds=None):
+        self.strategy(name)
+        concurrency = concurrency or self.concurrency
+        print(f"🚀 Async engine {name} x{concurrency} oleh {self.address}")
+        self.index.start()
+        # Backoff per strategi, laju per wallet: N strategi di wallet yang sama tidak jadi N x laju
+        scheduler = AsyncScheduler(shared=self.pacing, bucket=self.wallet_bucket(concurrency))
+        await asyncio.gather(*(self.worker(name, i, scheduler, rounds) for i in range(concurrency)))
+
+
+if __name__ == "__main__":
+    strategy_name = sys.argv[1] if len(sys.argv) > 1 else "swap"
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    engine = AsyncEngine(require_env("PRIVATE_KEY"), concurrency)
+    asyncio.run(engine.run(strategy_name))
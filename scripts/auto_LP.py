@@ -1,12 +1,24 @@
 import os
 import time
 import json
-import random
 from datetime import datetime
 from decimal import Decimal, getcontext
 from dotenv import load_dotenv
 from web3 import Web3
 from scripts.token_outs import TOKEN_OUTS
+from scripts.rpc import MultiEndpointProvider, rpc_urls
+from scripts.nonce_manager import NonceManager
+from scripts.receipt_tracker import ReceiptTracker
+from scripts.realtime import RealtimeSender
+from scripts.gas_policy import GasPolicy
+from scripts.token_registry import TokenRegistry
+from scripts.allowance_manager import AllowanceManager, APPROVE_ON_START
+from scripts.multicall import Multicall
+from scripts.quoter import Quoter
+from scripts.liquidity_index import LiquidityIndex
+from scripts.scheduler import Scheduler
+from scripts.metrics import METRICS, instrument
+from scripts import events
 
 # ==================== SETUP ====================
 getcontext().prec = 18
@@ -25,9 +37,19 @@ ROUTER_ADDRESS = Web3.to_checksum_address(require_env("ROUTER_ADDRESS"))
 WETH_ADDRESS = Web3.to_checksum_address("0x776401b9bc8aae31a685731b7147d4445fd9fb19")
 
 SLIPPAGE = 0.1  # 10%
-
-web3 = Web3(Web3.HTTPProvider(RPC_URL))
+# NATIVE_ETH=1 (default): swapExactETHForTokens / addLiquidityETH langsung dengan ETH,
+# tanpa wrap + approve WETH. Isi NATIVE_ETH=0 untuk jalur WETH lama.
+NATIVE_ETH = os.getenv("NATIVE_ETH", "1") == "1"
+
+# Semua endpoint di RPC_URL + RPC_URLS, read ke node tercepat, tx di-pin ke satu node
+web3 = Web3(MultiEndpointProvider(rpc_urls(RPC_URL)))
+# Call + latency per method RPC, /metrics (METRICS_PORT) dan ringkasan berkala di log
+instrument(web3)
 account = web3.eth.account.from_key(PRIVATE_KEY)
+receipts = ReceiptTracker(web3)
+nonces = NonceManager(web3, account.address, receipts)
+sender = RealtimeSender(web3, receipts)
+gas = GasPolicy(web3, receipts, CHAIN_ID)
 
 # ==================== ABIs ====================
 with open("scripts/abi/uniswap_v2_router.json") as f:
@@ -46,54 +68,94 @@ WETH_ABI = ERC20_ABI + [
 router = web3.eth.contract(address=ROUTER_ADDRESS, abi=router_abi)
 weth_contract = web3.eth.contract(address=WETH_ADDRESS, abi=WETH_ABI)
 
+# Symbol/decimals/pair di-cache di disk, cukup di-warm sekali saat start
+multicall = Multicall(web3)
+registry = TokenRegistry(web3, CHAIN_ID, WETH_ADDRESS, os.getenv("FACTORY_ADDRESS"))
+registry.warm(TOKEN_OUTS + [WETH_ADDRESS])
+
+# Allowance router dibaca sekali (batch) lalu dilacak lokal
+allowances = AllowanceManager(web3, account.address, ROUTER_ADDRESS)
+allowances.warm(TOKEN_OUTS + [WETH_ADDRESS])
+
+# Quote dihitung lokal dari reserve pair (butuh FACTORY_ADDRESS untuk cari pair)
+quoter = Quoter(web3, registry, WETH_ADDRESS, multicall)
+# TOKEN_OUTS diurutkan dari likuiditas + volume swap; pool tipis di-skip
+index = LiquidityIndex(web3, registry, quoter, TOKEN_OUTS)
+# Laju round dari ROUNDS_PER_MINUTE (token bucket), backoff per kelas error
+scheduler = Scheduler()
+
 # ==================== HELPERS ====================
 def get_token_symbol(token_addr):
+    return registry.symbol(token_addr)
+
+def quote(amount_in, path):
+    # Lokal dari reserve cache; router hanya dipanggil kalau pair belum di-cache
+    with METRICS.step("quote"):
+        amounts = quoter.get_amounts_out(amount_in, path)
+        if amounts is None:
+            amounts = router.functions.getAmountsOut(amount_in, path).call()
+    return amounts
+
+def read_balance_and_reserves():
+    # Saldo ETH + reserve semua pair dalam satu eth_call
+    batch = multicall.batch()
+    balance_slot = batch.add_eth_balance(account.address)
+    apply_reserves = quoter.refresh(TOKEN_OUTS, batch)
+    # Saldo + reserve (+ quote router) satu eth_call = langkah "quote" round ini
+    with METRICS.step("quote"):
+        results = batch.execute()
+    apply_reserves(results)
+    balance = results[balance_slot]
+    if balance is None:
+        balance = web3.eth.get_balance(account.address)
+    return balance
+
+def send_tx(fn, action, params=None):
+    # Nonce diambil dari NonceManager, tidak menunggu receipt tx sebelumnya.
+    # Gas limit + fee dari GasPolicy sesuai jenis aksi (wrap/approve/swap/...)
+    nonce = nonces.allocate()
     try:
-        contract = web3.eth.contract(address=token_addr, abi=ERC20_ABI)
-        return contract.functions.symbol().call()
-    except:
-        return "UNKNOWN"
+        with METRICS.step(action):
+            tx = fn.build_transaction({
+                **gas.params(action),
+                **(params or {}),
+                'from': account.address,
+                'nonce': nonce,
+                'chainId': CHAIN_ID
+            })
+            signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
+            tx_hash = sender.send_raw(signed.raw_transaction)
+    except Exception:
+        nonces.release(nonce)
+        raise
+    nonces.mark_sent(nonce, tx_hash)
+    gas.track(tx_hash, action, tx['gas'])
+    events.track_tx(receipts, tx_hash, action, nonce, tx.get('value', 0))
+    return tx_hash
+
+def approve_token(token, amount):
+    # Ledger lokal: read/approve ke chain hanya kalau allowance tercatat kurang
+    if not allowances.needs_approval(token, amount):
+        print(f"✅ Sudah approve token {get_token_symbol(token)}")
+        return None
 
-def approve_token(token, amount, nonce):
+    approve_amount = allowances.approve_amount(amount)
     contract = web3.eth.contract(address=token, abi=ERC20_ABI)
-    allowance = contract.functions.allowance(account.address, ROUTER_ADDRESS).call()
-    if allowance >= amount:
-        print(f"✅ Sudah approve token {get_token_symbol(token)}")
-        return nonce
-
-    tx = contract.functions.approve(ROUTER_ADDRESS, amount).build_transaction({
-        'from': account.address,
-        'gas': 80000,
-        'gasPrice': web3.to_wei('0.01', 'gwei'),
-        'nonce': nonce,
-        'chainId': CHAIN_ID
-    })
-    signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+    tx_hash = send_tx(contract.functions.approve(ROUTER_ADDRESS, approve_amount), "approve")
+    allowances.approved(token, approve_amount)
     print(f"🔑 Approve {get_token_symbol(token)}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
-    web3.eth.wait_for_transaction_receipt(tx_hash)
-    return nonce + 1
-
-def wrap_eth(amount, nonce):
-    tx = weth_contract.functions.deposit().build_transaction({
-        'from': account.address,
-        'value': amount,
-        'gas': 100000,
-        'gasPrice': web3.to_wei('0.01', 'gwei'),
-        'nonce': nonce,
-        'chainId': CHAIN_ID
-    })
-    signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+    return tx_hash
+
+def wrap_eth(amount):
+    tx_hash = send_tx(weth_contract.functions.deposit(), "wrap", {'value': amount})
     print(f"💧 Wrap ETH: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
-    web3.eth.wait_for_transaction_receipt(tx_hash)
-    return nonce + 1
+    return tx_hash
 
 # ==================== MAIN LP ====================
-def add_liquidity(token_address, target_eth_value_wei, nonce):
+def add_liquidity(token_address, target_eth_value_wei):
     try:
         path = [WETH_ADDRESS, token_address]
-        amounts_out = router.functions.getAmountsOut(target_eth_value_wei, path).call()
+        amounts_out = quote(target_eth_value_wei, path)
         token_amount = amounts_out[1]
         token_symbol = get_token_symbol(token_address)
 
@@ -106,12 +168,29 @@ def add_liquidity(token_address, target_eth_value_wei, nonce):
         print(f" - Approval {token_symbol} (+10%): {approve_amount_token / (10**18):,.6f}")
         print(f" - Slippage: {SLIPPAGE * 100}%")
 
-        nonce = wrap_eth(target_eth_value_wei, nonce)
-        nonce = approve_token(token_address, approve_amount_token, nonce)
-        nonce = approve_token(WETH_ADDRESS, target_eth_value_wei, nonce)
-
         deadline = int(time.time()) + 600
-        tx = router.functions.addLiquidity(
+
+        if NATIVE_ETH:
+            # addLiquidityETH: router yang wrap ETH, cukup approve token
+            approve_token(token_address, approve_amount_token)
+            tx_hash = send_tx(router.functions.addLiquidityETH(
+                token_address,
+                token_amount,
+                int(token_amount * (1 - SLIPPAGE)),
+                int(target_eth_value_wei * (1 - SLIPPAGE)),
+                account.address,
+                deadline
+            ), "add_liquidity", {'value': target_eth_value_wei})
+            allowances.track(token_address, token_amount)
+            print(f"✅ Add Liquidity ETH + {token_symbol}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
+            return tx_hash
+
+        # Wrap + approve + addLiquidity di-broadcast berurutan tanpa menunggu receipt
+        wrap_eth(target_eth_value_wei)
+        approve_token(token_address, approve_amount_token)
+        approve_token(WETH_ADDRESS, target_eth_value_wei)
+
+        tx_hash = send_tx(router.functions.addLiquidity(
             WETH_ADDRESS,
             token_address,
             target_eth_value_wei,
@@ -120,47 +199,50 @@ def add_liquidity(token_address, target_eth_value_wei, nonce):
             int(token_amount * (1 - SLIPPAGE)),
             account.address,
             deadline
-        ).build_transaction({
-            'from': account.address,
-            'gas': 400000,
-            'gasPrice': web3.to_wei('0.01', 'gwei'),
-            'nonce': nonce,
-            'chainId': CHAIN_ID
-        })
-        signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-        tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+        ), "add_liquidity")
+        allowances.track(token_address, token_amount)
+        allowances.track(WETH_ADDRESS, target_eth_value_wei)
         print(f"✅ Add Liquidity WETH + {token_symbol}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
+        return tx_hash
     except Exception as e:
         print(f"❌ Gagal add LP: {e}")
+        return None
 
 # ==================== LOOP ====================
 def run():
+    events.bind(wallet=account.address, strategy="lp")
+    if APPROVE_ON_START:
+        tokens = TOKEN_OUTS if NATIVE_ETH else TOKEN_OUTS + [WETH_ADDRESS]
+        sent = allowances.warm_up(tokens, approve_token)
+        if sent:
+            nonces.wait(sent[-1])
+
     while True:
         try:
+            scheduler.wait()
+            events.emit("round_start")
             print(f"\n====== [START ROUND] {datetime.now().isoformat()} ======")
-            balance = web3.eth.get_balance(account.address)
+            balance = read_balance_and_reserves()
             print(f"Saldo: {web3.from_wei(balance, 'ether')} ETH")
 
             if balance < web3.to_wei('0.001', 'ether'):
                 print("⚠️ Saldo terlalu kecil.")
-                time.sleep(15)
+                scheduler.backoff("balance")
                 continue
 
-            token = random.choice(TOKEN_OUTS)
+            index.refresh_if_stale()
+            token = index.choose()
             target_eth_value_wei = web3.to_wei(0.000025, 'ether')
-            nonce = web3.eth.get_transaction_count(account.address)
-
-            add_liquidity(token, target_eth_value_wei, nonce)
-
 
-            sleep_time = random.randint(5, 10)
-            print(f"⏳ Tidur {sleep_time} detik...\n")
-            time.sleep(sleep_time)
+            tx_hash = add_liquidity(token, target_eth_value_wei)
+            if tx_hash is not None:
+                receipt = nonces.wait(tx_hash)
+                allowances.settle(receipt.status)
+            scheduler.succeeded()
 
         except Exception as e:
             print(f"❌ ERROR (main loop): {e}")
-            print("🔁 Coba lagi dalam 10 detik...\n")
-            time.sleep(10)
+            scheduler.failed(e)
 
 if __name__ == "__main__":
     run()
@@ -7,6 +7,20 @@ from decimal import Decimal, getcontext
 from dotenv import load_dotenv
 from web3 import Web3
 from scripts.token_outs import TOKEN_OUTS
+from scripts.rpc import MultiEndpointProvider, rpc_urls
+from scripts.nonce_manager import NonceManager
+from scripts.receipt_tracker import ReceiptTracker
+from scripts.realtime import RealtimeSender
+from scripts.gas_policy import GasPolicy
+from scripts.presign import TxSigner
+from scripts.token_registry import TokenRegistry
+from scripts.allowance_manager import AllowanceManager, APPROVE_ON_START
+from scripts.multicall import Multicall
+from scripts.quoter import Quoter
+from scripts.liquidity_index import LiquidityIndex
+from scripts.scheduler import Scheduler
+from scripts.metrics import METRICS, instrument
+from scripts import events
 
 
 # ==================== SETUP ====================
@@ -27,9 +41,20 @@ ROUTER_ADDRESS = Web3.to_checksum_address(require_env("ROUTER_ADDRESS"))
 WETH_ADDRESS = Web3.to_checksum_address("0x776401b9bc8aae31a685731b7147d4445fd9fb19")
 
 SLIPPAGE = 0.1  # 10%
+# NATIVE_ETH=1 (default): swapExactETHForTokens / addLiquidityETH langsung dengan ETH,
+# tanpa wrap + approve WETH. Isi NATIVE_ETH=0 untuk jalur WETH lama.
+NATIVE_ETH = os.getenv("NATIVE_ETH", "1") == "1"
 
-web3 = Web3(Web3.HTTPProvider(RPC_URL))
+# Semua endpoint di RPC_URL + RPC_URLS, read ke node tercepat, tx di-pin ke satu node
+web3 = Web3(MultiEndpointProvider(rpc_urls(RPC_URL)))
+# Call + latency per method RPC, /metrics (METRICS_PORT) dan ringkasan berkala di log
+instrument(web3)
 account = web3.eth.account.from_key(PRIVATE_KEY)
+receipts = ReceiptTracker(web3)
+nonces = NonceManager(web3, account.address, receipts)
+sender = RealtimeSender(web3, receipts)
+gas = GasPolicy(web3, receipts, CHAIN_ID)
+signer = TxSigner(web3, PRIVATE_KEY, CHAIN_ID, nonces, gas, sender)
 
 # Load Router ABI
 with open("scripts/abi/uniswap_v2_router.json") as f:
@@ -53,127 +78,250 @@ WETH_ABI = ERC20_ABI + [
 
 weth_contract = web3.eth.contract(address=WETH_ADDRESS, abi=WETH_ABI)
 
+# Symbol/decimals/pair di-cache di disk, cukup di-warm sekali saat start
+multicall = Multicall(web3)
+registry = TokenRegistry(web3, CHAIN_ID, WETH_ADDRESS, os.getenv("FACTORY_ADDRESS"))
+registry.warm(TOKEN_OUTS + [WETH_ADDRESS])
+allowances = AllowanceManager(web3, account.address, ROUTER_ADDRESS)
+
+# Quote dihitung lokal dari reserve pair (butuh FACTORY_ADDRESS untuk cari pair)
+quoter = Quoter(web3, registry, WETH_ADDRESS, multicall)
+# TOKEN_OUTS diurutkan dari likuiditas + volume swap; pool tipis di-skip
+index = LiquidityIndex(web3, registry, quoter, TOKEN_OUTS)
+# Laju round dari ROUNDS_PER_MINUTE (token bucket), backoff per kelas error
+scheduler = Scheduler()
+
 # ==================== HELPERS ====================
 def get_token_symbol(token_address: str) -> str:
-    try:
-        token = web3.eth.contract(address=token_address, abi=ERC20_ABI)
-        return token.functions.symbol().call()
-    except Exception:
-        return "Unknown"
+    return registry.symbol(token_address)
 
 # ==================== LOGIC ====================
-def wrap_eth(amount: int, nonce: int) -> int:
+def quote(amount_in, path):
+    # Lokal dari reserve cache; router hanya dipanggil kalau pair belum di-cache
+    with METRICS.step("quote"):
+        amounts = quoter.get_amounts_out(amount_in, path)
+        if amounts is None:
+            amounts = router.functions.getAmountsOut(amount_in, path).call()
+    return amounts
+
+def read_balance_and_reserves():
+    # Saldo ETH + reserve semua pair dalam satu eth_call
+    batch = multicall.batch()
+    balance_slot = batch.add_eth_balance(account.address)
+    apply_reserves = quoter.refresh(TOKEN_OUTS, batch)
+    # Saldo + reserve (+ quote router) satu eth_call = langkah "quote" round ini
+    with METRICS.step("quote"):
+        results = batch.execute()
+    apply_reserves(results)
+    balance = results[balance_slot]
+    if balance is None:
+        balance = web3.eth.get_balance(account.address)
+    return balance
+
+def send_tx(fn, action, params=None):
+    # Nonce diambil dari NonceManager, tidak menunggu receipt tx sebelumnya.
+    # Gas limit + fee dari GasPolicy sesuai jenis aksi (wrap/approve/swap/...)
+    return signer.send(fn, action, params)
+
+def wrap_eth(amount: int):
     try:
-        tx = weth_contract.functions.deposit().build_transaction({
-            'from': account.address,
-            'value': amount,
-            'gas': 100000,
-            'gasPrice': web3.to_wei('0.01', 'gwei'),
-            'nonce': nonce,
-            'chainId': CHAIN_ID
-        })
-        signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-        tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+        tx_hash = send_tx(weth_contract.functions.deposit(), "wrap", {'value': amount})
         print(f"✅ Wrap ETH ke WETH: https://web3.okx.com/explorer/megaeth-testnet/tx/0x{tx_hash.hex()}")
-        web3.eth.wait_for_transaction_receipt(tx_hash)
-        return nonce + 1
+        return tx_hash
     except Exception as e:
         print(f"❌ Gagal wrap ETH: {e}")
-        return nonce
+        return None
 
-def approve_weth(amount: int, nonce: int) -> int:
+def approve_weth(amount: int):
     try:
-        allowance = weth_contract.functions.allowance(account.address, ROUTER_ADDRESS).call()
-        if allowance >= amount:
+        if not allowances.needs_approval(WETH_ADDRESS, amount):
             print("ℹ️ WETH sudah di-approve.")
-            return nonce
-
-        tx = weth_contract.functions.approve(ROUTER_ADDRESS, amount).build_transaction({
-            'from': account.address,
-            'gas': 80000,
-            'gasPrice': web3.to_wei('0.01', 'gwei'),
-            'nonce': nonce,
-            'chainId': CHAIN_ID
-        })
-        signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-        tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+            return None
+
+        approve_amount = allowances.approve_amount(amount)
+        tx_hash = send_tx(weth_contract.functions.approve(ROUTER_ADDRESS, approve_amount), "approve")
+        allowances.approved(WETH_ADDRESS, approve_amount)
         print(f"✅ Approve WETH: https://web3.okx.com/explorer/megaeth-testnet/tx/0x{tx_hash.hex()}")
-        web3.eth.wait_for_transaction_receipt(tx_hash)
-        return nonce + 1
+        return tx_hash
     except Exception as e:
         print(f"❌ Approve gagal: {e}")
-        return nonce
+        return None
 
-def swap_weth_to_token(token_out: str, amount_in: int, nonce: int):
+def swap_weth_to_token(token_out: str, amount_in: int, native: bool = False, amount_out_min: int = None):
     try:
         path = [WETH_ADDRESS, token_out]
         deadline = int(time.time()) + 600
 
-        try:
-            amounts = router.functions.getAmountsOut(amount_in, path).call()
-        except Exception as e:
-            print(f"⚠️ Gagal mendapatkan amountOut: {e}")
-            return
+        # amount_out_min dari pemanggil (mis. order limit) → tidak quote ulang
+        if amount_out_min is None:
+            try:
+                amounts = quote(amount_in, path)
+            except Exception as e:
+                print(f"⚠️ Gagal mendapatkan amountOut: {e}")
+                return None
+            amount_out_min = int(Decimal(amounts[1]) * Decimal(1 - SLIPPAGE))
 
-        amount_out_min = int(Decimal(amounts[1]) * Decimal(1 - SLIPPAGE))
         symbol = get_token_symbol(token_out)
 
-        print(f"💱 Swap {web3.from_wei(amount_in, 'ether')} WETH → minimal {web3.from_wei(amount_out_min, 'ether')} {symbol}")
+        print(f"💱 Swap {web3.from_wei(amount_in, 'ether')} {'ETH' if native else 'WETH'} → minimal {web3.from_wei(amount_out_min, 'ether')} {symbol}")
 
         if amount_out_min < 1:
             print("⚠️ amountOut terlalu kecil. Skip.")
-            return
-
-        tx = router.functions.swapExactTokensForTokens(
-            amount_in, amount_out_min, path, account.address, deadline
-        ).build_transaction({
-            'from': account.address,
-            'gas': 240000,
-            'gasPrice': web3.to_wei('0.01', 'gwei'),
-            'nonce': nonce,
-            'chainId': CHAIN_ID
-        })
-        signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-        tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+            return None
+
+        if native:
+            # ETH dikirim sebagai value, router yang wrap → satu tx saja
+            tx_hash = send_tx(router.functions.swapExactETHForTokens(
+                amount_out_min, path, account.address, deadline
+            ), "swap", {'value': amount_in})
+        else:
+            tx_hash = send_tx(router.functions.swapExactTokensForTokens(
+                amount_in, amount_out_min, path, account.address, deadline
+            ), "swap")
+            allowances.track(WETH_ADDRESS, amount_in)
         print(f"✅ Swap berhasil! https://web3.okx.com/explorer/megaeth-testnet/tx/0x{tx_hash.hex()}")
+        return tx_hash
     except Exception as e:
         print(f"❌ Gagal swap: {e}")
         if "execution reverted" in str(e):
             print("⚠️ Revert: Cek slippage atau token tidak ada pool.")
+        return None
+
+def swap_token_to_weth(token_in: str, amount_in: int, amount_out_min: int):
+    """Jual token → WETH (approve router dulu kalau allowance kurang)."""
+    try:
+        path = [token_in, WETH_ADDRESS]
+        symbol = get_token_symbol(token_in)
+
+        if allowances.needs_approval(token_in, amount_in):
+            approve_amount = allowances.approve_amount(amount_in)
+            token_contract = web3.eth.contract(address=token_in, abi=ERC20_ABI)
+            tx_hash = send_tx(token_contract.functions.approve(ROUTER_ADDRESS, approve_amount), "approve")
+            allowances.approved(token_in, approve_amount)
+            print(f"✅ Approve {symbol}: https://web3.okx.com/explorer/megaeth-testnet/tx/0x{tx_hash.hex()}")
+
+        print(f"💱 Swap {web3.from_wei(amount_in, 'ether')} {symbol} → minimal {web3.from_wei(amount_out_min, 'ether')} WETH")
+        tx_hash = send_tx(router.functions.swapExactTokensForTokens(
+            amount_in, amount_out_min, path, account.address, int(time.time()) + 600
+        ), "swap")
+        print(f"✅ Swap berhasil! https://web3.okx.com/explorer/megaeth-testnet/tx/0x{tx_hash.hex()}")
+        return tx_hash
+    except Exception as e:
+        print(f"❌ Gagal swap: {e}")
+        if "execution reverted" in str(e):
+            print("⚠️ Revert: Cek slippage atau saldo token.")
+        return None
+
+# ==================== PIPELINE ====================
+def prepare_swap_round(token_out=None, reuse_nonces=None):
+    """
+    Pilih token + amount round berikutnya, quote, lalu build + sign swap-nya
+    selagi round sekarang menunggu receipt. Hanya mode NATIVE_ETH (satu tx).
+    """
+    token_out = token_out or index.choose()
+    path = [WETH_ADDRESS, token_out]
+    amount_in = web3.to_wei(random.uniform(0.000025, 0.00005), 'ether')
+    try:
+        amounts = quote(amount_in, path)
+    except Exception as e:
+        print(f"⚠️ Gagal quote round berikutnya: {e}")
+        amounts = None
+    amount_out_min = int(Decimal(amounts[1]) * Decimal(1 - SLIPPAGE)) if amounts else 0
+    if amount_out_min < 1:
+        if reuse_nonces:
+            signer.release(reuse_nonces)
+        return None
+
+    def check():
+        # Reserve sudah di-refresh di awal round; harga lewat slippage → pasti revert
+        amounts = quoter.get_amounts_out(amount_in, path)
+        return amounts is None or amounts[1] >= amount_out_min
+
+    fn = router.functions.swapExactETHForTokens(amount_out_min, path, account.address, int(time.time()) + 600)
+    return signer.prepare(
+        [(fn, "swap", {'value': amount_in})],
+        meta={"token": token_out, "amount_in": amount_in, "amount_out_min": amount_out_min},
+        check=check,
+        nonces=reuse_nonces,
+    )
+
+def broadcast_prepared(prepared):
+    """Broadcast round pre-signed; None kalau basi (round dijalankan biasa)."""
+    if not signer.valid(prepared):
+        if not signer.nonce_valid(prepared):
+            print("♻️ Nonce berubah, round pre-signed dibuang.")
+            return None
+        # Quote / umur basi → sign ulang dengan nonce yang sama
+        prepared = prepare_swap_round(prepared.meta["token"], prepared.nonces)
+        if prepared is None:
+            return None
+    tx_hash = signer.broadcast(prepared)[-1]
+    meta = prepared.meta
+    symbol = get_token_symbol(meta["token"])
+    print(f"⚡ Swap pre-signed {web3.from_wei(meta['amount_in'], 'ether')} ETH → minimal {web3.from_wei(meta['amount_out_min'], 'ether')} {symbol}")
+    print(f"✅ Swap berhasil! https://web3.okx.com/explorer/megaeth-testnet/tx/0x{tx_hash.hex()}")
+    return tx_hash
 
 # ==================== MAIN LOOP ====================
 def run_loop():
+    events.bind(wallet=account.address, strategy="swap")
+    if APPROVE_ON_START and not NATIVE_ETH:
+        sent = allowances.warm_up([WETH_ADDRESS], lambda token, amount: approve_weth(amount))
+        if sent:
+            nonces.wait(sent[-1])
+
+    prepared = None
     while True:
         try:
+            scheduler.wait()
+            events.emit("round_start")
             print("\n================== [NEW ROUND] ==================")
             print(f"[{datetime.now().isoformat()}] Mulai loop oleh: {account.address}")
 
-            balance = web3.eth.get_balance(account.address)
+            balance = read_balance_and_reserves()
             print(f"Saldo ETH: {web3.from_wei(balance, 'ether')} ETH")
 
             if balance < web3.to_wei('0.001', 'ether'):
                 print("⚠️ Saldo terlalu rendah.")
-                time.sleep(15)
+                scheduler.backoff("balance")
                 continue
 
-            token_out = random.choice(TOKEN_OUTS)
+            index.refresh_if_stale()
+            token_out = index.choose()
             symbol = get_token_symbol(token_out)
 
             amount_in = web3.to_wei(random.uniform(0.000025, 0.00005), 'ether')
-            nonce = web3.eth.get_transaction_count(account.address)
-
-            nonce = wrap_eth(amount_in, nonce)
-            nonce = approve_weth(amount_in, nonce)
-            swap_weth_to_token(token_out, amount_in, nonce)
 
-            sleep_time = random.randint(5, 10)
-            print(f"⏳ Menunggu {sleep_time} detik...\n")
-            time.sleep(sleep_time)
+            # Wrap, approve, swap di-broadcast berurutan; cukup tunggu receipt terakhir
+            if prepared is not None:
+                sent = [broadcast_prepared(prepared)]
+                prepared = None
+                if sent[0] is None:
+                    sent = [swap_weth_to_token(token_out, amount_in, native=True)]
+            elif NATIVE_ETH:
+                sent = [swap_weth_to_token(token_out, amount_in, native=True)]
+            else:
+                sent = [
+                    wrap_eth(amount_in),
+                    approve_weth(amount_in),
+                    swap_weth_to_token(token_out, amount_in),
+                ]
+            sent = [tx_hash for tx_hash in sent if tx_hash is not None]
+            if NATIVE_ETH:
+                # Round berikutnya di-sign sekarang, selagi tx ini belum masuk block
+                prepared = prepare_swap_round()
+            if sent:
+                receipt = nonces.wait(sent[-1])
+                if receipt.status == 0:
+                    print("⚠️ Tx terakhir revert.")
+                allowances.settle(receipt.status)
+            scheduler.succeeded()
 
         except Exception as e:
             print(f"❌ ERROR (main loop): {e}")
-            print("🔁 Retry dalam 10 detik...\n")
-            time.sleep(10)
+            if prepared is not None and not signer.nonce_valid(prepared):
+                prepared = None
+            scheduler.failed(e)
 
 if __name__ == "__main__":
     run_loop()
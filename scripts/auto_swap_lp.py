@@ -1,12 +1,24 @@
 import os
 import time
 import json
-import random
 from datetime import datetime
 from decimal import Decimal, getcontext
 from dotenv import load_dotenv
 from web3 import Web3
 from scripts.token_outs import TOKEN_OUTS
+from scripts.rpc import MultiEndpointProvider, rpc_urls
+from scripts.nonce_manager import NonceManager
+from scripts.receipt_tracker import ReceiptTracker
+from scripts.realtime import RealtimeSender
+from scripts.gas_policy import GasPolicy
+from scripts.token_registry import TokenRegistry
+from scripts.allowance_manager import AllowanceManager, APPROVE_ON_START
+from scripts.multicall import Multicall
+from scripts.quoter import Quoter
+from scripts.liquidity_index import LiquidityIndex
+from scripts.scheduler import Scheduler
+from scripts.metrics import METRICS, instrument
+from scripts import events
 
 # ==================== SETUP ====================
 getcontext().prec = 18
@@ -25,8 +37,18 @@ ROUTER_ADDRESS = Web3.to_checksum_address(require_env("ROUTER_ADDRESS"))
 WETH_ADDRESS = Web3.to_checksum_address("0x776401b9bc8aae31a685731b7147d4445fd9fb19")
 
 SLIPPAGE = 0.1  # 10%
-web3 = Web3(Web3.HTTPProvider(RPC_URL))
+# NATIVE_ETH=1 (default): swapExactETHForTokens / addLiquidityETH langsung dengan ETH,
+# tanpa wrap + approve WETH. Isi NATIVE_ETH=0 untuk jalur WETH lama.
+NATIVE_ETH = os.getenv("NATIVE_ETH", "1") == "1"
+# Semua endpoint di RPC_URL + RPC_URLS, read ke node tercepat, tx di-pin ke satu node
+web3 = Web3(MultiEndpointProvider(rpc_urls(RPC_URL)))
+# Call + latency per method RPC, /metrics (METRICS_PORT) dan ringkasan berkala di log
+instrument(web3)
 account = web3.eth.account.from_key(PRIVATE_KEY)
+receipts = ReceiptTracker(web3)
+nonces = NonceManager(web3, account.address, receipts)
+sender = RealtimeSender(web3, receipts)
+gas = GasPolicy(web3, receipts, CHAIN_ID)
 
 MAX_WETH_FOR_LP = web3.to_wei(0.00008, 'ether')  # Maksimal WETH untuk LP
 TOTAL_ETH_TO_USE = web3.to_wei(0.00005, 'ether')  # Total ETH dipakai per loop
@@ -48,89 +70,165 @@ WETH_ABI = ERC20_ABI + [
 
 router = web3.eth.contract(address=ROUTER_ADDRESS, abi=router_abi)
 weth_contract = web3.eth.contract(address=WETH_ADDRESS, abi=WETH_ABI)
+multicall = Multicall(web3)
+
+# Symbol/decimals/pair di-cache di disk, cukup di-warm sekali saat start
+registry = TokenRegistry(web3, CHAIN_ID, WETH_ADDRESS, os.getenv("FACTORY_ADDRESS"))
+registry.warm(TOKEN_OUTS + [WETH_ADDRESS])
+
+# Allowance router dibaca sekali (batch) lalu dilacak lokal
+allowances = AllowanceManager(web3, account.address, ROUTER_ADDRESS)
+allowances.warm(TOKEN_OUTS + [WETH_ADDRESS])
+
+# Quote dihitung lokal dari reserve pair (butuh FACTORY_ADDRESS untuk cari pair)
+quoter = Quoter(web3, registry, WETH_ADDRESS, multicall)
+# TOKEN_OUTS diurutkan dari likuiditas + volume swap; pool tipis di-skip
+index = LiquidityIndex(web3, registry, quoter, TOKEN_OUTS)
+# Laju round dari ROUNDS_PER_MINUTE (token bucket), backoff per kelas error
+scheduler = Scheduler()
 
 # ==================== HELPERS ====================
 def get_token_symbol(token_addr):
+    return registry.symbol(token_addr)
+
+def send_tx(fn, action, params=None):
+    # Nonce diambil dari NonceManager, tidak menunggu receipt tx sebelumnya.
+    # Gas limit + fee dari GasPolicy sesuai jenis aksi (wrap/approve/swap/...)
+    nonce = nonces.allocate()
     try:
-        contract = web3.eth.contract(address=token_addr, abi=ERC20_ABI)
-        return contract.functions.symbol().call()
+        with METRICS.step(action):
+            tx = fn.build_transaction({
+                **gas.params(action),
+                **(params or {}),
+                'from': account.address,
+                'nonce': nonce,
+                'chainId': CHAIN_ID
+            })
+            signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
+            tx_hash = sender.send_raw(signed.raw_transaction)
     except Exception:
-        return "UNKNOWN"
+        nonces.release(nonce)
+        raise
+    nonces.mark_sent(nonce, tx_hash)
+    gas.track(tx_hash, action, tx['gas'])
+    events.track_tx(receipts, tx_hash, action, nonce, tx.get('value', 0))
+    return tx_hash
+
+def erc20(token):
+    return web3.eth.contract(address=token, abi=ERC20_ABI)
+
+def approve_token(token, amount):
+    # Ledger lokal: read/approve ke chain hanya kalau allowance tercatat kurang
+    if not allowances.needs_approval(token, amount):
+        print(f"✅ Sudah approve token {get_token_symbol(token)}")
+        return None
 
-def approve_token(token, amount, nonce):
+    approve_amount = allowances.approve_amount(amount)
     contract = web3.eth.contract(address=token, abi=ERC20_ABI)
-    allowance = contract.functions.allowance(account.address, ROUTER_ADDRESS).call()
-    if allowance >= amount:
-        print(f"✅ Sudah approve token {get_token_symbol(token)}")
-        return nonce
-
-    tx = contract.functions.approve(ROUTER_ADDRESS, amount).build_transaction({
-        'from': account.address,
-        'gas': 80000,
-        'gasPrice': web3.to_wei('0.01', 'gwei'),
-        'nonce': nonce,
-        'chainId': CHAIN_ID
-    })
-    signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+    tx_hash = send_tx(contract.functions.approve(ROUTER_ADDRESS, approve_amount), "approve")
+    allowances.approved(token, approve_amount)
     print(f"🔑 Approve {get_token_symbol(token)}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
-    web3.eth.wait_for_transaction_receipt(tx_hash)
-    return nonce + 1
-
-def wrap_eth(amount, nonce):
-    tx = weth_contract.functions.deposit().build_transaction({
-        'from': account.address,
-        'value': amount,
-        'gas': 100000,
-        'gasPrice': web3.to_wei('0.01', 'gwei'),
-        'nonce': nonce,
-        'chainId': CHAIN_ID
-    })
-    signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+    return tx_hash
+
+def wrap_eth(amount):
+    tx_hash = send_tx(weth_contract.functions.deposit(), "wrap", {'value': amount})
     print(f"💧 Wrap ETH: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
-    web3.eth.wait_for_transaction_receipt(tx_hash)
-    return nonce + 1
+    return tx_hash
 
-def swap_weth_to_token(amount_in, token_out, nonce):
+def quote(amount_in, path):
+    # Lokal dari reserve cache; router hanya dipanggil kalau pair belum di-cache
+    with METRICS.step("quote"):
+        amounts = quoter.get_amounts_out(amount_in, path)
+        if amounts is None:
+            amounts = router.functions.getAmountsOut(amount_in, path).call()
+    return amounts
+
+def swap_weth_to_token(amount_in, token_out, amounts_out=None, symbol=None):
     path = [WETH_ADDRESS, token_out]
-    amounts_out = router.functions.getAmountsOut(amount_in, path).call()
+    if amounts_out is None:
+        amounts_out = quote(amount_in, path)
     amount_out_min = int(amounts_out[-1] * (1 - SLIPPAGE))
     deadline = int(time.time()) + 600
 
-    tx = router.functions.swapExactTokensForTokens(
-        amount_in,
-        amount_out_min,
-        path,
-        account.address,
-        deadline
-    ).build_transaction({
-        'from': account.address,
-        'gas': 300000,
-        'gasPrice': web3.to_wei('0.01', 'gwei'),
-        'nonce': nonce,
-        'chainId': CHAIN_ID
-    })
-
-    signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
-    print(f"💱 Swap WETH → {get_token_symbol(token_out)}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
-    web3.eth.wait_for_transaction_receipt(tx_hash)
-    return nonce + 1
+    if NATIVE_ETH:
+        # ETH dikirim sebagai value, router yang wrap → tanpa wrap + approve WETH
+        tx_hash = send_tx(router.functions.swapExactETHForTokens(
+            amount_out_min,
+            path,
+            account.address,
+            deadline
+        ), "swap", {'value': amount_in})
+    else:
+        tx_hash = send_tx(router.functions.swapExactTokensForTokens(
+            amount_in,
+            amount_out_min,
+            path,
+            account.address,
+            deadline
+        ), "swap")
+        allowances.track(WETH_ADDRESS, amount_in)
+    print(f"💱 Swap {'ETH' if NATIVE_ETH else 'WETH'} → {symbol or get_token_symbol(token_out)}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
+    return tx_hash
 
 def get_token_balance(token):
-    contract = web3.eth.contract(address=token, abi=ERC20_ABI)
+    contract = erc20(token)
     return contract.functions.balanceOf(account.address).call()
 
-def get_token_price_in_weth(token_out, amount_token):
-    # Hitung berapa WETH setara dengan amount_token token_out
-    path = [token_out, WETH_ADDRESS]
-    amounts = router.functions.getAmountsOut(amount_token, path).call()
-    # amounts[0] = token_out, amounts[1] = WETH
-    return amounts[1]
-
-def add_liquidity(token_address, weth_amount, token_amount, nonce):
-    token_symbol = get_token_symbol(token_address)
+def read_round_state(tokens, amount_in):
+    """
+    Semua read awal round dalam satu eth_call: saldo ETH dan reserve semua
+    pair, lalu quote dihitung lokal. Token tanpa pair di registry di-quote
+    lewat router di batch yang sama. Token tanpa pool → quote None. Symbol
+    diambil dari registry dan allowance dari ledger, bukan dari RPC.
+    """
+    batch = multicall.batch()
+    balance_slot = batch.add_eth_balance(account.address)
+    apply_reserves = quoter.refresh(tokens, batch)
+    router_slots = {
+        token: batch.add(router.functions.getAmountsOut(amount_in, [WETH_ADDRESS, token]))
+        for token in tokens if registry.pair(token) is None
+    }
+    # Saldo + reserve (+ quote router) satu eth_call = langkah "quote" round ini
+    with METRICS.step("quote"):
+        results = batch.execute()
+    apply_reserves(results)
+
+    balance = results[balance_slot]
+    per_token = {}
+    for token in tokens:
+        amounts_out = quoter.get_amounts_out(amount_in, [WETH_ADDRESS, token])
+        if amounts_out is None and token in router_slots:
+            amounts_out = results[router_slots[token]]
+        per_token[token] = {
+            "amounts_out": amounts_out,
+            "symbol": registry.symbol(token),
+        }
+    return balance, per_token
+
+def plan_zap(token_out, total_eth, amounts_out):
+    """
+    Swap sebagian `total_eth` lalu add LP dengan sisanya, dihitung dari
+    reserve pair supaya kedua sisi pas dengan rasio pool sesudah swap.
+    Pair yang reserve-nya tidak di-cache: setengah-setengah dengan quote router.
+    """
+    plan = quoter.plan_zap(total_eth, token_out, SLIPPAGE)
+    if plan is not None:
+        return plan
+    half_eth = total_eth // 2
+    if not amounts_out or amounts_out[-1] == 0:
+        return None
+    # Sisi token LP = hasil swap minimum, supaya add LP tidak revert kalau swap kena slippage
+    amount_out_min = int(amounts_out[-1] * (1 - SLIPPAGE))
+    return {
+        "swap_in": half_eth,
+        "token_out": amounts_out[-1],
+        "amount_out_min": amount_out_min,
+        "weth_for_lp": half_eth,
+        "token_for_lp": amount_out_min,
+    }
+
+def add_liquidity(token_address, weth_amount, token_amount, token_symbol=None):
+    token_symbol = token_symbol or get_token_symbol(token_address)
     print("📊 Detail Add Liquidity:")
     print(f" - Token Pair: {token_symbol} ({token_address})")
     print(f" - WETH Amount: {web3.from_wei(weth_amount, 'ether')} WETH")
@@ -139,7 +237,20 @@ def add_liquidity(token_address, weth_amount, token_amount, nonce):
 
     deadline = int(time.time()) + 600
 
-    tx = router.functions.addLiquidity(
+    if NATIVE_ETH:
+        tx_hash = send_tx(router.functions.addLiquidityETH(
+            token_address,
+            token_amount,
+            int(token_amount * (1 - SLIPPAGE)),
+            int(weth_amount * (1 - SLIPPAGE)),
+            account.address,
+            deadline
+        ), "add_liquidity", {'value': weth_amount})
+        allowances.track(token_address, token_amount)
+        print(f"✅ Add LP ETH + {token_symbol}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
+        return tx_hash
+
+    tx_hash = send_tx(router.functions.addLiquidity(
         WETH_ADDRESS,
         token_address,
         weth_amount,
@@ -148,91 +259,67 @@ def add_liquidity(token_address, weth_amount, token_amount, nonce):
         int(token_amount * (1 - SLIPPAGE)),
         account.address,
         deadline
-    ).build_transaction({
-        'from': account.address,
-        'gas': 400000,
-        'gasPrice': web3.to_wei('0.01', 'gwei'),
-        'nonce': nonce,
-        'chainId': CHAIN_ID
-    })
-
-    signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+    ), "add_liquidity")
+    allowances.track(token_address, token_amount)
+    allowances.track(WETH_ADDRESS, weth_amount)
     print(f"✅ Add LP WETH + {token_symbol}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
-    web3.eth.wait_for_transaction_receipt(tx_hash)
-    return nonce + 1
+    return tx_hash
 
 # ==================== MAIN LOOP ====================
 def run():
+    events.bind(wallet=account.address, strategy="swap_lp")
+    if APPROVE_ON_START:
+        tokens = TOKEN_OUTS if NATIVE_ETH else TOKEN_OUTS + [WETH_ADDRESS]
+        sent = allowances.warm_up(tokens, approve_token)
+        if sent:
+            nonces.wait(sent[-1])
+
     while True:
         try:
+            scheduler.wait()
+            events.emit("round_start")
             print(f"\n====== [ROUND] {datetime.now().isoformat()} ======")
-            balance = web3.eth.get_balance(account.address)
+            # Total per round dibatasi supaya sisi WETH LP (± setengahnya) tidak lewat MAX_WETH_FOR_LP
+            total_eth = min(TOTAL_ETH_TO_USE, MAX_WETH_FOR_LP * 2)
+            balance, token_state = read_round_state(TOKEN_OUTS, total_eth // 2)
             print(f"💰 Saldo: {web3.from_wei(balance, 'ether')} ETH")
 
             if balance < web3.to_wei('0.001', 'ether'):
                 print("⚠️ Saldo terlalu kecil.")
-                time.sleep(15)
+                scheduler.backoff("balance")
                 continue
 
-            token_out = random.choice(TOKEN_OUTS)
-            token_symbol = get_token_symbol(token_out)
-            total_eth = TOTAL_ETH_TO_USE
-            half_eth = total_eth // 2
-            nonce = web3.eth.get_transaction_count(account.address)
-
-            # Wrap half ETH ke WETH untuk swap
-            nonce = wrap_eth(half_eth, nonce)
-
-            # Approve WETH untuk swap
-            nonce = approve_token(WETH_ADDRESS, half_eth, nonce)
-
-            # Swap WETH ke token_out
-            nonce = swap_weth_to_token(half_eth, token_out, nonce)
-
-            print("⏳ Menunggu token settle...")
-            time.sleep(4)
-
-            # Cek saldo token hasil swap
-            token_balance = get_token_balance(token_out)
-            if token_balance == 0:
-                print(f"⚠️ Tidak dapat token {token_symbol} setelah swap, skip loop")
-                time.sleep(10)
+            tradable = [token for token in TOKEN_OUTS if token_state[token]["amounts_out"]]
+            if not tradable:
+                print("⚠️ Tidak ada token dengan pool, skip loop")
+                scheduler.backoff("skip")
                 continue
 
-            # Hitung berapa WETH setara dengan token_balance
-            weth_needed = get_token_price_in_weth(token_out, token_balance)
-            weth_for_lp = int(weth_needed * (1 + SLIPPAGE))
+            index.refresh_if_stale()
+            token_out = index.choose(exclude=set(TOKEN_OUTS) - set(tradable))
+            state = token_state[token_out]
+            token_symbol = state["symbol"]
 
-            if weth_for_lp > MAX_WETH_FOR_LP:
-                print(f"⚠️ Token terlalu mahal, batasi WETH LP ke {web3.from_wei(MAX_WETH_FOR_LP, 'ether')} ETH")
-                weth_for_lp = MAX_WETH_FOR_LP
-
-                # Hitung ulang token_balance yang seimbang dengan WETH
-                token_balance = router.functions.getAmountsOut(weth_for_lp, [WETH_ADDRESS, token_out]).call()[1]
-
-            eth_balance = web3.eth.get_balance(account.address)
-            if weth_for_lp > eth_balance:
-                print(f"⚠️ ETH balance {web3.from_wei(eth_balance, 'ether')} kurang untuk LP, pakai maksimal")
-                weth_for_lp = eth_balance
-
-            # Wrap ETH untuk LP
-            nonce = wrap_eth(weth_for_lp, nonce)
-
-            # Approve token dan WETH untuk add liquidity
-            nonce = approve_token(token_out, token_balance, nonce)
-            nonce = approve_token(WETH_ADDRESS, weth_for_lp, nonce)
-
-            # Add liquidity dengan nilai seimbang
-            nonce = add_liquidity(token_out, weth_for_lp, token_balance, nonce)
+            plan = plan_zap(token_out, total_eth, state["amounts_out"])
+            if plan is None:
+                print(f"⚠️ Swap {token_symbol} menghasilkan 0 token, skip loop")
+                scheduler.backoff("skip")
+                continue
 
-            print("⏳ Delay 5-10 detik...\n")
-            time.sleep(random.randint(5, 10))
+            # Wrap → swap → add LP direncanakan di depan dan di-broadcast berurutan;
+            # cukup tunggu receipt add LP (swap revert → add LP ikut revert)
+            if not NATIVE_ETH:
+                wrap_eth(total_eth)
+                approve_token(WETH_ADDRESS, total_eth)
+            swap_weth_to_token(plan["swap_in"], token_out, [plan["swap_in"], plan["token_out"]], token_symbol)
+            approve_token(token_out, plan["token_for_lp"])
+            lp_hash = add_liquidity(token_out, plan["weth_for_lp"], plan["token_for_lp"], token_symbol)
+            allowances.settle(nonces.wait(lp_hash).status)
+            scheduler.succeeded()
 
         except Exception as e:
             print(f"❌ ERROR (main loop): {e}")
-            print("🔁 Coba lagi dalam 10 detik...\n")
-            time.sleep(10)
+            scheduler.failed(e)
 
 
 if __name__ == "__main__":
@@ -7,6 +7,20 @@ from decimal import Decimal, getcontext
 from dotenv import load_dotenv
 from web3 import Web3
 from scripts.token_outs import TOKEN_OUTS
+from scripts.rpc import MultiEndpointProvider, rpc_urls
+from scripts.nonce_manager import NonceManager
+from scripts.receipt_tracker import ReceiptTracker
+from scripts.realtime import RealtimeSender
+from scripts.gas_policy import GasPolicy
+from scripts.token_registry import TokenRegistry
+from scripts.allowance_manager import AllowanceManager, APPROVE_ON_START
+from scripts.multicall import Multicall
+from scripts.quoter import Quoter
+from scripts.liquidity_index import LiquidityIndex
+from scripts.lp_positions import LpPositions
+from scripts.scheduler import Scheduler
+from scripts.metrics import METRICS, instrument
+from scripts import events
 
 # ==================== SETUP ====================
 getcontext().prec = 18
@@ -24,11 +38,22 @@ CHAIN_ID = int(require_env("CHAIN_ID"))
 ROUTER_ADDRESS = Web3.to_checksum_address(require_env("ROUTER_ADDRESS"))
 FACTORY_ADDRESS = Web3.to_checksum_address(require_env("FACTORY_ADDRESS"))
 WETH_ADDRESS = Web3.to_checksum_address("0x776401b9bc8aae31a685731b7147d4445fd9fb19")
+EXPLORER_TX = "https://web3.okx.com/explorer/megaeth-testnet/tx/"
 
 SLIPPAGE = 0.1
-
-web3 = Web3(Web3.HTTPProvider(RPC_URL))
+# NATIVE_ETH=1 (default): swapExactETHForTokens / addLiquidityETH langsung dengan ETH,
+# tanpa wrap + approve WETH. Isi NATIVE_ETH=0 untuk jalur WETH lama.
+NATIVE_ETH = os.getenv("NATIVE_ETH", "1") == "1"
+
+# Semua endpoint di RPC_URL + RPC_URLS, read ke node tercepat, tx di-pin ke satu node
+web3 = Web3(MultiEndpointProvider(rpc_urls(RPC_URL)))
+# Call + latency per method RPC, /metrics (METRICS_PORT) dan ringkasan berkala di log
+instrument(web3)
 account = web3.eth.account.from_key(PRIVATE_KEY)
+receipts = ReceiptTracker(web3)
+nonces = NonceManager(web3, account.address, receipts)
+sender = RealtimeSender(web3, receipts)
+gas = GasPolicy(web3, receipts, CHAIN_ID)
 
 # ==================== ABIs ====================
 with open("scripts/abi/uniswap_v2_router.json") as f:
@@ -45,229 +70,275 @@ WETH_ABI = ERC20_ABI + [
     {"name": "deposit", "outputs": [], "inputs": [], "stateMutability": "payable", "type": "function"},
 ]
 
-factory_abi = [{
-    "name": "getPair",
-    "type": "function",
-    "inputs": [
-        { "name": "tokenA", "type": "address" },
-        { "name": "tokenB", "type": "address" }
-    ],
-    "outputs": [
-        { "name": "pair", "type": "address" }
-    ],
-    "stateMutability": "view"
-}]
-
 router = web3.eth.contract(address=ROUTER_ADDRESS, abi=router_abi)
-factory = web3.eth.contract(address=FACTORY_ADDRESS, abi=factory_abi)
 weth_contract = web3.eth.contract(address=WETH_ADDRESS, abi=WETH_ABI)
+multicall = Multicall(web3)
+
+# Symbol/decimals/pair di-cache di disk, cukup di-warm sekali saat start
+registry = TokenRegistry(web3, CHAIN_ID, WETH_ADDRESS, FACTORY_ADDRESS)
+registry.warm(TOKEN_OUTS + [WETH_ADDRESS])
+
+# Allowance router dibaca sekali (batch) lalu dilacak lokal
+allowances = AllowanceManager(web3, account.address, ROUTER_ADDRESS)
+allowances.warm(TOKEN_OUTS + [WETH_ADDRESS])
+
+# Quote dihitung lokal dari reserve pair
+quoter = Quoter(web3, registry, WETH_ADDRESS, multicall)
+# TOKEN_OUTS diurutkan dari likuiditas + volume swap; pool tipis di-skip
+index = LiquidityIndex(web3, registry, quoter, TOKEN_OUTS)
+# Posisi LP per pair dari receipt add/remove sendiri, di-sweep berkala (balanceOf batch)
+positions = LpPositions(CHAIN_ID, account.address, WETH_ADDRESS, registry)
+# Laju round dari ROUNDS_PER_MINUTE (token bucket), backoff per kelas error
+scheduler = Scheduler()
 
 # ==================== HELPERS ====================
 def get_token_symbol(token_addr):
+    return registry.symbol(token_addr)
+
+def send_tx(fn, action, params=None):
+    # Nonce diambil dari NonceManager, tidak menunggu receipt tx sebelumnya.
+    # Gas limit + fee dari GasPolicy sesuai jenis aksi (wrap/approve/swap/...)
+    nonce = nonces.allocate()
     try:
-        contract = web3.eth.contract(address=token_addr, abi=ERC20_ABI)
-        return contract.functions.symbol().call()
-    except:
-        return "UNKNOWN"
+        with METRICS.step(action):
+            tx = fn.build_transaction({
+                **gas.params(action),
+                **(params or {}),
+                'from': account.address,
+                'nonce': nonce,
+                'chainId': CHAIN_ID
+            })
+            signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
+            tx_hash = sender.send_raw(signed.raw_transaction)
+    except Exception:
+        nonces.release(nonce)
+        raise
+    nonces.mark_sent(nonce, tx_hash)
+    gas.track(tx_hash, action, tx['gas'])
+    events.track_tx(receipts, tx_hash, action, nonce, tx.get('value', 0))
+    return tx_hash
+
+def approve_token(token, amount):
+    # Ledger lokal: read/approve ke chain hanya kalau allowance tercatat kurang
+    if not allowances.needs_approval(token, amount):
+        print(f"✅ Sudah approve token {get_token_symbol(token)}")
+        return None
 
-def approve_token(token, amount, nonce):
+    approve_amount = allowances.approve_amount(amount)
     contract = web3.eth.contract(address=token, abi=ERC20_ABI)
-    allowance = contract.functions.allowance(account.address, ROUTER_ADDRESS).call()
-    if allowance >= amount:
-        print(f"✅ Sudah approve token {get_token_symbol(token)}")
-        return nonce
-
-    tx = contract.functions.approve(ROUTER_ADDRESS, amount).build_transaction({
-        'from': account.address,
-        'gas': 80000,
-        'gasPrice': web3.to_wei('0.01', 'gwei'),
-        'nonce': nonce,
-        'chainId': CHAIN_ID
-    })
-    signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+    tx_hash = send_tx(contract.functions.approve(ROUTER_ADDRESS, approve_amount), "approve")
+    allowances.approved(token, approve_amount)
     print(f"🔑 Approve {get_token_symbol(token)}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
-    web3.eth.wait_for_transaction_receipt(tx_hash)
-    return nonce + 1
-
-def wrap_eth(amount, nonce):
-    tx = weth_contract.functions.deposit().build_transaction({
-        'from': account.address,
-        'value': amount,
-        'gas': 100000,
-        'gasPrice': web3.to_wei('0.01', 'gwei'),
-        'nonce': nonce,
-        'chainId': CHAIN_ID
-    })
-    signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
-    print(f"💧 Wrap ETH: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
-    web3.eth.wait_for_transaction_receipt(tx_hash)
-    return nonce + 1
+    return tx_hash
 
-def get_lp_token_address(token_a, token_b):
-    # Urutkan agar konsisten sesuai UniswapV2 getPair
-    if token_a.lower() > token_b.lower():
-        token_a, token_b = token_b, token_a
-    return factory.functions.getPair(token_a, token_b).call()
+def wrap_eth(amount):
+    tx_hash = send_tx(weth_contract.functions.deposit(), "wrap", {'value': amount})
+    print(f"💧 Wrap ETH: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
+    return tx_hash
 
 # ==================== SWAP & LP ====================
-def swap_and_add_liquidity(token_address, eth_amount, nonce):
+def read_round_state(token_address, eth_amount):
+    """Saldo dan reserve pair round ini dalam satu eth_call; symbol & pair dari registry."""
     path = [WETH_ADDRESS, token_address]
-    symbol = get_token_symbol(token_address)
-
-    nonce = wrap_eth(eth_amount, nonce)
-    nonce = approve_token(WETH_ADDRESS, eth_amount, nonce)
-
-    try:
-        amount_out = router.functions.getAmountsOut(eth_amount, path).call()[1]
-    except Exception as e:
-        print(f"❌ Gagal getAmountsOut: {e}")
-        return nonce
-
-    min_out = int(amount_out * (1 - SLIPPAGE))
-
-    tx = router.functions.swapExactTokensForTokens(
-        eth_amount, min_out, path, account.address, int(time.time()) + 600
-    ).build_transaction({
-        'from': account.address,
-        'gas': 240000,
-        'gasPrice': web3.to_wei('0.01', 'gwei'),
-        'nonce': nonce,
-        'chainId': CHAIN_ID
-    })
-    signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+    batch = multicall.batch()
+    balance_slot = batch.add_eth_balance(account.address)
+    apply_reserves = quoter.refresh([token_address], batch)
+    # Saldo + reserve (+ quote router) satu eth_call = langkah "quote" round ini
+    with METRICS.step("quote"):
+        results = batch.execute()
+    apply_reserves(results)
+
+    balance = results[balance_slot]
+    amounts_out = quoter.get_amounts_out(eth_amount, path)
+    return {
+        "balance": balance,
+        "symbol": registry.symbol(token_address),
+        "amounts_out": amounts_out,
+        "pair_address": registry.pair(token_address),
+    }
+
+def swap_and_add_liquidity(token_address, eth_amount, state):
+    path = [WETH_ADDRESS, token_address]
+    symbol = state["symbol"]
+
+    if not state["amounts_out"]:
+        print(f"❌ Gagal getAmountsOut: token {symbol} tidak ada pool")
+        return None
+
+    # Modal round = 2x eth_amount (swap + LP). Porsi swap dihitung dari reserve
+    # supaya hasil swap + sisa ETH pas dengan rasio pool sesudah swap.
+    total_eth = eth_amount * 2
+    plan = quoter.plan_zap(total_eth, token_address, SLIPPAGE)
+    if plan is None:
+        amount_out = state["amounts_out"][1]
+        # Sisi token LP = hasil swap minimum, supaya add LP tidak revert kalau swap kena slippage
+        amount_out_min = int(amount_out * (1 - SLIPPAGE))
+        plan = {"swap_in": eth_amount, "token_out": amount_out, "amount_out_min": amount_out_min,
+                "weth_for_lp": eth_amount, "token_for_lp": amount_out_min}
+    if plan["token_out"] == 0:
+        print(f"❌ Swap {symbol} menghasilkan 0 token")
+        return None
+    min_out = plan["amount_out_min"]
+    weth_for_lp, token_for_lp = plan["weth_for_lp"], plan["token_for_lp"]
+
+    if NATIVE_ETH:
+        # Swap ETH → token lalu addLiquidityETH: 2 tx (+ approve token sekali saja)
+        tx_hash = send_tx(router.functions.swapExactETHForTokens(
+            min_out, path, account.address, int(time.time()) + 600
+        ), "swap", {'value': plan["swap_in"]})
+        print(f"💱 Swap ETH → {symbol}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
+
+        approve_token(token_address, token_for_lp)
+
+        tx_hash = send_tx(router.functions.addLiquidityETH(
+            token_address,
+            token_for_lp,
+            int(token_for_lp * (1 - SLIPPAGE)),
+            int(weth_for_lp * (1 - SLIPPAGE)),
+            account.address,
+            int(time.time()) + 600
+        ), "add_liquidity", {'value': weth_for_lp})
+        allowances.track(token_address, token_for_lp)
+        print(f"✅ Add LP ETH + {symbol}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
+        return tx_hash
+
+    # Semua tx round ini di-broadcast berurutan, receipt cukup ditunggu di akhir.
+    # Satu wrap & approve WETH untuk swap + LP sekaligus.
+    wrap_eth(total_eth)
+    approve_token(WETH_ADDRESS, total_eth)
+
+    tx_hash = send_tx(router.functions.swapExactTokensForTokens(
+        plan["swap_in"], min_out, path, account.address, int(time.time()) + 600
+    ), "swap")
+    allowances.track(WETH_ADDRESS, plan["swap_in"])
     print(f"💱 Swap WETH → {symbol}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
-    web3.eth.wait_for_transaction_receipt(tx_hash)
-    nonce += 1
 
-    nonce = approve_token(token_address, amount_out, nonce)
+    approve_token(token_address, token_for_lp)
 
-    tx = router.functions.addLiquidity(
+    tx_hash = send_tx(router.functions.addLiquidity(
         WETH_ADDRESS,
         token_address,
-        eth_amount,
-        amount_out,
-        int(eth_amount * (1 - SLIPPAGE)),
-        int(amount_out * (1 - SLIPPAGE)),
+        weth_for_lp,
+        token_for_lp,
+        int(weth_for_lp * (1 - SLIPPAGE)),
+        int(token_for_lp * (1 - SLIPPAGE)),
         account.address,
         int(time.time()) + 600
-    ).build_transaction({
-        'from': account.address,
-        'gas': 400000,
-        'gasPrice': web3.to_wei('0.01', 'gwei'),
-        'nonce': nonce,
-        'chainId': CHAIN_ID
-    })
-    signed = web3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+    ), "add_liquidity")
+    allowances.track(WETH_ADDRESS, weth_for_lp)
+    allowances.track(token_address, token_for_lp)
     print(f"✅ Add LP WETH + {symbol}: https://web3.okx.com/explorer/megaeth-testnet/tx/{tx_hash.hex()}")
-    web3.eth.wait_for_transaction_receipt(tx_hash)
-
-    return nonce + 1
-
-def sort_tokens(token_a, token_b):
-    return (token_a, token_b) if token_a.lower() < token_b.lower() else (token_b, token_a)
-
-def get_pair_address(tokenA, tokenB):
-    factory = web3.eth.contract(address=FACTORY_ADDRESS, abi=factory_abi)
-    return factory.functions.getPair(tokenA, tokenB).call()
-
-def get_lp_token(pair_address):
-    return web3.eth.contract(address=pair_address, abi=ERC20_ABI)
-
+    return tx_hash
 
 #============= REMOVE LP ====================#
-def remove_lp(token0, token1, nonce):
-    # Cek pair address
-    pair_address = get_pair_address(token0, token1)
-    lp_token = get_lp_token(pair_address)
-
-    # Ambil balance LP yang tersedia
-    lp_balance = lp_token.functions.balanceOf(account.address).call()
-    if lp_balance == 0:
-        print(f"❌ Tidak ada LP untuk pair {token0[:6]}... / {token1[:6]}...")
-        return nonce
-
-    # Hitung 30% dari total LP
-    remove_amount = int(lp_balance * 0.3)
-    print(f"🔥 Menghapus {remove_amount / (10 ** 18):.6f} LP ({int((remove_amount/lp_balance)*100)}%) dari {lp_balance / (10 ** 18):.6f} total LP")
-
-    # Approve router untuk LP
-    tx = lp_token.functions.approve(ROUTER_ADDRESS, remove_amount).build_transaction({
-        'from': account.address,
-        'nonce': nonce,
-        'gas': 200000,
-        'gasPrice': web3.to_wei('0.02', 'gwei'),
-    })
-    signed_tx = web3.eth.account.sign_transaction(tx, private_key=PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-    print(f"🔑 Approve LP: {EXPLORER_TX}{web3.to_hex(tx_hash)}")
-    web3.eth.wait_for_transaction_receipt(tx_hash)
-    nonce += 1
-
-    # Remove liquidity
-    tx = router.functions.removeLiquidityETH(
-        token0,
-        remove_amount,
-        0,
-        0,
-        account.address,
-        int(time.time()) + 1000
-    ).build_transaction({
-        'from': account.address,
-        'nonce': nonce,
-        'gas': 300000,
-        'gasPrice': web3.to_wei('0.01', 'gwei'),
-    })
-    signed_tx = web3.eth.account.sign_transaction(tx, private_key=PRIVATE_KEY)
-    tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-    print(f"✅ Remove LP: {EXPLORER_TX}{web3.to_hex(tx_hash)}")
-    web3.eth.wait_for_transaction_receipt(tx_hash)
-    nonce += 1
-
-    return nonce
+def plan_removals():
+    """Sweep posisi LP (totalSupply + balanceOf berkala) dan reserve pair-nya dalam satu eth_call."""
+    tokens = positions.candidates(TOKEN_OUTS)
+    if not tokens:
+        return []
+    batch = multicall.batch()
+    apply_positions = positions.refresh(web3, batch, tokens)
+    apply_reserves = quoter.refresh(tokens, batch)
+    with METRICS.step("quote"):
+        results = batch.execute()
+    apply_reserves(results)
+    apply_positions(results)
+    return positions.plan(quoter.reserves)
+
+def remove_positions():
+    # Beberapa pair per siklus: approve + remove di-broadcast berurutan tanpa menunggu receipt
+    plans = plan_removals()
+    if not plans:
+        print("ℹ️ Tidak ada posisi LP untuk ditarik")
+        return None
+    # Pair yang tidak sampai di-track (tx gagal dikirim) dilepas lagi dari in-flight
+    tracked = 0
+    try:
+        allowances.warm([plan["pair"] for plan in plans])
+
+        tx_hash = None
+        for plan in plans:
+            token, pair_address, liquidity = plan["token"], plan["pair"], plan["liquidity"]
+            symbol = get_token_symbol(token)
+            cost = "?" if plan["cost_eth"] is None else f"{plan['cost_eth'] / 10 ** 18:.8f}"
+            print(f"🔥 Menghapus {liquidity / (10 ** 18):.6f} LP {symbol} (nilai ~{plan['value_eth'] / 10 ** 18:.8f} ETH, modal {cost} ETH)")
+
+            if allowances.needs_approval(pair_address, liquidity):
+                approve_amount = allowances.approve_amount(liquidity)
+                lp_token = web3.eth.contract(address=pair_address, abi=ERC20_ABI)
+                approve_hash = send_tx(lp_token.functions.approve(ROUTER_ADDRESS, approve_amount), "approve")
+                allowances.approved(pair_address, approve_amount)
+                print(f"🔑 Approve LP {symbol}: {EXPLORER_TX}{web3.to_hex(approve_hash)}")
+
+            # Minimum dari reserve + totalSupply terbaru (LP_REMOVE_SLIPPAGE), bukan 0
+            tx_hash = send_tx(router.functions.removeLiquidityETH(
+                token,
+                liquidity,
+                plan["amount_token_min"],
+                plan["amount_eth_min"],
+                account.address,
+                int(time.time()) + 1000
+            ), "remove_liquidity")
+            allowances.track(pair_address, liquidity)
+            positions.track_remove(receipts, tx_hash, token)
+            tracked += 1
+            print(f"✅ Remove LP {symbol}: {EXPLORER_TX}{web3.to_hex(tx_hash)}")
+    finally:
+        for plan in plans[tracked:]:
+            positions.release(plan["token"])
+    return tx_hash
+
 # ==================== LOOP ====================
 lp_counter = 0
 target_remove_interval = random.randint(2, 5)
 
 def run():
     global lp_counter, target_remove_interval
+    events.bind(wallet=account.address, strategy="swap_lp_remove")
+    if APPROVE_ON_START:
+        tokens = TOKEN_OUTS if NATIVE_ETH else TOKEN_OUTS + [WETH_ADDRESS]
+        sent = allowances.warm_up(tokens, approve_token)
+        if sent:
+            nonces.wait(sent[-1])
+
     while True:
         try:
+            scheduler.wait()
+            events.emit("round_start")
             print(f"\n====== [LOOP] {datetime.now().isoformat()} ======")
-            balance = web3.eth.get_balance(account.address)
+            index.refresh_if_stale()
+            token = index.choose()
+            eth_amount = web3.to_wei(0.00003, 'ether')
+            state = read_round_state(token, eth_amount)
+
+            balance = state["balance"]
             print(f"💰 Saldo: {web3.from_wei(balance, 'ether')} ETH")
 
             if balance < web3.to_wei('0.001', 'ether'):
                 print("⚠️ Saldo terlalu kecil.")
-                time.sleep(10)
+                scheduler.backoff("balance")
                 continue
 
-            token = random.choice(TOKEN_OUTS)
-            eth_amount = web3.to_wei(0.00003, 'ether')
-            nonce = web3.eth.get_transaction_count(account.address)
-
-            swap_and_add_liquidity(token, eth_amount, nonce)
+            tx_hash = swap_and_add_liquidity(token, eth_amount, state)
+            if tx_hash is None:
+                scheduler.backoff("skip")
+                continue
+            positions.track_add(receipts, tx_hash, token, state["pair_address"], quoter.reserves.get(token))
+            allowances.settle(nonces.wait(tx_hash).status)
             lp_counter += 1
 
             if lp_counter >= target_remove_interval:
                 print(f"🔁 Target {target_remove_interval} LP reached, removing LP...")
-                nonce = web3.eth.get_transaction_count(account.address)
-                token0, token1 = sort_tokens(WETH_ADDRESS, token)
-                nonce = remove_lp(token0, token1, nonce)
+                tx_hash = remove_positions()
+                if tx_hash is not None:
+                    allowances.settle(nonces.wait(tx_hash).status)
                 lp_counter = 0
                 target_remove_interval = random.randint(3, 5)
-
-
-            sleep_time = random.randint(5, 10)
-            print(f"⏳ Tidur {sleep_time} detik...\n")
-            time.sleep(sleep_time)
+            scheduler.succeeded()
 
         except Exception as e:
             print(f"❌ ERROR: {e}")
-            time.sleep(10)
+            scheduler.failed(e)
 
 if __name__ == "__main__":
     run()
@@ -0,0 +1,340 @@
+"""
+Backtest strategi swap / lp / swap_lp / swap_lp_remove terhadap histori
+reserve pair (event Sync dari scripts.chain_index), dengan pool constant
+product yang disimulasikan.
+
+Setiap round: quote dari reserve di block round, eksekusi di reserve
+BT_DELAY_BLOCKS kemudian (slippage check / min amount seperti router),
+nilai LP dan token dihitung BT_HOLD_BLOCKS kemudian: bagian pool kita x
+reserve saat itu (fee yang masuk pool ikut terhitung), dengan totalSupply
+LP diikuti dari event Mint/Burn. Semua kombinasi
+parameter (SLIPPAGE x TOTAL_ETH_TO_USE x MAX_WETH_FOR_LP x porsi swap)
+dihitung sekaligus sebagai array numpy [kombinasi x round], tanpa loop
+Python per round.
+
+    python -m scripts.backtest [swap|lp|swap_lp|swap_lp_remove|all] [token|all] [block_terakhir]
+
+Butuh: pip install numpy, dan data index (python -m scripts.chain_index backfill)
+"""
+import os
+import sys
+import time
+import itertools
+import numpy as np
+from scripts.chain_index import open_index, INDEX_DIR
+from scripts.journal import JOURNAL_WRITER
+from scripts.quoter import FEE_NUMERATOR, FEE_DENOMINATOR
+
+
+def env_list(key, default):
+    return [value.strip() for value in os.getenv(key, default).split(",") if value.strip()]
+
+
+# Grid parameter (ETH untuk jumlah); porsi swap "zap" = optimal dari reserve (quoter.plan_zap)
+BT_SLIPPAGE = [float(v) for v in env_list("BT_SLIPPAGE", "0.005,0.01,0.02,0.05,0.1")]
+BT_TOTAL_ETH = [float(v) for v in env_list("BT_TOTAL_ETH", "0.00002,0.00005,0.0001,0.0005,0.001")]
+BT_MAX_WETH_FOR_LP = [float(v) for v in env_list("BT_MAX_WETH_FOR_LP", "0.00004,0.00008,0.0002,0.001")]
+BT_SWAP_FRACTION = env_list("BT_SWAP_FRACTION", "zap,0.3,0.4,0.5,0.6")
+# Jumlah round per pair (tersebar rata di histori), jeda quote → eksekusi, lama LP dipegang (block)
+BT_ROUNDS = int(os.getenv("BT_ROUNDS", "5000"))
+BT_DELAY_BLOCKS = int(os.getenv("BT_DELAY_BLOCKS", "1"))
+BT_HOLD_BLOCKS = int(os.getenv("BT_HOLD_BLOCKS", "600"))
+# Harga gas kalau jurnal trade belum ada (gwei) dan baris hasil yang ditampilkan
+BT_GAS_GWEI = float(os.getenv("BT_GAS_GWEI", "0.001"))
+BT_TOP = int(os.getenv("BT_TOP", "10"))
+
+# gasUsed per aksi kalau jurnal belum punya sample
+GAS_USED = {"swap": 120000, "add_liquidity": 180000, "remove_liquidity": 150000}
+# Nilai yang dipakai strategi live sekarang, ditandai ◀ di laporan
+LIVE = {"slippage": 0.1, "total_eth": 0.00005, "max_weth_for_lp": 0.00008, "swap_fraction": "zap"}
+# swap_lp_remove: rata-rata satu remove per 4 round (target_remove_interval 3-5)
+REMOVE_PER_ROUND = 0.25
+STRATEGIES = ["swap", "lp", "swap_lp", "swap_lp_remove"]
+GAMMA = FEE_NUMERATOR / FEE_DENOMINATOR
+
+
+# ==================== POOL (vektor) ====================
+def amount_out(amount_in, reserve_in, reserve_out):
+    """getAmountOut UniswapV2 dalam float (array)."""
+    with_fee = amount_in * GAMMA
+    return with_fee * reserve_out / (reserve_in + with_fee)
+
+
+def optimal_swap(amount_in, reserve_in):
+    """quoter.optimal_swap_amount dalam float (array)."""
+    n, d = FEE_NUMERATOR, FEE_DENOMINATOR
+    return (np.sqrt(reserve_in * (reserve_in * (d + n) ** 2 + 4 * n * d * amount_in)) - reserve_in * (d + n)) / (2 * n)
+
+
+def add_liquidity(weth, token, slippage, reserve_weth, reserve_token):
+    """
+    Router.addLiquidity: amount yang terpakai di rasio reserve saat eksekusi,
+    LP yang didapat sebagai fraksi totalSupply saat itu (UniswapV2Pair.mint:
+    min(amount / reserve) x supply), dan `ok` = minimum (1 - slippage) terpenuhi.
+    """
+    token_optimal = weth * reserve_token / reserve_weth
+    weth_side = token_optimal <= token
+    weth_optimal = token * reserve_weth / reserve_token
+    used_weth = np.where(weth_side, weth, weth_optimal)
+    used_token = np.where(weth_side, token_optimal, token)
+    ok = np.where(weth_side, token_optimal >= token * (1 - slippage), weth_optimal >= weth * (1 - slippage))
+    minted = np.minimum(used_weth / reserve_weth, used_token / reserve_token)
+    return used_weth, used_token, minted, ok
+
+
+def lp_value(minted, exec_supply, hold_supply, hold_weth):
+    """
+    Nilai LP dalam ETH saat hold: LP kita (`minted` x supply saat eksekusi)
+    dibanding supply histori saat hold, dikali reserve saat itu — kedua sisi
+    hasil burn, sisi token dinilai di harga pool, jadi fee yang menumpuk di
+    reserve ikut masuk. Supply dalam log (lihat `history`).
+    """
+    share = minted * np.exp(exec_supply - hold_supply)
+    return 2 * share * hold_weth
+
+
+# ==================== HISTORI ====================
+def event_keys(columns, mask):
+    """Urutan event di chain: (block, log_index) jadi satu kunci uint64."""
+    return (np.asarray(columns["block"][mask]).astype(np.uint64) << np.uint64(32)) | np.asarray(columns["log_index"][mask])
+
+
+def supply_changes(index, pair_id, keys, reserve0, reserve1):
+    """
+    log(totalSupply) LP relatif di tiap event Sync, dari Mint/Burn pair ini.
+    Sync milik Mint/Burn ada tepat sebelumnya di tx yang sama (reserve
+    sesudah), jadi faktor supply-nya: reserve sesudah / reserve sebelum.
+    """
+    delta = np.zeros(len(keys))
+    for kind, sign in (("mint", 1), ("burn", -1)):
+        columns = index.columns(kind)
+        mask = columns["pair"] == pair_id
+        if not mask.any():
+            continue
+        i = np.searchsorted(keys, event_keys(columns, mask), side="left") - 1
+        valid = i >= 0
+        i = i[valid]
+        amount0, amount1 = np.asarray(columns["amount0"][mask])[valid], np.asarray(columns["amount1"][mask])[valid]
+        after0, after1 = reserve0[i], reserve1[i]
+        before0, before1 = after0 - sign * amount0, after1 - sign * amount1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Mint: LP = min(amount / reserve) x supply; Burn: sebanding dengan bagian reserve yang keluar
+            ratio = np.minimum(after0 / before0, after1 / before1) if sign > 0 else after0 / before0
+            factor = np.log(ratio)
+        # Mint pertama (reserve sebelumnya 0) / data janggal: supply tidak diubah
+        np.add.at(delta, i, np.where(np.isfinite(factor) & (before0 > 0) & (before1 > 0), factor, 0))
+    return np.cumsum(delta)
+
+
+def history(index, pair_id):
+    """(block, reserve_weth, reserve_token, log supply LP) di semua event Sync satu pair."""
+    columns = index.columns("sync")
+    mask = columns["pair"] == pair_id
+    blocks = np.asarray(columns["block"][mask])
+    reserve0, reserve1 = np.asarray(columns["reserve0"][mask]), np.asarray(columns["reserve1"][mask])
+    supply = supply_changes(index, pair_id, event_keys(columns, mask), reserve0, reserve1)
+    if index.weth_side(pair_id) == 0:
+        return blocks, reserve0, reserve1, supply
+    return blocks, reserve1, reserve0, supply
+
+
+def states_at(pool, blocks):
+    """Reserve + log supply LP terakhir di atau sebelum tiap block."""
+    pool_blocks, weth, token, supply = pool
+    i = np.clip(np.searchsorted(pool_blocks, blocks, side="right") - 1, 0, len(pool_blocks) - 1)
+    return weth[i], token[i], supply[i]
+
+
+def sample_rounds(pool, count=BT_ROUNDS, last_blocks=None):
+    """Block round yang tersebar rata; round terakhir masih punya BT_HOLD_BLOCKS sesudahnya."""
+    pool_blocks = pool[0]
+    start = int(pool_blocks[0])
+    if last_blocks is not None:
+        start = max(start, int(pool_blocks[-1]) - last_blocks)
+    end = max(int(pool_blocks[-1]) - BT_HOLD_BLOCKS, start)
+    return np.unique(np.linspace(start, end, count).astype(np.int64))
+
+
+def market(pool, blocks):
+    """Reserve + supply di quote, eksekusi dan akhir hold untuk setiap round, bentuk (1, round)."""
+    quote = states_at(pool, blocks)
+    execute = states_at(pool, blocks + BT_DELAY_BLOCKS)
+    hold = states_at(pool, blocks + BT_HOLD_BLOCKS)
+    valid = (quote[0] > 0) & (quote[1] > 0) & (execute[0] > 0) & (execute[1] > 0) & (hold[0] > 0) & (hold[1] > 0)
+    return [tuple(column[valid][None, :] for column in state) for state in (quote, execute, hold)]
+
+
+# ==================== PARAMETER ====================
+def grid(strategy):
+    """Kombinasi parameter yang berpengaruh ke strategi ini; sisanya tetap di nilai LIVE."""
+    axes = {
+        "slippage": BT_SLIPPAGE,
+        "total_eth": BT_TOTAL_ETH,
+        "max_weth_for_lp": BT_MAX_WETH_FOR_LP if strategy != "swap" else [LIVE["max_weth_for_lp"]],
+        "swap_fraction": BT_SWAP_FRACTION if strategy.startswith("swap_lp") else [LIVE["swap_fraction"]],
+    }
+    axes["swap_fraction"] = [np.nan if f == "zap" else float(f) for f in axes["swap_fraction"]]
+    combos = np.array(list(itertools.product(*axes.values())), dtype=float)
+    return {
+        "slippage": combos[:, 0:1],
+        "total_eth": combos[:, 1:2] * 10 ** 18,
+        "max_weth_for_lp": combos[:, 2:3] * 10 ** 18,
+        "swap_fraction": combos[:, 3:4],
+    }
+
+
+def gas_costs():
+    """Gas per aksi (wei): rata-rata dari jurnal trade kalau ada, selain itu GAS_USED x BT_GAS_GWEI."""
+    costs = {action: used * BT_GAS_GWEI * 10 ** 9 for action, used in GAS_USED.items()}
+    try:
+        profile = JOURNAL_WRITER.gas_profile()
+    except Exception:
+        profile = {}
+    for action, (used, price) in profile.items():
+        if action in costs and used and price:
+            costs[action] = used * price
+    return costs
+
+
+# ==================== STRATEGI ====================
+def simulate(strategy, params, quote, execute, hold, gas):
+    """Array [kombinasi x round]: ok, slippage, ETH keluar, nilai akhir (ETH), gas."""
+    slippage = params["slippage"]
+    (quote_weth, quote_token, _), (exec_weth, exec_token, exec_supply), (hold_weth, hold_token, hold_supply) = quote, execute, hold
+    hold_price = hold_weth / hold_token
+
+    if strategy == "swap":
+        amount = params["total_eth"]
+        quoted = amount_out(amount, quote_weth, quote_token)
+        out = amount_out(amount, exec_weth, exec_token)
+        ok = out >= quoted * (1 - slippage)
+        return {
+            "ok": ok,
+            "slippage": 1 - out / quoted,
+            "cost": np.where(ok, amount, 0),
+            "value": np.where(ok, out * hold_price, 0),
+            "gas": np.full(ok.shape, gas["swap"]),
+        }
+
+    if strategy == "lp":
+        # auto_LP: token sudah dipegang, dinilai di harga pool saat eksekusi
+        weth = np.minimum(params["total_eth"], params["max_weth_for_lp"])
+        token = weth * quote_token / quote_weth
+        used_weth, used_token, minted, ok = add_liquidity(weth, token, slippage, exec_weth, exec_token)
+        return {
+            "ok": ok,
+            "slippage": 1 - np.minimum(used_weth / weth, used_token / token),
+            "cost": np.where(ok, used_weth + used_token * exec_weth / exec_token, 0),
+            "value": np.where(ok, lp_value(minted, exec_supply, hold_supply, hold_weth), 0),
+            "gas": np.full(ok.shape, gas["add_liquidity"]),
+        }
+
+    # swap_lp / swap_lp_remove: swap sebagian lalu add LP (rencana dari reserve saat quote,
+    # sisi token LP paling banyak hasil swap minimum seperti quoter.plan_zap)
+    total = np.minimum(params["total_eth"], params["max_weth_for_lp"] * 2)
+    fraction = params["swap_fraction"]
+    swap_in = np.where(np.isnan(fraction), optimal_swap(total, quote_weth), np.nan_to_num(fraction) * total)
+    quoted = amount_out(swap_in, quote_weth, quote_token)
+    out_min = quoted * (1 - slippage)
+    plan_weth, plan_token = quote_weth + swap_in, quote_token - quoted
+    weth_for_lp = total - swap_in
+    token_for_lp = np.minimum(weth_for_lp * plan_token / plan_weth, out_min)
+    weth_for_lp = np.minimum(weth_for_lp, token_for_lp * plan_weth / plan_token)
+
+    out = amount_out(swap_in, exec_weth, exec_token)
+    swap_ok = out >= out_min
+    used_weth, used_token, minted, add_ok = add_liquidity(
+        weth_for_lp, token_for_lp, slippage, exec_weth + swap_in, exec_token - out
+    )
+    # Token hasil swap tidak cukup untuk sisi LP → add LP revert (tidak ada stok token lain)
+    ok = swap_ok & add_ok & (used_token <= out)
+    leftover = np.where(ok, out - used_token, out)
+    gas_round = gas["swap"] + gas["add_liquidity"]
+    if strategy == "swap_lp_remove":
+        gas_round = gas_round + gas["remove_liquidity"] * REMOVE_PER_ROUND
+    return {
+        "ok": ok,
+        "slippage": 1 - out / quoted,
+        "cost": np.where(swap_ok, swap_in, 0) + np.where(ok, used_weth, 0),
+        "value": np.where(ok, lp_value(minted, exec_supply, hold_supply, hold_weth), 0) + np.where(swap_ok, leftover * hold_price, 0),
+        "gas": np.full(ok.shape, gas_round),
+    }
+
+
+def summarize(results):
+    """Gabungan semua pair → satu baris per kombinasi (ETH)."""
+    merged = {key: np.hstack([r[key] for r in results]) for key in results[0]}
+    cost = merged["cost"].sum(axis=1) / 10 ** 18
+    value = merged["value"].sum(axis=1) / 10 ** 18
+    gas = merged["gas"].sum(axis=1) / 10 ** 18
+    slippage = np.where(merged["ok"], merged["slippage"], np.nan)
+    return {
+        "rounds": merged["ok"].shape[1],
+        "fill_rate": merged["ok"].mean(axis=1),
+        "slippage": np.nanmean(slippage, axis=1) if np.isfinite(slippage).any() else np.zeros(len(cost)),
+        "cost": cost,
+        "value": value,
+        "gas": gas,
+        "pnl": value - cost - gas,
+    }
+
+
+def report(strategy, params, summary):
+    live = (
+        np.isclose(params["slippage"][:, 0], LIVE["slippage"])
+        & np.isclose(params["total_eth"][:, 0], LIVE["total_eth"] * 10 ** 18)
+        & np.isclose(params["max_weth_for_lp"][:, 0], LIVE["max_weth_for_lp"] * 10 ** 18)
+        & np.isnan(params["swap_fraction"][:, 0])   # LIVE: zap
+    )
+    order = list(np.argsort(-summary["pnl"])[:BT_TOP])
+    order += [i for i in np.flatnonzero(live) if i not in order]
+    print(f"\n📊 {strategy}: {len(summary['pnl'])} kombinasi x {summary['rounds']} round")
+    print("  slippage  total_eth  max_lp     swap   fill    slip    keluar       nilai        gas          pnl")
+    for i in order:
+        fraction = params["swap_fraction"][i, 0]
+        print(
+            f"  {params['slippage'][i, 0]:<8.3f}  {params['total_eth'][i, 0] / 10 ** 18:<9.5f}  "
+            f"{params['max_weth_for_lp'][i, 0] / 10 ** 18:<9.5f}  {'zap' if np.isnan(fraction) else f'{fraction:.2f}':<5}  "
+            f"{summary['fill_rate'][i] * 100:5.1f}%  {summary['slippage'][i] * 100:5.2f}%  "
+            f"{summary['cost'][i]:.8f}  {summary['value'][i]:.8f}  {summary['gas'][i]:.8f}  "
+            f"{summary['pnl'][i]:+.8f}{' ◀ live' if live[i] else ''}"
+        )
+
+
+def run(strategies, token=None, last_blocks=None, directory=INDEX_DIR):
+    index = open_index(directory)
+    pair_ids = [
+        i for i, entry in enumerate(index.pairs)
+        if token is None or token.lower() in (entry["token0"].lower(), entry["token1"].lower())
+    ]
+    markets = []
+    for pair_id in pair_ids:
+        pool = history(index, pair_id)
+        if len(pool[0]) < 2:
+            continue
+        markets.append(market(pool, sample_rounds(pool, last_blocks=last_blocks)))
+    if not markets:
+        raise ValueError(f"❌ Tidak ada histori reserve di {directory} (jalankan scripts.chain_index dulu)")
+
+    gas = gas_costs()
+    for strategy in strategies:
+        started = time.perf_counter()
+        params = grid(strategy)
+        results = [simulate(strategy, params, *m, gas) for m in markets]
+        summary = summarize(results)
+        report(strategy, params, summary)
+        print(f"  ⏱️ {time.perf_counter() - started:.2f} detik, {len(markets)} pair")
+
+
+def main():
+    name = sys.argv[1] if len(sys.argv) > 1 else "all"
+    token = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] != "all" else None
+    last_blocks = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    strategies = STRATEGIES if name == "all" else [name]
+    if any(s not in STRATEGIES for s in strategies):
+        raise ValueError(f"❌ Strategi tidak dikenal: {name}")
+    run(strategies, token, last_blocks)
+
+
+if __name__ == "__main__":
+    main()
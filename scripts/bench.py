@@ -0,0 +1,261 @@
+"""
+Benchmark strategi di chain lokal (anvil / hardhat node), tanpa dana asli.
+
+    python -m scripts.bench [strategi|all] [round] [wallet] [paralel]
+
+Yang disiapkan otomatis: WETH9 di alamat WETH_ADDRESS (hardhat_setCode),
+factory + router UniswapV2, beberapa token test dengan pool yang sudah
+diisi likuiditas (satu pool sengaja tipis), dan wallet strategi yang
+di-fund dari akun dev. Strategi dijalankan lewat async_engine (jalur
+nonce, gas, receipt, quote dan pipeline yang sama dengan daemon) sampai
+jumlah round tercapai, lalu dilaporkan: round/detik, tx/round, RPC call
+per round per method, dan latency round p50/p99.
+
+Butuh:
+  - anvil (Foundry) di PATH, atau BENCH_RPC_URL ke dev node yang sudah jalan
+  - artifact UniswapV2: npm install --no-save @uniswap/v2-core @uniswap/v2-periphery
+"""
+import os
+import sys
+import json
+import time
+import math
+import socket
+import asyncio
+import tempfile
+import subprocess
+from collections import Counter
+from web3 import Web3, AsyncWeb3
+from eth_account import Account
+
+ANVIL_BIN = os.getenv("ANVIL_BIN", "anvil")
+BENCH_RPC_URL = os.getenv("BENCH_RPC_URL")
+ARTIFACTS_DIR = os.getenv("BENCH_ARTIFACTS", "node_modules/@uniswap")
+BENCH_TOKENS = int(os.getenv("BENCH_TOKENS", "5"))
+WALLET_FUNDING = Web3.to_wei(10, 'ether')
+POOL_ETH = Web3.to_wei(50, 'ether')
+THIN_POOL_ETH = Web3.to_wei(0.001, 'ether')   # di bawah MIN_LIQUIDITY_ETH → harus di-skip index
+STRATEGIES = ["swap", "lp", "swap_lp", "swap_lp_remove"]
+
+# Sama dengan konstanta di strategi (WETH di-hardcode di sana)
+WETH_ADDRESS = Web3.to_checksum_address("0x776401b9bc8aae31a685731b7147d4445fd9fb19")
+SEND_METHODS = {"eth_sendRawTransaction", "eth_sendRawTransactionSync", "realtime_sendRawTransaction"}
+
+
+# ==================== CHAIN LOKAL ====================
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_node():
+    """Jalankan anvil; None kalau pakai BENCH_RPC_URL."""
+    if BENCH_RPC_URL:
+        return BENCH_RPC_URL, None
+    port = free_port()
+    try:
+        process = subprocess.Popen(
+            [ANVIL_BIN, "--port", str(port), "--silent"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+    except FileNotFoundError:
+        raise EnvironmentError(f"❌ {ANVIL_BIN} tidak ditemukan: install Foundry atau isi BENCH_RPC_URL")
+    url = f"http://127.0.0.1:{port}"
+    web3 = Web3(Web3.HTTPProvider(url))
+    for _ in range(100):
+        if web3.is_connected():
+            return url, process
+        time.sleep(0.1)
+    process.terminate()
+    raise TimeoutError("❌ Node lokal tidak merespons")
+
+
+def artifact(package, name):
+    with open(os.path.join(ARTIFACTS_DIR, package, "build", f"{name}.json")) as f:
+        data = json.load(f)
+    bytecode = data["bytecode"] if isinstance(data["bytecode"], str) else data["bytecode"]["object"]
+    return data["abi"], bytecode if bytecode.startswith("0x") else "0x" + bytecode
+
+
+def deploy(web3, package, name, *args):
+    abi, bytecode = artifact(package, name)
+    contract = web3.eth.contract(abi=abi, bytecode=bytecode)
+    tx_hash = contract.constructor(*args).transact({"from": web3.eth.accounts[0]})
+    address = web3.eth.wait_for_transaction_receipt(tx_hash).contractAddress
+    return web3.eth.contract(address=address, abi=abi)
+
+
+def install_weth(web3):
+    """WETH9 dipasang di WETH_ADDRESS supaya strategi jalan tanpa diubah."""
+    weth = deploy(web3, "v2-periphery", "WETH9")
+    web3.provider.make_request("hardhat_setCode", [WETH_ADDRESS, web3.to_hex(web3.eth.get_code(weth.address))])
+    # name / symbol / decimals ada di storage slot 0-2
+    for slot in range(3):
+        value = web3.eth.get_storage_at(weth.address, slot)
+        web3.provider.make_request("hardhat_setStorageAt", [WETH_ADDRESS, hex(slot), web3.to_hex(value.rjust(32, b"\0"))])
+    return web3.eth.contract(address=WETH_ADDRESS, abi=weth.abi)
+
+
+def setup_chain(url, wallets):
+    web3 = Web3(Web3.HTTPProvider(url))
+    deployer = web3.eth.accounts[0]
+    install_weth(web3)
+    factory = deploy(web3, "v2-core", "UniswapV2Factory", deployer)
+    router = deploy(web3, "v2-periphery", "UniswapV2Router02", factory.address, WETH_ADDRESS)
+
+    tokens = []
+    deadline = int(time.time()) + 3600
+    for i in range(BENCH_TOKENS):
+        token = deploy(web3, "v2-periphery", "ERC20", 10 ** 30)
+        pool_eth = THIN_POOL_ETH if i == BENCH_TOKENS - 1 else POOL_ETH
+        token_amount = pool_eth * (1000 + 500 * i)
+        web3.eth.wait_for_transaction_receipt(
+            token.functions.approve(router.address, 2 ** 256 - 1).transact({"from": deployer})
+        )
+        web3.eth.wait_for_transaction_receipt(router.functions.addLiquidityETH(
+            token.address, token_amount, 0, 0, deployer, deadline
+        ).transact({"from": deployer, "value": pool_eth}))
+        tokens.append(token.address)
+
+    for wallet in wallets:
+        web3.eth.wait_for_transaction_receipt(
+            web3.eth.send_transaction({"from": deployer, "to": wallet.address, "value": WALLET_FUNDING})
+        )
+    return {
+        "chain_id": web3.eth.chain_id,
+        "router": router.address,
+        "factory": factory.address,
+        "tokens": tokens,
+    }
+
+
+def configure_env(url, chain):
+    """Env strategi diarahkan ke chain lokal; harus sebelum import async_engine."""
+    cache = tempfile.mkdtemp(prefix="bench-")
+    os.environ.update({
+        "RPC_URL": url,
+        "RPC_URLS": "",
+        "RPC_SEND_URL": "",
+        "CHAIN_ID": str(chain["chain_id"]),
+        "ROUTER_ADDRESS": chain["router"],
+        "FACTORY_ADDRESS": chain["factory"],
+        "TOKEN_CACHE_FILE": os.path.join(cache, "tokens.json"),
+        "GAS_CACHE_FILE": os.path.join(cache, "gas.json"),
+    })
+    # Pacing dimatikan supaya yang terukur throughput mentah (bisa di-override)
+    os.environ.setdefault("ROUNDS_PER_MINUTE", "0")
+
+    from scripts import token_outs
+    token_outs.TOKEN_OUTS[:] = [Web3.to_checksum_address(t) for t in chain["tokens"]]
+
+
+# ==================== PENGUKURAN ====================
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class Stats:
+    def __init__(self):
+        self.calls = Counter()
+        self.latencies = []
+        self.errors = Counter()
+
+    def on_round(self, name, elapsed, error=None):
+        self.latencies.append(elapsed)
+        if error is not None:
+            self.errors[type(error).__name__] += 1
+
+    def report(self, name, elapsed):
+        rounds = len(self.latencies)
+        sends = sum(self.calls[method] for method in SEND_METHODS)
+        p50, p99 = percentile(self.latencies, 50), percentile(self.latencies, 99)
+        print(f"\n📊 {name}: {rounds} round dalam {elapsed:.2f}s")
+        print(f"  round/detik  : {rounds / elapsed:.2f}")
+        print(f"  tx/round     : {sends / max(rounds, 1):.2f}")
+        print(f"  latency p50  : {p50 * 1000:.1f} ms" if p50 is not None else "  latency p50  : -")
+        print(f"  latency p99  : {p99 * 1000:.1f} ms" if p99 is not None else "  latency p99  : -")
+        if self.errors:
+            print(f"  error        : {dict(self.errors)}")
+        print("  RPC/round per method:")
+        for method, count in self.calls.most_common():
+            print(f"    {method:<36} {count / max(rounds, 1):.2f}")
+        return {
+            "strategy": name,
+            "rounds": rounds,
+            "seconds": elapsed,
+            "rounds_per_sec": rounds / elapsed,
+            "tx_per_round": sends / max(rounds, 1),
+            "p50_ms": None if p50 is None else p50 * 1000,
+            "p99_ms": None if p99 is None else p99 * 1000,
+            "errors": dict(self.errors),
+            "rpc_per_round": {m: c / max(rounds, 1) for m, c in self.calls.items()},
+        }
+
+
+def counting_provider(url, stats):
+    from scripts.rpc import AsyncMultiEndpointProvider
+
+    class CountingProvider(AsyncMultiEndpointProvider):
+        async def make_request(self, method, params):
+            stats.calls[method] += 1
+            return await super().make_request(method, params)
+
+        async def make_batch_request(self, requests_):
+            for method, _ in requests_:
+                stats.calls[method] += 1
+            return await super().make_batch_request(requests_)
+
+    return CountingProvider([url])
+
+
+async def bench_strategy(url, keys, name, rounds, concurrency):
+    from scripts.wallet_pool import build_engines
+
+    stats = Stats()
+    w3 = AsyncWeb3(counting_provider(url, stats))
+    engines = build_engines(keys, concurrency, w3=w3)
+    for engine in engines:
+        engine.on_round = stats.on_round
+    per_worker = math.ceil(rounds / (len(engines) * concurrency))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(engine.run(name, concurrency, rounds=per_worker) for engine in engines))
+    elapsed = time.perf_counter() - started
+    if engines[0].index._task is not None:
+        engines[0].index._task.cancel()
+    return stats.report(name, elapsed)
+
+
+def main():
+    name = sys.argv[1] if len(sys.argv) > 1 else "all"
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    wallet_count = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    concurrency = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    names = STRATEGIES if name == "all" else [name]
+    if any(n not in STRATEGIES for n in names):
+        raise ValueError(f"❌ Strategi tidak dikenal: {name}")
+
+    url, process = start_node()
+    try:
+        wallets = [Account.create() for _ in range(wallet_count)]
+        chain = setup_chain(url, wallets)
+        configure_env(url, chain)
+        print(f"🧪 Chain lokal {url}: {len(chain['tokens'])} token, {wallet_count} wallet x{concurrency}")
+        keys = [wallet.key.hex() for wallet in wallets]
+        results = [asyncio.run(bench_strategy(url, keys, n, rounds, concurrency)) for n in names]
+        output = os.getenv("BENCH_OUTPUT")
+        if output:
+            with open(output, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"\n💾 Hasil disimpan ke {output}")
+    finally:
+        if process is not None:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
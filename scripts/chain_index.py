@@ -0,0 +1,403 @@
+"""
+Indexer event chain: Swap, Sync, Mint, Burn semua pair WETH/TOKEN_OUTS dan
+PairCreated dari factory. Backfill sekali lalu mengikuti block baru, lanjut
+dari checkpoint kalau di-restart.
+
+Event disimpan kolom per kolom (satu file biner per kolom, dibaca sebagai
+numpy memmap) di INDEX_DIR, jadi scan jutaan event (backtest, ranking
+likuiditas, deteksi pump) tidak perlu fetch ulang ke RPC.
+
+    python -m scripts.chain_index [follow|backfill|stats]
+
+Butuh: pip install numpy
+"""
+import os
+import sys
+import json
+import time
+import numpy as np
+from web3 import Web3
+from scripts.json_cache import lock_file, write_json
+
+INDEX_DIR = os.getenv("INDEX_DIR", "data/index")
+# Mulai backfill (kalau belum ada checkpoint): INDEX_START_BLOCK, atau sekian block terakhir
+INDEX_START_BLOCK = os.getenv("INDEX_START_BLOCK")
+INDEX_BACKFILL_BLOCKS = int(os.getenv("INDEX_BACKFILL_BLOCKS", "100000"))
+# Range eth_getLogs adaptif: mengecil saat RPC menolak / hasil terlalu banyak, membesar saat sepi
+INDEX_MAX_RANGE = int(os.getenv("INDEX_MAX_RANGE", "5000"))
+INDEX_TARGET_LOGS = int(os.getenv("INDEX_TARGET_LOGS", "5000"))
+# Block terbaru yang belum di-index (hindari reorg), interval polling follow (detik)
+INDEX_CONFIRMATIONS = int(os.getenv("INDEX_CONFIRMATIONS", "2"))
+INDEX_POLL = float(os.getenv("INDEX_POLL", "2"))
+
+SWAP_TOPIC = Web3.to_hex(Web3.keccak(text="Swap(address,uint256,uint256,uint256,uint256,address)"))
+SYNC_TOPIC = Web3.to_hex(Web3.keccak(text="Sync(uint112,uint112)"))
+MINT_TOPIC = Web3.to_hex(Web3.keccak(text="Mint(address,uint256,uint256)"))
+BURN_TOPIC = Web3.to_hex(Web3.keccak(text="Burn(address,uint256,uint256,address)"))
+PAIR_CREATED_TOPIC = Web3.to_hex(Web3.keccak(text="PairCreated(address,address,address,uint256)"))
+
+# Kolom per jenis event. Jumlah token (uint112/uint256) disimpan float64:
+# cukup untuk analisa, jumlah persis tetap bisa dibaca dari chain
+BASE_COLUMNS = [("block", "<u8"), ("log_index", "<u4"), ("pair", "<u4")]
+SCHEMAS = {
+    "swap": BASE_COLUMNS + [("amount0_in", "<f8"), ("amount1_in", "<f8"), ("amount0_out", "<f8"), ("amount1_out", "<f8")],
+    "sync": BASE_COLUMNS + [("reserve0", "<f8"), ("reserve1", "<f8")],
+    "mint": BASE_COLUMNS + [("amount0", "<f8"), ("amount1", "<f8")],
+    "burn": BASE_COLUMNS + [("amount0", "<f8"), ("amount1", "<f8")],
+}
+TOPIC_KINDS = {SWAP_TOPIC: "swap", SYNC_TOPIC: "sync", MINT_TOPIC: "mint", BURN_TOPIC: "burn"}
+
+
+def _hex(value):
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    return value.lower()
+
+
+def _words(data, count):
+    raw = bytes(data) if not isinstance(data, str) else bytes.fromhex(data[2:])
+    return [int.from_bytes(raw[i:i + 32], "big") for i in range(0, 32 * count, 32)]
+
+
+def _topic_address(topic):
+    return Web3.to_checksum_address("0x" + _hex(topic)[-40:])
+
+
+class ColumnStore:
+    """
+    Satu jenis event: file `<kolom>.bin` per kolom, append-only. `rows` hanya
+    dinaikkan lewat checkpoint, jadi sisa tulisan yang terpotong (crash)
+    dibuang saat writer membuka lagi. Reader (`writer=False`) tidak pernah
+    memotong: byte sesudah `rows` bisa saja tulisan writer yang sedang jalan.
+    """
+
+    def __init__(self, directory, schema, rows=0, writer=True):
+        self.directory = directory
+        self.schema = [(name, np.dtype(dtype)) for name, dtype in schema]
+        self.rows = rows
+        if not writer:
+            return
+        os.makedirs(directory, exist_ok=True)
+        for name, dtype in self.schema:
+            path = self.path(name)
+            if os.path.exists(path) and os.path.getsize(path) > rows * dtype.itemsize:
+                os.truncate(path, rows * dtype.itemsize)
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def append(self, records):
+        if not records:
+            return
+        for i, (name, dtype) in enumerate(self.schema):
+            column = np.fromiter((record[i] for record in records), dtype=dtype, count=len(records))
+            with open(self.path(name), "ab") as f:
+                f.write(column.tobytes())
+        self.rows += len(records)
+
+    def columns(self):
+        """{kolom: array} read-only tanpa copy (memmap); panjang = baris yang sudah di-checkpoint."""
+        if self.rows == 0:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in self.schema}
+        return {
+            name: np.memmap(self.path(name), dtype=dtype, mode="r", shape=(self.rows,))
+            for name, dtype in self.schema
+        }
+
+
+class ChainIndex:
+    """
+    Indexer inkremental: halaman eth_getLogs (address = factory + pair yang
+    diikuti, topic = 5 event di atas) dari checkpoint sampai block terbaru
+    dikurangi INDEX_CONFIRMATIONS. Pair baru dari PairCreated (WETH + token
+    di TOKEN_OUTS) langsung ikut diikuti, termasuk log di halaman yang sama.
+    Pair dari registry yang baru diikuti sesudah checkpoint di-backfill dulu
+    dari block awal index (`backfill_pairs`).
+
+    Hanya satu writer per direktori (lock `writer.lock`); `writer=False`
+    untuk membaca saja (open_index) selagi indexer jalan.
+    """
+
+    def __init__(self, web3, factory_address, weth_address, tokens, registry=None, directory=INDEX_DIR, writer=True):
+        self.web3 = web3
+        self.factory_address = Web3.to_checksum_address(factory_address)
+        self.weth_address = Web3.to_checksum_address(weth_address)
+        self.tokens = {Web3.to_checksum_address(t) for t in tokens}
+        self.directory = directory
+        self.writer = writer
+        self.lock = None
+        if writer:
+            os.makedirs(directory, exist_ok=True)
+            self.lock = open(os.path.join(directory, "writer.lock"), "a+")
+            if not lock_file(self.lock, blocking=False):
+                self.lock.close()
+                raise RuntimeError(f"❌ Index {directory} sedang ditulis proses lain")
+
+        checkpoint = self.read_json("checkpoint.json", {})
+        self.last_block = checkpoint.get("last_block")
+        # Block pertama yang di-index (checkpoint lama belum menyimpannya → dihitung ulang dari env)
+        self.start_block = checkpoint.get("start_block")
+        self.range = checkpoint.get("range", INDEX_MAX_RANGE)
+        self.ceiling = INDEX_MAX_RANGE   # batas naik setelah RPC menolak (per proses)
+        rows = checkpoint.get("rows", {})
+        self.stores = {
+            kind: ColumnStore(os.path.join(directory, kind), schema, rows.get(kind, 0), writer)
+            for kind, schema in SCHEMAS.items()
+        }
+        # pair_id = index di list ini (kolom `pair`)
+        self.pairs = self.read_json("pairs.json", [])
+        self.pair_ids = {entry["address"]: i for i, entry in enumerate(self.pairs)}
+
+        if registry is not None:
+            for token in self.tokens:
+                pair = registry.get(token, "pair")
+                if not pair or Web3.to_checksum_address(pair) in self.pair_ids:
+                    continue
+                pair_id = self.add_pair(pair, *sorted([self.weth_address, token], key=str.lower))
+                # Pair yang baru diikuti sesudah index jalan (token baru di TOKEN_OUTS):
+                # log-nya sampai checkpoint belum ada → diambil `backfill_pairs` sebelum lanjut
+                if self.last_block is not None:
+                    self.pairs[pair_id]["backfill"] = [self.first_block(), self.last_block]
+
+    # ---------- disk ----------
+    def read_json(self, name, default):
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            return default
+        with open(path) as f:
+            return json.load(f)
+
+    def write_json(self, name, data):
+        write_json(os.path.join(self.directory, name), data, indent=None)
+
+    def checkpoint(self):
+        if not self.writer:
+            raise RuntimeError("❌ Index dibuka read-only")
+        # pairs.json dulu: baris yang di-checkpoint tidak boleh menunjuk pair_id yang belum tersimpan
+        self.write_json("pairs.json", self.pairs)
+        self.write_json("checkpoint.json", {
+            "factory": self.factory_address,
+            "weth": self.weth_address,
+            "start_block": self.start_block,
+            "last_block": self.last_block,
+            "range": self.range,
+            "rows": {kind: store.rows for kind, store in self.stores.items()},
+        })
+
+    # ---------- pair ----------
+    def add_pair(self, address, token0, token1, block=None):
+        address = Web3.to_checksum_address(address)
+        if address not in self.pair_ids:
+            self.pair_ids[address] = len(self.pairs)
+            self.pairs.append({"address": address, "token0": token0, "token1": token1, "block": block})
+        return self.pair_ids[address]
+
+    def first_block(self):
+        if self.start_block is None:
+            start = int(INDEX_START_BLOCK) if INDEX_START_BLOCK else max(self.last_block + 1 - INDEX_BACKFILL_BLOCKS, 0)
+            print(f"⚠️ Checkpoint tanpa start_block: histori pair baru mulai block {start}")
+            return start
+        return self.start_block
+
+    def tracked(self, entry):
+        tokens = {entry["token0"], entry["token1"]}
+        return self.weth_address in tokens and bool(tokens & self.tokens)
+
+    def addresses(self):
+        return [self.factory_address] + [entry["address"] for entry in self.pairs if self.tracked(entry)]
+
+    # ---------- fetch ----------
+    def get_logs(self, from_block, to_block, addresses):
+        return self.web3.eth.get_logs({
+            "address": addresses,
+            "topics": [[SWAP_TOPIC, SYNC_TOPIC, MINT_TOPIC, BURN_TOPIC, PAIR_CREATED_TOPIC]],
+            "fromBlock": from_block,
+            "toBlock": to_block,
+        })
+
+    def decode(self, logs, records):
+        """Log → baris per jenis event; pair baru yang diikuti dikembalikan (address, block)."""
+        created = []
+        for log in logs:
+            topics = log["topics"]
+            if not topics:
+                continue
+            topic = _hex(topics[0])
+            address = Web3.to_checksum_address(log["address"])
+            if topic == PAIR_CREATED_TOPIC and address == self.factory_address:
+                token0, token1 = _topic_address(topics[1]), _topic_address(topics[2])
+                pair = _topic_address(_words(log["data"], 1)[0].to_bytes(32, "big"))
+                # Pair lain di factory tidak disimpan supaya pairs.json tetap kecil
+                if pair not in self.pair_ids and self.tracked({"token0": token0, "token1": token1}):
+                    self.add_pair(pair, token0, token1, log["blockNumber"])
+                    created.append((pair, log["blockNumber"]))
+                continue
+            kind = TOPIC_KINDS.get(topic)
+            pair_id = self.pair_ids.get(address)
+            if kind is None or pair_id is None:
+                continue
+            count = 4 if kind == "swap" else 2
+            values = [float(value) for value in _words(log["data"], count)]
+            records[kind].append((log["blockNumber"], log["logIndex"], pair_id, *values))
+        return created
+
+    def page(self, from_block, to_block):
+        records = {kind: [] for kind in SCHEMAS}
+        logs = self.get_logs(from_block, to_block, self.addresses())
+        created = self.decode(logs, records)
+        # Pair yang dibuat di tengah halaman: log-nya sesudah PairCreated belum ikut diambil
+        if created:
+            start = min(block for _, block in created)
+            self.decode(self.get_logs(start, to_block, [pair for pair, _ in created]), records)
+        for kind, rows in records.items():
+            rows.sort(key=lambda row: (row[0], row[1]))
+            self.stores[kind].append(rows)
+        return len(logs)
+
+    def backfill_pairs(self):
+        """
+        Log pair yang ditandai `backfill` ([dari, sampai]) diambil per pair,
+        naik per halaman, sebelum index lanjut ke block baru: baris satu pair
+        tetap urut (block, log_index) walau tertulis sesudah pair lain.
+        Sisa range disimpan di pairs.json tiap halaman, jadi bisa lanjut
+        sesudah restart.
+        """
+        total = 0
+        for entry in self.pairs:
+            if "backfill" not in entry:
+                continue
+            from_block, to_block = entry["backfill"]
+            print(f"📚 Backfill pair baru {entry['address']}: block {from_block}-{to_block}")
+            while from_block <= to_block:
+                end = min(from_block + self.range - 1, to_block)
+                records = {kind: [] for kind in SCHEMAS}
+                try:
+                    logs = self.get_logs(from_block, end, [entry["address"]])
+                except Exception as e:
+                    if self.range == 1:
+                        raise
+                    self.range = max(min(self.range, end - from_block + 1) // 2, 1)
+                    self.ceiling = self.range
+                    print(f"⚠️ getLogs {from_block}-{end} gagal ({e}); range → {self.range}")
+                    continue
+                self.decode(logs, records)
+                for kind, rows in records.items():
+                    rows.sort(key=lambda row: (row[0], row[1]))
+                    self.stores[kind].append(rows)
+                from_block = end + 1
+                entry["backfill"] = [from_block, to_block]
+                if from_block > to_block:
+                    del entry["backfill"]
+                self.checkpoint()
+                total += len(logs)
+        return total
+
+    def sync_to(self, latest):
+        """Index sampai `latest` dalam halaman adaptif; checkpoint setiap halaman."""
+        if self.last_block is None:
+            start = int(INDEX_START_BLOCK) if INDEX_START_BLOCK else max(latest - INDEX_BACKFILL_BLOCKS, 0)
+            self.start_block = start
+            self.last_block = start - 1
+        total = self.backfill_pairs()
+        while self.last_block < latest:
+            from_block = self.last_block + 1
+            to_block = min(from_block + self.range - 1, latest)
+            try:
+                count = self.page(from_block, to_block)
+            except Exception as e:
+                # Range terlalu besar / hasil terlalu banyak / timeout → perkecil dan ulangi
+                if self.range == 1:
+                    raise
+                self.range = max(min(self.range, to_block - from_block + 1) // 2, 1)
+                self.ceiling = self.range
+                print(f"⚠️ getLogs {from_block}-{to_block} gagal ({e}); range → {self.range}")
+                continue
+            if count > INDEX_TARGET_LOGS:
+                self.range = max(self.range // 2, 1)
+            elif count < INDEX_TARGET_LOGS // 4:
+                self.range = max(min(self.range * 2, self.ceiling), 1)
+            self.last_block = to_block
+            self.checkpoint()
+            total += count
+            if to_block < latest:
+                print(f"📚 Index block {from_block}-{to_block}: {count} event (sampai {latest})")
+        return total
+
+    def head(self):
+        return self.web3.eth.block_number - INDEX_CONFIRMATIONS
+
+    def backfill(self):
+        return self.sync_to(self.head())
+
+    def follow(self):
+        print(f"📚 Indexer jalan: {len(self.addresses()) - 1} pair, data di {self.directory}")
+        while True:
+            try:
+                count = self.sync_to(self.head())
+                if count:
+                    print(f"📚 +{count} event sampai block {self.last_block}")
+            except Exception as e:
+                print(f"⚠️ Indexer: {e}")
+            time.sleep(INDEX_POLL)
+
+    # ---------- baca ----------
+    def columns(self, kind):
+        return self.stores[kind].columns()
+
+    def pair_id(self, address):
+        return self.pair_ids.get(Web3.to_checksum_address(address))
+
+    def weth_side(self, pair_id):
+        """0 kalau WETH = token0 pair ini, 1 kalau token1 (untuk memilih kolom amount/reserve)."""
+        return 0 if self.pairs[pair_id]["token0"] == self.weth_address else 1
+
+    def stats(self):
+        return {kind: store.rows for kind, store in self.stores.items()}
+
+
+def open_index(directory=INDEX_DIR):
+    """
+    Index read-only untuk analisa (backtest, dsb): tanpa RPC, dari checkpoint
+    + file kolom. Aman dibuka selagi `follow` jalan; baris sesudah checkpoint
+    tidak terbaca dan file kolom tidak diubah.
+    """
+    with open(os.path.join(directory, "checkpoint.json")) as f:
+        checkpoint = json.load(f)
+    return ChainIndex(None, checkpoint["factory"], checkpoint["weth"], (), directory=directory, writer=False)
+
+
+# ==================== CLI ====================
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+    from scripts.rpc import MultiEndpointProvider, rpc_urls
+    from scripts.token_registry import TokenRegistry
+    from scripts.token_outs import TOKEN_OUTS
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "follow"
+    factory_address = os.getenv("FACTORY_ADDRESS")
+    if not factory_address:
+        raise EnvironmentError("❌ Missing env var: FACTORY_ADDRESS")
+    weth_address = Web3.to_checksum_address("0x776401b9bc8aae31a685731b7147d4445fd9fb19")
+
+    web3 = Web3(MultiEndpointProvider(rpc_urls(os.getenv("RPC_URL"))))
+    registry = TokenRegistry(web3, int(os.getenv("CHAIN_ID")), weth_address, factory_address)
+    registry.warm(TOKEN_OUTS)
+    # stats cukup membaca, boleh jalan bersamaan dengan follow
+    index = ChainIndex(web3, factory_address, weth_address, TOKEN_OUTS, registry, writer=command != "stats")
+
+    if command == "stats":
+        print(f"📚 {index.directory}: block terakhir {index.last_block}, {len(index.pairs)} pair")
+        for kind, rows in index.stats().items():
+            print(f"  {kind:<5} {rows} event")
+    elif command == "backfill":
+        count = index.backfill()
+        print(f"✅ Backfill selesai: {count} event sampai block {index.last_block}")
+    elif command == "follow":
+        index.follow()
+    else:
+        raise ValueError(f"❌ Perintah tidak dikenal: {command} (follow / backfill / stats)")
+
+
+if __name__ == "__main__":
+    main()
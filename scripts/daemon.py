@@ -0,0 +1,240 @@
+import os
+import sys
+import hmac
+import json
+import time
+import asyncio
+import secrets
+from collections import deque
+from dotenv import load_dotenv
+from scripts.wallet_pool import load_private_keys, build_engines
+from scripts.metrics import METRICS, METRICS_SUMMARY, serve as serve_metrics, summary_loop
+from scripts import events
+
+# ==================== SETUP ====================
+load_dotenv()
+
+DAEMON_HOST = os.getenv("DAEMON_HOST", "127.0.0.1")
+DAEMON_PORT = int(os.getenv("DAEMON_PORT", "8765"))
+# Token kontrol: DAEMON_TOKEN dari .env, atau dibuat acak saat start dan ditulis ke
+# DAEMON_TOKEN_FILE (hanya bisa dibaca user ini) untuk cli.js / web UI
+DAEMON_TOKEN = os.getenv("DAEMON_TOKEN")
+DAEMON_TOKEN_FILE = os.getenv("DAEMON_TOKEN_FILE", ".daemon_token")
+DAEMON_CONCURRENCY = int(os.getenv("DAEMON_CONCURRENCY", "1"))
+# /metrics daemon selalu dibuka (default 9464); METRICS_PORT=0 untuk mematikan
+DAEMON_METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+STRATEGIES = ["swap", "lp", "swap_lp", "swap_lp_remove"]
+# Pesan (log + event) terakhir yang dikirim ke subscriber baru
+LOG_HISTORY = 500
+# Subscriber yang lambat membaca: log lama dibuang, bukan menahan strategi
+SUBSCRIBER_QUEUE = 1000
+
+
+def load_token():
+    if DAEMON_TOKEN:
+        return DAEMON_TOKEN
+    token = secrets.token_hex(32)
+    fd = os.open(DAEMON_TOKEN_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    os.chmod(DAEMON_TOKEN_FILE, 0o600)   # file lama dengan izin lebih longgar
+    return token
+
+
+class LogBroadcast:
+    """
+    Pengganti sys.stdout: tetap menulis ke stdout asli dan mengirim tiap baris
+    ke subscriber sebagai `{"log": ...}`. Event terstruktur (scripts/events.py)
+    lewat jalur yang sama sebagai `{"event": {...}}`, satu pesan per baris.
+
+    Tiap pesan punya `seq` (mikrodetik, selalu naik — juga setelah daemon
+    restart) supaya subscriber yang reconnect bisa minta history sesudah
+    pesan terakhir yang sudah ia terima saja.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.history = deque(maxlen=LOG_HISTORY)
+        self.subscribers = set()
+        self.partial = ""
+        self.seq = 0
+
+    def write(self, text):
+        self.stream.write(text)
+        self.partial += text
+        *lines, self.partial = self.partial.split("\n")
+        for line in lines:
+            self.publish({"log": line})
+        return len(text)
+
+    def event(self, event):
+        self.publish({"event": event})
+
+    def publish(self, message):
+        self.seq = max(self.seq + 1, time.time_ns() // 1000)
+        message["seq"] = self.seq
+        self.history.append(message)
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def flush(self):
+        self.stream.flush()
+
+    def subscribe(self, since=0):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        for message in self.history:
+            if message["seq"] > since:
+                queue.put_nowait(message)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+
+class Daemon:
+    """
+    Satu proses Python untuk semua strategi.
+
+    Engine per wallet (beserta koneksi RPC, registry token, nonce, allowance,
+    receipt tracker dan gas policy) dibuat sekali saat daemon start. Start
+    strategi hanya membuat task baru, stop membatalkan task-nya; cache tetap
+    hangat untuk start berikutnya. Dikontrol lewat TCP localhost dengan
+    protokol satu baris JSON per request (lihat `daemon_client.js`); tiap
+    request wajib membawa `token` (lihat `load_token`), selain itu ditolak.
+    """
+
+    def __init__(self, keys, concurrency=DAEMON_CONCURRENCY):
+        self.engines = build_engines(keys, concurrency)
+        self.runs = {}   # strategi -> {"task", "concurrency", "started_at"}
+        self.logs = LogBroadcast(sys.stdout)
+        self.server = None
+        self.token = None
+
+    # ---------- commands ----------
+    def start(self, strategy, concurrency=None):
+        if strategy not in STRATEGIES:
+            return {"ok": False, "error": f"Strategi tidak dikenal: {strategy}"}
+        run = self.runs.get(strategy)
+        if run and not run["task"].done():
+            return {"ok": False, "error": f"Strategi '{strategy}' sudah berjalan"}
+
+        concurrency = int(concurrency or self.engines[0].concurrency)
+        task = asyncio.create_task(self.run_strategy(strategy, concurrency))
+        self.runs[strategy] = {"task": task, "concurrency": concurrency, "started_at": time.time()}
+        return {"ok": True, "message": f"🚀 {strategy} berjalan di {len(self.engines)} wallet x{concurrency}"}
+
+    async def run_strategy(self, strategy, concurrency):
+        await asyncio.gather(*(engine.run(strategy, concurrency) for engine in self.engines))
+
+    async def stop(self, strategy=None):
+        names = [strategy] if strategy else list(self.runs)
+        stopped = []
+        for name in names:
+            run = self.runs.pop(name, None)
+            if run is None:
+                continue
+            run["task"].cancel()
+            try:
+                await run["task"]
+            except (asyncio.CancelledError, Exception):
+                pass
+            stopped.append(name)
+        if not stopped:
+            return {"ok": False, "error": "Tidak ada strategi yang berjalan"}
+        print(f"🛑 Strategi dihentikan: {', '.join(stopped)}")
+        return {"ok": True, "stopped": stopped}
+
+    def status(self):
+        now = time.time()
+        running = {}
+        for name, run in self.runs.items():
+            running[name] = {
+                "concurrency": run["concurrency"],
+                "uptime": int(now - run["started_at"]),
+                "alive": not run["task"].done(),
+            }
+        return {
+            "ok": True,
+            "pid": os.getpid(),
+            "wallets": [engine.address for engine in self.engines],
+            "running": running,
+            "rpc": self.engines[0].w3.provider.stats(),
+            "metrics": METRICS.summary(),
+        }
+
+    async def dispatch(self, request):
+        cmd = request.get("cmd")
+        if cmd == "start":
+            return self.start(request.get("strategy"), request.get("concurrency"))
+        if cmd == "stop":
+            return await self.stop(request.get("strategy"))
+        if cmd == "status":
+            return self.status()
+        if cmd == "list":
+            return {"ok": True, "strategies": STRATEGIES}
+        if cmd == "shutdown":
+            await self.stop()
+            asyncio.get_running_loop().call_soon(self.server.close)
+            return {"ok": True, "message": "👋 Daemon berhenti"}
+        return {"ok": False, "error": f"Perintah tidak dikenal: {cmd}"}
+
+    # ---------- server ----------
+    async def stream_logs(self, writer, since=0):
+        queue = self.logs.subscribe(since)
+        try:
+            while True:
+                message = await queue.get()
+                writer.write((json.dumps(message) + "\n").encode())
+                await writer.drain()
+        finally:
+            self.logs.unsubscribe(queue)
+
+    async def handle(self, reader, writer):
+        try:
+            raw = await reader.readline()
+            try:
+                request = json.loads(raw or b"{}")
+            except ValueError:
+                request = {}
+            if not isinstance(request, dict) or not hmac.compare_digest(str(request.get("token", "")), self.token):
+                writer.write((json.dumps({"ok": False, "error": "Token daemon tidak valid"}) + "\n").encode())
+                await writer.drain()
+                return
+            if request.get("cmd") == "logs":
+                await self.stream_logs(writer, int(request.get("since") or 0))
+                return
+            response = await self.dispatch(request)
+            writer.write((json.dumps(response) + "\n").encode())
+            await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        sys.stdout = self.logs
+        events.subscribe(self.logs.event)
+        self.token = load_token()
+        if DAEMON_HOST not in ("127.0.0.1", "localhost", "::1"):
+            print(f"⚠️ Port kontrol daemon terbuka di {DAEMON_HOST}; siapa pun yang punya token bisa start/stop strategi")
+        self.server = await asyncio.start_server(self.handle, DAEMON_HOST, DAEMON_PORT)
+        print(f"🧠 Daemon siap di {DAEMON_HOST}:{DAEMON_PORT} ({len(self.engines)} wallet)")
+        serve_metrics(DAEMON_METRICS_PORT)
+        if METRICS_SUMMARY > 0:
+            asyncio.create_task(summary_loop())
+        try:
+            await self.server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            events.unsubscribe(self.logs.event)
+            sys.stdout = self.logs.stream
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else DAEMON_CONCURRENCY
+    daemon = Daemon(load_private_keys(), concurrency)
+    asyncio.run(daemon.serve())
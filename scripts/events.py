@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import time
+import contextvars
+from scripts import journal
+
+# EVENTS_JSON=1: event juga ditulis ke stdout sebagai baris JSON (skrip tanpa daemon)
+EVENTS_JSON = os.getenv("EVENTS_JSON", "0") == "1"
+
+# Field yang ikut di semua event dari task/thread ini (wallet, strategi, worker)
+_context = contextvars.ContextVar("event_context", default={})
+_sinks = []
+
+
+def bind(**fields):
+    """Tambah field konteks; di asyncio berlaku untuk task ini dan task turunannya."""
+    _context.set({**_context.get(), **fields})
+
+
+def subscribe(sink):
+    _sinks.append(sink)
+
+
+def unsubscribe(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def emit(kind, **fields):
+    """
+    Event terstruktur untuk UI: round_start, tx_sent, tx_confirmed, error.
+    Dikirim ke semua sink (daemon: stream `logs`); tidak pernah melempar error.
+    """
+    event = {"type": kind, "ts": round(time.time(), 3), **_context.get(), **fields}
+    for sink in list(_sinks):
+        try:
+            sink(event)
+        except Exception:
+            pass
+    return event
+
+
+def stdout_sink(event):
+    sys.stdout.write(json.dumps({"event": event}) + "\n")
+
+
+if EVENTS_JSON:
+    subscribe(stdout_sink)
+
+
+def hex_hash(tx_hash):
+    value = tx_hash.hex() if isinstance(tx_hash, (bytes, bytearray)) else str(tx_hash)
+    return value if value.startswith("0x") else "0x" + value
+
+
+def track_tx(receipts, tx_hash, action, nonce=None, value=0):
+    """Emit tx_sent sekarang; begitu receipt ada: tx_confirmed + baris jurnal trade."""
+    context = _context.get()
+    sent_at = time.time()
+    tx_hash = hex_hash(tx_hash)
+    emit("tx_sent", hash=tx_hash, action=action, nonce=nonce, value=str(value))
+
+    def on_receipt(future):
+        if future.cancelled():
+            return
+        # Callback bisa jalan di thread/konteks lain → konteks saat kirim dipakai ulang
+        token = _context.set(context)
+        try:
+            error = future.exception()
+            if error is not None:
+                emit("error", hash=tx_hash, action=action, kind="receipt", message=str(error))
+                return
+            receipt = future.result()
+            journal.record(receipt, action, context.get("wallet"), context.get("strategy"))
+            emit(
+                "tx_confirmed",
+                hash=tx_hash,
+                action=action,
+                status=receipt.status,
+                block=receipt.get("blockNumber"),
+                gas_used=receipt.gasUsed,
+                seconds=round(time.time() - sent_at, 3),
+            )
+        finally:
+            _context.reset(token)
+
+    receipts.track(tx_hash, on_receipt)
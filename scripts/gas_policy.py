@@ -0,0 +1,218 @@
+import os
+import math
+import atexit
+import time
+from collections import deque
+from web3 import Web3
+from scripts.metrics import METRICS
+from scripts.json_cache import read_json, update_json
+
+CACHE_FILE = os.getenv("GAS_CACHE_FILE", ".cache/gas.json")
+
+# Gas limit awal per aksi (nilai lama yang dulu di-hardcode), dipakai sampai ada cukup sample
+DEFAULT_GAS_LIMITS = {
+    "wrap": 100000,
+    "approve": 80000,
+    "swap": 300000,
+    "add_liquidity": 400000,
+    "remove_liquidity": 300000,
+}
+FALLBACK_GAS_PRICE = Web3.to_wei('0.01', 'gwei')
+
+GAS_LIMIT_PERCENTILE = float(os.getenv("GAS_LIMIT_PERCENTILE", "95"))
+GAS_LIMIT_HEADROOM = float(os.getenv("GAS_LIMIT_HEADROOM", "1.25"))
+GAS_TIP_PERCENTILE = float(os.getenv("GAS_TIP_PERCENTILE", "50"))
+FEE_CACHE_TTL = float(os.getenv("FEE_CACHE_TTL", "1"))  # kira-kira satu block
+MIN_SAMPLES = 5
+# Detik antar tulis sample ke disk (sisanya ditulis saat proses keluar)
+GAS_SAVE_INTERVAL = 30
+# Key floor gas limit per aksi di entri chain .cache/gas.json
+FLOORS_KEY = "_floors"
+MAX_SAMPLES = 50
+# Floor sesudah out of gas berlaku selama ini (detik), atau sampai sekian receipt sukses
+# berikutnya (window persentil sudah terisi ulang), supaya satu sample buruk tidak permanen
+GAS_FLOOR_TTL = float(os.getenv("GAS_FLOOR_TTL", "3600"))
+GAS_FLOOR_SAMPLES = MAX_SAMPLES
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def live_floors(floors, now=None):
+    """Floor yang masih berlaku; format lama / rusak diabaikan."""
+    now = time.time() if now is None else now
+    return {
+        action: floor for action, floor in floors.items()
+        if isinstance(floor, dict) and floor.get("left", 0) > 0 and now - floor.get("set_at", 0) < GAS_FLOOR_TTL
+    }
+
+
+def newer_floor(a, b):
+    """Dua proses punya floor berbeda untuk aksi yang sama: OOG terbaru, lalu sisa sample paling sedikit."""
+    if a is None or b is None:
+        return a or b
+    return max(a, b, key=lambda floor: (floor["set_at"], -floor["left"]))
+
+
+class GasPolicy:
+    """
+    Fee dan gas limit untuk setiap tx.
+
+    Fee diambil dari `eth_feeHistory` (EIP-1559) atau `eth_gasPrice` untuk
+    chain legacy, di-cache selama kira-kira satu block. Gas limit per aksi
+    (wrap, approve, swap, add_liquidity, remove_liquidity) dipelajari dari
+    `gasUsed` di receipt: persentil ke-95 dari sample terakhir ditambah
+    headroom. Revert karena out of gas menaikkan floor limit aksi itu (1.5x
+    limit yang kurang) selama GAS_FLOOR_TTL atau GAS_FLOOR_SAMPLES receipt.
+    Sample + floor disimpan di `.cache/gas.json` per chain id, ditulis
+    berkala; sample baru digabung dengan sample proses lain di file.
+    """
+
+    def __init__(self, web3, receipts, chain_id, path=CACHE_FILE):
+        self.web3 = web3
+        self.receipts = receipts
+        self.chain_id = str(chain_id)
+        self.path = path
+        self.samples = {action: deque(maxlen=MAX_SAMPLES) for action in DEFAULT_GAS_LIMITS}
+        self.floors = {}       # action -> {"limit", "set_at", "left"} sesudah revert out of gas
+        self.unsaved = {}      # action -> sample yang belum ditulis ke disk
+        self._fees = None
+        self.updated_at = 0
+        self.dirty = False
+        self.saved_at = time.time()
+        self.load()
+        atexit.register(self.flush)
+
+    # ---------- disk ----------
+    def load(self):
+        self.apply(read_json(self.path, {}).get(self.chain_id, {}))
+
+    def apply(self, entry):
+        entry = dict(entry)
+        self.floors = live_floors(entry.pop(FLOORS_KEY, {}))
+        for action, values in entry.items():
+            samples = self.samples.setdefault(action, deque(maxlen=MAX_SAMPLES))
+            samples.clear()
+            samples.extend(values)
+
+    def save(self):
+        def update(data):
+            # Sample proses lain di file tetap ada: sample baru ditambahkan, bukan menimpa entri
+            entry = data.setdefault(self.chain_id, {})
+            saved_floors = entry.pop(FLOORS_KEY, {})
+            for action, values in self.unsaved.items():
+                entry[action] = (entry.get(action, []) + values)[-MAX_SAMPLES:]
+            floors = {
+                action: newer_floor(live_floors(saved_floors).get(action), self.floors.get(action))
+                for action in set(saved_floors) | set(self.floors)
+            }
+            entry[FLOORS_KEY] = live_floors({a: f for a, f in floors.items() if f is not None})
+        data = update_json(self.path, update, indent=None)
+        self.apply(data[self.chain_id])
+        self.unsaved = {}
+        self.dirty = False
+        self.saved_at = time.time()
+
+    def flush(self):
+        if self.dirty:
+            self.save()
+
+    # ---------- gas limit ----------
+    def limit(self, action):
+        samples = self.samples.get(action)
+        if not samples or len(samples) < MIN_SAMPLES:
+            limit = DEFAULT_GAS_LIMITS.get(action, max(DEFAULT_GAS_LIMITS.values()))
+        else:
+            limit = int(percentile(samples, GAS_LIMIT_PERCENTILE) * GAS_LIMIT_HEADROOM)
+        floor = live_floors(self.floors).get(action)
+        return max(limit, floor["limit"]) if floor else limit
+
+    def observe(self, action, gas_used):
+        self.samples.setdefault(action, deque(maxlen=MAX_SAMPLES)).append(gas_used)
+        self.unsaved.setdefault(action, []).append(gas_used)
+        floor = self.floors.get(action)
+        if floor:
+            floor["left"] -= 1
+        self.dirty = True
+        # Ditulis berkala, bukan tiap receipt (I/O blocking di event loop async)
+        if time.time() - self.saved_at >= GAS_SAVE_INTERVAL:
+            self.save()
+
+    def on_receipt(self, action, gas_limit, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        receipt = future.result()
+        METRICS.tx(action, receipt)
+        if receipt.status == 0 and receipt.gasUsed >= gas_limit * 0.98:
+            # Revert karena out of gas → limit aksi ini minimal 1.5x untuk sementara, sample gasUsed tidak diubah
+            current = live_floors(self.floors).get(action)
+            floor = max(current["limit"] if current else 0, int(gas_limit * 1.5))
+            print(f"⚠️ {action} kehabisan gas ({gas_limit}), limit dinaikkan ke {floor}")
+            self.floors[action] = {"limit": floor, "set_at": time.time(), "left": GAS_FLOOR_SAMPLES}
+            self.dirty = True
+        elif receipt.status == 1:
+            self.observe(action, receipt.gasUsed)
+
+    def track(self, tx_hash, action, gas_limit):
+        """Catat gasUsed tx ini begitu receipt-nya ada."""
+        self.receipts.track(tx_hash, lambda future: self.on_receipt(action, gas_limit, future))
+
+    # ---------- fee ----------
+    def from_history(self, history):
+        base_fees = history.get("baseFeePerGas") or []
+        if not base_fees or base_fees[-1] == 0:
+            return None
+        rewards = history.get("reward") or []
+        tip = rewards[-1][0] if rewards and rewards[-1] else 0
+        # Base fee bisa naik dua kali lipat sebelum tx masuk; yang terpakai tetap base + tip
+        return {
+            'maxFeePerGas': base_fees[-1] * 2 + tip,
+            'maxPriorityFeePerGas': tip,
+        }
+
+    def fees(self):
+        if self._fees is not None and time.time() - self.updated_at < FEE_CACHE_TTL:
+            return self._fees
+        fees = None
+        try:
+            fees = self.from_history(self.web3.eth.fee_history(1, "latest", [GAS_TIP_PERCENTILE]))
+        except Exception:
+            pass  # RPC tanpa eth_feeHistory → gasPrice legacy
+        if fees is None:
+            try:
+                fees = {'gasPrice': self.web3.eth.gas_price}
+            except Exception:
+                fees = {'gasPrice': FALLBACK_GAS_PRICE}
+        self._fees = fees
+        self.updated_at = time.time()
+        return fees
+
+    def params(self, action):
+        return {'gas': self.limit(action), **self.fees()}
+
+
+class AsyncGasPolicy(GasPolicy):
+    """GasPolicy untuk AsyncWeb3: hanya pengambilan fee yang async."""
+
+    async def fees(self):
+        if self._fees is not None and time.time() - self.updated_at < FEE_CACHE_TTL:
+            return self._fees
+        fees = None
+        try:
+            fees = self.from_history(await self.web3.eth.fee_history(1, "latest", [GAS_TIP_PERCENTILE]))
+        except Exception:
+            pass
+        if fees is None:
+            try:
+                fees = {'gasPrice': await self.web3.eth.gas_price}
+            except Exception:
+                fees = {'gasPrice': FALLBACK_GAS_PRICE}
+        self._fees = fees
+        self.updated_at = time.time()
+        return fees
+
+    async def params(self, action):
+        return {'gas': self.limit(action), **(await self.fees())}
@@ -0,0 +1,462 @@
+"""
+Jurnal trade lokal (SQLite, mode WAL): satu baris per tx yang sudah ada
+receipt-nya — swap, wrap, approve, mint/burn LP — dengan aliran ETH, token,
+LP dan gas yang dibayar, dari sudut pandang wallet pengirim.
+
+Baris di-decode dari log receipt (Transfer, Deposit/Withdrawal WETH,
+Mint/Burn pair), jadi tidak perlu read tambahan ke RPC. `record()` hanya
+memasukkan receipt ke antrean; decode + insert jalan di thread writer dalam
+batch, jalur trading tidak pernah menunggu disk.
+
+    python -m scripts.journal pnl [token|strategy|wallet|action] [jam]
+    python -m scripts.journal gas [token|strategy|wallet|action] [jam]
+    python -m scripts.journal timeline [detik_per_bucket] [jam]
+"""
+import os
+import sys
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from web3 import Web3
+
+# JOURNAL=0 mematikan jurnal
+JOURNAL = os.getenv("JOURNAL", "1") == "1"
+JOURNAL_FILE = os.getenv("JOURNAL_FILE", "data/journal.db")
+# Insert per transaksi SQLite dan jeda maksimal sebelum batch ditulis (detik)
+JOURNAL_BATCH = int(os.getenv("JOURNAL_BATCH", "500"))
+JOURNAL_FLUSH = float(os.getenv("JOURNAL_FLUSH", "1"))
+
+WETH_ADDRESS = Web3.to_checksum_address("0x776401b9bc8aae31a685731b7147d4445fd9fb19")
+
+TRANSFER_TOPIC = Web3.to_hex(Web3.keccak(text="Transfer(address,address,uint256)"))
+APPROVAL_TOPIC = Web3.to_hex(Web3.keccak(text="Approval(address,address,uint256)"))
+DEPOSIT_TOPIC = Web3.to_hex(Web3.keccak(text="Deposit(address,uint256)"))
+WITHDRAWAL_TOPIC = Web3.to_hex(Web3.keccak(text="Withdrawal(address,uint256)"))
+MINT_TOPIC = Web3.to_hex(Web3.keccak(text="Mint(address,uint256,uint256)"))
+BURN_TOPIC = Web3.to_hex(Web3.keccak(text="Burn(address,uint256,uint256,address)"))
+
+# Jumlah disimpan sebagai TEXT angka bulat dalam satuan terkecil (wei / raw token):
+# REAL (double) hanya persis sampai 2^53 wei (~0.009 ETH), INTEGER SQLite 64-bit bisa
+# lewat saat di-SUM. Penjumlahan lewat WEI_SUM (int Python), bukan SUM/TOTAL SQLite.
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS wallets (id INTEGER PRIMARY KEY, address TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS tokens (id INTEGER PRIMARY KEY, address TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    block INTEGER,
+    tx_hash TEXT NOT NULL UNIQUE,
+    wallet_id INTEGER NOT NULL REFERENCES wallets(id),
+    strategy TEXT,
+    action TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    token_id INTEGER REFERENCES tokens(id),
+    eth_delta TEXT NOT NULL,      -- ETH + WETH bersih wallet (+ masuk, - keluar), tanpa gas
+    token_delta TEXT NOT NULL,
+    lp_delta TEXT NOT NULL,
+    gas_used INTEGER NOT NULL,
+    gas_wei TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_ts ON trades(ts);
+CREATE INDEX IF NOT EXISTS trades_wallet_ts ON trades(wallet_id, ts);
+CREATE INDEX IF NOT EXISTS trades_token_ts ON trades(token_id, ts);
+CREATE INDEX IF NOT EXISTS trades_strategy_ts ON trades(strategy, ts);
+"""
+
+INSERT = """
+INSERT OR IGNORE INTO trades
+    (ts, block, tx_hash, wallet_id, strategy, action, status, token_id,
+     eth_delta, token_delta, lp_delta, gas_used, gas_wei)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Jurnal lama (kolom REAL): tabel dibuat ulang dengan kolom TEXT, nilai lama dibulatkan ke wei
+MIGRATE_V1 = """
+ALTER TABLE trades RENAME TO trades_real;
+DROP INDEX IF EXISTS trades_ts;
+DROP INDEX IF EXISTS trades_wallet_ts;
+DROP INDEX IF EXISTS trades_token_ts;
+DROP INDEX IF EXISTS trades_strategy_ts;
+"""
+COPY_V1 = """
+INSERT INTO trades
+SELECT id, ts, block, tx_hash, wallet_id, strategy, action, status, token_id,
+       printf('%.0f', eth_delta), printf('%.0f', token_delta), printf('%.0f', lp_delta),
+       gas_used, printf('%.0f', gas_wei)
+FROM trades_real;
+DROP TABLE trades_real;
+"""
+
+GROUPS = {
+    "token": "tokens.address",
+    "strategy": "trades.strategy",
+    "wallet": "wallets.address",
+    "action": "trades.action",
+}
+
+
+def _hex(value):
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    return value.lower() if value.startswith("0x") else "0x" + value.lower()
+
+
+def _topic_address(topic):
+    return Web3.to_checksum_address("0x" + _hex(topic)[-40:])
+
+
+def _amount(data):
+    raw = bytes(data) if not isinstance(data, str) else bytes.fromhex(data[2:])
+    return int.from_bytes(raw[:32], "big") if raw else 0
+
+
+def decode_receipt(receipt, wallet, weth=WETH_ADDRESS):
+    """
+    Aliran dana wallet dari log receipt: (token, eth_delta, token_delta, lp_delta).
+
+    ETH native dihitung lewat WETH router: Deposit router = ETH wallet yang
+    dipakai (sisa value di-refund), Withdrawal router = ETH yang dikirim ke
+    wallet. Wrap/unwrap wallet sendiri netral (ETH ↔ WETH).
+    """
+    logs = receipt.get("logs") or []
+    pairs = {
+        Web3.to_checksum_address(log["address"]) for log in logs
+        if log["topics"] and _hex(log["topics"][0]) in (MINT_TOPIC, BURN_TOPIC)
+    }
+    token = None
+    eth = tokens = lp = 0
+    for log in logs:
+        topics = log["topics"]
+        if not topics:
+            continue
+        kind = _hex(topics[0])
+        address = Web3.to_checksum_address(log["address"])
+        if kind == TRANSFER_TOPIC and len(topics) == 3:
+            sender, receiver = _topic_address(topics[1]), _topic_address(topics[2])
+            if wallet not in (sender, receiver) or sender == receiver:
+                continue
+            amount = _amount(log["data"])
+            delta = amount if receiver == wallet else -amount
+            if address == weth:
+                eth += delta
+            elif address in pairs:
+                lp += delta
+            else:
+                token = token or address
+                if address == token:
+                    tokens += delta
+        elif kind == APPROVAL_TOPIC and address != weth and address not in pairs:
+            token = token or address
+        elif address == weth and kind in (DEPOSIT_TOPIC, WITHDRAWAL_TOPIC):
+            # Wrap/unwrap wallet sendiri: WETH naik/turun, ETH sebaliknya → net 0
+            if _topic_address(topics[1]) != wallet:
+                amount = _amount(log["data"])
+                eth += -amount if kind == DEPOSIT_TOPIC else amount
+    return token, eth, tokens, lp
+
+
+class WeiSum:
+    """Aggregate SQLite WEI_SUM: jumlah persis kolom wei (TEXT) sebagai string angka bulat."""
+
+    def __init__(self):
+        self.total = 0
+
+    def step(self, value):
+        if value is not None:
+            self.total += int(value)
+
+    def finalize(self):
+        return str(self.total)
+
+
+def wei(value):
+    return int(value or 0)
+
+
+class Journal:
+    """
+    Writer jurnal: satu thread background per proses (dipakai semua wallet
+    dan strategi di proses itu), koneksi SQLite sendiri, insert per batch.
+    Query baca membuka koneksi terpisah, jadi tidak menunggu writer (WAL).
+    """
+
+    def __init__(self, path=JOURNAL_FILE, batch=JOURNAL_BATCH, interval=JOURNAL_FLUSH):
+        self.path = path
+        self.batch = batch
+        self.interval = interval
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.ids = {"wallets": {}, "tokens": {}}
+
+    # ---------- tulis ----------
+    def record(self, receipt, action, wallet=None, strategy=None):
+        """Antrekan receipt; tidak pernah memblok dan tidak pernah melempar error."""
+        if not JOURNAL:
+            return
+        self.start()
+        self.queue.put((time.time(), receipt, action, wallet, strategy))
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def close(self, timeout=5):
+        """Tulis sisa antrean lalu hentikan writer (dipanggil otomatis saat exit)."""
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+    def connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self.migrate(conn)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def migrate(self, conn):
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trades'").fetchone()
+        with conn:
+            if exists:
+                conn.executescript("BEGIN;" + MIGRATE_V1 + SCHEMA + COPY_V1 + "COMMIT;")
+                print("📒 Jurnal dimigrasi: jumlah wei disimpan sebagai angka bulat (TEXT)")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def run(self):
+        try:
+            conn = self.connect()
+        except sqlite3.Error as e:
+            print(f"⚠️ Journal tidak bisa dibuka ({self.path}): {e}")
+            return
+        stopping = False
+        while not stopping:
+            items = [self.queue.get()]
+            deadline = time.monotonic() + self.interval
+            while items[-1] is not None and len(items) < self.batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if items[-1] is None:
+                items.pop()
+                stopping = True
+            if items:
+                try:
+                    self.write(conn, items)
+                except Exception as e:
+                    print(f"⚠️ Journal: {len(items)} baris gagal ditulis: {e}")
+        conn.close()
+
+    def write(self, conn, items):
+        rows = []
+        with conn:
+            for ts, receipt, action, wallet, strategy in items:
+                wallet = Web3.to_checksum_address(wallet or receipt["from"])
+                token, eth, tokens, lp = decode_receipt(receipt, wallet)
+                gas_used = receipt.get("gasUsed") or 0
+                rows.append((
+                    ts,
+                    receipt.get("blockNumber"),
+                    _hex(receipt["transactionHash"]),
+                    self.id(conn, "wallets", wallet),
+                    strategy,
+                    action,
+                    receipt.get("status", 1),
+                    None if token is None else self.id(conn, "tokens", token),
+                    str(eth),
+                    str(tokens),
+                    str(lp),
+                    gas_used,
+                    str(gas_used * (receipt.get("effectiveGasPrice") or 0)),
+                ))
+            conn.executemany(INSERT, rows)
+
+    def id(self, conn, table, address):
+        cache = self.ids[table]
+        if address not in cache:
+            conn.execute(f"INSERT OR IGNORE INTO {table} (address) VALUES (?)", (address,))
+            cache[address] = conn.execute(f"SELECT id FROM {table} WHERE address = ?", (address,)).fetchone()[0]
+        return cache[address]
+
+    # ---------- query ----------
+    def query(self, sql, params):
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.create_aggregate("WEI_SUM", 1, WeiSum)
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def where(since=None, wallet=None, strategy=None):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("trades.ts >= ?")
+            params.append(since)
+        if wallet is not None:
+            clauses.append("wallets.address = ?")
+            params.append(Web3.to_checksum_address(wallet))
+        if strategy is not None:
+            clauses.append("trades.strategy = ?")
+            params.append(strategy)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def pnl(self, by="token", since=None, wallet=None, strategy=None):
+        """
+        Per grup: jumlah tx, revert, aliran ETH, gas dan PnL realisasi (ETH),
+        plus posisi token/LP bersih (raw, int) yang belum dijual / ditarik.
+        Dijumlah persis dalam wei (`pnl_wei`), baru dibagi 1e18 di akhir.
+        """
+        where, params = self.where(since, wallet, strategy)
+        sql = f"""
+            SELECT {GROUPS[by]} AS key,
+                   COUNT(*) AS txs,
+                   SUM(trades.status = 0) AS reverts,
+                   WEI_SUM(trades.eth_delta) AS eth_wei,
+                   WEI_SUM(trades.gas_wei) AS gas_wei,
+                   WEI_SUM(trades.token_delta) AS token_position,
+                   WEI_SUM(trades.lp_delta) AS lp_position
+            FROM trades
+            JOIN wallets ON wallets.id = trades.wallet_id
+            LEFT JOIN tokens ON tokens.id = trades.token_id
+            {where}
+            GROUP BY key
+        """
+        rows = self.query(sql, params)
+        for row in rows:
+            eth, gas = wei(row.pop("eth_wei")), wei(row.pop("gas_wei"))
+            row["pnl_wei"] = eth - gas
+            row["eth_flow"] = eth / 10 ** 18
+            row["gas"] = gas / 10 ** 18
+            row["pnl"] = row["pnl_wei"] / 10 ** 18
+            row["token_position"] = wei(row["token_position"])
+            row["lp_position"] = wei(row["lp_position"])
+        return sorted(rows, key=lambda row: row["pnl_wei"], reverse=True)
+
+    def gas(self, by="strategy", since=None, wallet=None, strategy=None):
+        """Gas per grup: total (ETH), gas unit rata-rata, dan per aksi."""
+        where, params = self.where(since, wallet, strategy)
+        sql = f"""
+            SELECT {GROUPS[by]} AS key,
+                   trades.action AS action,
+                   COUNT(*) AS txs,
+                   WEI_SUM(trades.gas_wei) AS gas_wei,
+                   AVG(trades.gas_used) AS avg_gas_used
+            FROM trades
+            JOIN wallets ON wallets.id = trades.wallet_id
+            LEFT JOIN tokens ON tokens.id = trades.token_id
+            {where}
+            GROUP BY key, action
+        """
+        rows = self.query(sql, params)
+        for row in rows:
+            row["gas_wei"] = wei(row["gas_wei"])
+            row["gas"] = row["gas_wei"] / 10 ** 18
+        return sorted(rows, key=lambda row: row["gas_wei"], reverse=True)
+
+    def gas_profile(self, since=None):
+        """{aksi: (gas unit rata-rata, harga gas rata-rata wei)} dari tx yang tercatat (dipakai backtest)."""
+        where, params = self.where(since)
+        sql = f"""
+            SELECT trades.action AS action,
+                   AVG(trades.gas_used) AS gas_used,
+                   TOTAL(trades.gas_used) AS total_gas_used,
+                   WEI_SUM(trades.gas_wei) AS gas_wei
+            FROM trades
+            JOIN wallets ON wallets.id = trades.wallet_id
+            {where}
+            GROUP BY action
+        """
+        return {
+            row["action"]: (row["gas_used"], wei(row["gas_wei"]) / max(row["total_gas_used"], 1))
+            for row in self.query(sql, params)
+        }
+
+    def timeline(self, bucket=3600, since=None, wallet=None, strategy=None):
+        """PnL per jendela waktu `bucket` detik + PnL kumulatif (dijumlah dalam wei)."""
+        where, params = self.where(since, wallet, strategy)
+        sql = f"""
+            SELECT CAST(trades.ts / ? AS INTEGER) * ? AS start,
+                   COUNT(*) AS txs,
+                   WEI_SUM(trades.eth_delta) AS eth_wei,
+                   WEI_SUM(trades.gas_wei) AS gas_wei
+            FROM trades
+            JOIN wallets ON wallets.id = trades.wallet_id
+            {where}
+            GROUP BY start
+            ORDER BY start
+        """
+        rows = self.query(sql, [bucket, bucket, *params])
+        cumulative = 0
+        for row in rows:
+            gas = wei(row.pop("gas_wei"))
+            pnl = wei(row.pop("eth_wei")) - gas
+            cumulative += pnl
+            row["gas"] = gas / 10 ** 18
+            row["pnl"] = pnl / 10 ** 18
+            row["cumulative"] = cumulative / 10 ** 18
+        return rows
+
+
+JOURNAL_WRITER = Journal()
+
+
+def record(receipt, action, wallet=None, strategy=None):
+    JOURNAL_WRITER.record(receipt, action, wallet, strategy)
+
+
+# ==================== CLI ====================
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "pnl"
+    if not os.path.exists(JOURNAL_FILE):
+        print(f"ℹ️ Jurnal belum ada: {JOURNAL_FILE}")
+        return
+    journal = JOURNAL_WRITER
+    if command == "timeline":
+        bucket = int(sys.argv[2]) if len(sys.argv) > 2 else 3600
+        hours = float(sys.argv[3]) if len(sys.argv) > 3 else 24
+        print(f"🕒 PnL per {bucket} detik, {hours:g} jam terakhir")
+        for row in journal.timeline(bucket, since=time.time() - hours * 3600):
+            start = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["start"]))
+            print(f"  {start}  tx {row['txs']:>6}  gas {row['gas']:.8f}  pnl {row['pnl']:+.8f}  total {row['cumulative']:+.8f} ETH")
+        return
+
+    by = sys.argv[2] if len(sys.argv) > 2 else ("token" if command == "pnl" else "strategy")
+    if by not in GROUPS:
+        raise ValueError(f"❌ Grup tidak dikenal: {by} (pilih {', '.join(GROUPS)})")
+    since = time.time() - float(sys.argv[3]) * 3600 if len(sys.argv) > 3 else None
+    if command == "pnl":
+        print(f"💰 PnL per {by} (ETH, gas sudah dipotong)")
+        for row in journal.pnl(by, since):
+            print(f"  {str(row['key'] or '-'):<42} tx {row['txs']:>6} (revert {row['reverts']})  "
+                  f"eth {row['eth_flow']:+.8f}  gas {row['gas']:.8f}  pnl {row['pnl']:+.8f}  "
+                  f"token {row['token_position']}  lp {row['lp_position']}")
+    elif command == "gas":
+        print(f"⛽ Gas per {by} per aksi (ETH)")
+        for row in journal.gas(by, since):
+            print(f"  {str(row['key'] or '-'):<42} {row['action']:<17} tx {row['txs']:>6}  "
+                  f"gas {row['gas']:.8f}  rata-rata {row['avg_gas_used']:.0f} unit")
+    else:
+        raise ValueError(f"❌ Perintah tidak dikenal: {command} (pnl / gas / timeline)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def lock_file(f, blocking=True):
+    """
+    Lock eksklusif antar proses pada file yang sudah dibuka (flock di Unix,
+    msvcrt.locking byte pertama di Windows). False kalau `blocking=False`
+    dan lock sedang dipegang proses lain.
+    """
+    if fcntl is not None:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+    while True:
+        f.seek(0)
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.05)
+
+
+def unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def locked(path):
+    """Lock eksklusif antar proses (file `<path>.lock`) untuk read-modify-write `path`."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "a+") as lock:
+        lock_file(lock)
+        try:
+            yield
+        finally:
+            unlock_file(lock)
+
+
+def read_json(path, default=None):
+    """Isi file JSON; `default` kalau belum ada atau rusak."""
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json(path, data, indent=2):
+    """Tulis atomik lewat temp file unik di direktori yang sama (aman ditulis beberapa proses)."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp", delete=False) as f:
+        json.dump(data, f, indent=indent)
+    try:
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+
+
+def update_json(path, update, indent=2):
+    """
+    Read-modify-write di bawah lock: `update(data)` mengubah dict hasil baca
+    file, lalu ditulis ulang. Entri milik proses lain tidak hilang.
+    """
+    with locked(path):
+        data = read_json(path, {})
+        update(data)
+        write_json(path, data, indent)
+        return data
@@ -0,0 +1,242 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from web3 import Web3
+from scripts.quoter import PAIR_ABI
+from scripts.token_registry import ZERO_ADDRESS
+
+# Pair dengan reserve WETH di bawah ini tidak di-trade (swap kecil pun kena impact besar / revert)
+MIN_LIQUIDITY_WETH = Web3.to_wei(float(os.getenv("MIN_LIQUIDITY_ETH", "0.005")), 'ether')
+LIQUIDITY_REFRESH = float(os.getenv("LIQUIDITY_REFRESH", "30"))   # detik
+VOLUME_BLOCKS = int(os.getenv("VOLUME_BLOCKS", "600"))            # jendela volume swap
+# Bobot volume relatif terhadap reserve saat memilih token
+VOLUME_WEIGHT = 0.5
+# Maksimal block per eth_getLogs
+MAX_LOG_RANGE = 1000
+
+SWAP_TOPIC = Web3.to_hex(Web3.keccak(text="Swap(address,uint256,uint256,uint256,uint256,address)"))
+
+
+def decode_swap(data):
+    """Data event Swap UniswapV2: amount0In, amount1In, amount0Out, amount1Out."""
+    raw = bytes(data) if not isinstance(data, str) else bytes.fromhex(data[2:])
+    return [int.from_bytes(raw[i:i + 32], "big") for i in range(0, 128, 32)]
+
+
+class LiquidityIndex:
+    """
+    Peringkat TOKEN_OUTS berdasarkan likuiditas pair WETH dan volume swap.
+
+    Reserve diambil dari Quoter (di-refresh tiap round), volume dari event
+    Swap pair di `VOLUME_BLOCKS` block terakhir (dibaca inkremental). Token
+    tanpa pair atau dengan reserve WETH di bawah `MIN_LIQUIDITY_WETH` tidak
+    masuk set tradable; sisanya dipilih acak dengan bobot reserve + volume.
+    """
+
+    def __init__(self, web3, registry, quoter, tokens, min_liquidity=MIN_LIQUIDITY_WETH):
+        self.web3 = web3
+        self.registry = registry
+        self.quoter = quoter
+        self.weth_address = quoter.weth_address
+        self.tokens = list(tokens)
+        self.min_liquidity = min_liquidity
+        self.swaps = deque()      # (block, token, volume_weth)
+        self.last_block = None
+        self.updated_at = 0
+        self._excluded = set()
+
+    @property
+    def reserves(self):
+        return self.quoter.reserves
+
+    # ---------- volume ----------
+    def pairs(self):
+        pairs = {}
+        for token in self.tokens:
+            pair = self.registry.pair(token)
+            if pair:
+                pairs[Web3.to_checksum_address(pair)] = token
+        return pairs
+
+    def add_logs(self, logs, pairs):
+        weth = self.weth_address.lower()
+        for log in logs:
+            token = pairs.get(Web3.to_checksum_address(log["address"]))
+            if token is None:
+                continue
+            amount0_in, amount1_in, amount0_out, amount1_out = decode_swap(log["data"])
+            if weth < token.lower():
+                volume = amount0_in + amount0_out
+            else:
+                volume = amount1_in + amount1_out
+            self.swaps.append((log["blockNumber"], token, volume))
+
+    def trim(self, latest):
+        while self.swaps and self.swaps[0][0] <= latest - VOLUME_BLOCKS:
+            self.swaps.popleft()
+
+    def log_range(self, latest):
+        start = latest - VOLUME_BLOCKS + 1 if self.last_block is None else self.last_block + 1
+        return max(start, latest - MAX_LOG_RANGE + 1, 0), latest
+
+    def volumes(self):
+        totals = {}
+        for _, token, volume in self.swaps:
+            totals[token] = totals.get(token, 0) + volume
+        return totals
+
+    # ---------- ranking ----------
+    def ranked(self):
+        """[(token, skor)] dari yang paling likuid; hanya token yang lolos threshold."""
+        volumes = self.volumes()
+        ranked = []
+        for token in self.tokens:
+            reserves = self.reserves.get(token)
+            if reserves is None or reserves[0] < self.min_liquidity:
+                continue
+            ranked.append((token, reserves[0] + VOLUME_WEIGHT * volumes.get(token, 0)))
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
+
+    def tradable(self):
+        return [token for token, _ in self.ranked()]
+
+    def report_excluded(self, ranked):
+        if not self.reserves:
+            return
+        excluded = set(self.tokens) - {token for token, _ in ranked}
+        if excluded != self._excluded and excluded:
+            symbols = ", ".join(self.registry.get(token, "symbol") or token[:8] for token in excluded)
+            print(f"🚫 Likuiditas rendah / tanpa pool, di-skip: {symbols}")
+        self._excluded = excluded
+
+    def choose(self, exclude=()):
+        ranked = [(token, score) for token, score in self.ranked() if token not in exclude]
+        if not ranked:
+            # Belum ada data reserve (mis. tanpa FACTORY_ADDRESS) → pilih acak seperti sebelumnya
+            return random.choice([token for token in self.tokens if token not in exclude] or self.tokens)
+        tokens, weights = zip(*ranked)
+        return random.choices(tokens, weights=weights)[0]
+
+    # ---------- refresh ----------
+    def refresh(self):
+        self.quoter.refresh(self.tokens)
+        pairs = self.pairs()
+        latest = self.quoter.block or self.web3.eth.block_number
+        if pairs:
+            from_block, to_block = self.log_range(latest)
+            try:
+                logs = self.web3.eth.get_logs({
+                    "address": list(pairs),
+                    "topics": [SWAP_TOPIC],
+                    "fromBlock": from_block,
+                    "toBlock": to_block,
+                })
+                self.add_logs(logs, pairs)
+                self.last_block = to_block
+            except Exception as e:
+                print(f"⚠️ Gagal baca volume swap: {e}")
+        self.trim(latest)
+        self.updated_at = time.time()
+        self.report_excluded(self.ranked())
+
+    def refresh_if_stale(self):
+        if time.time() - self.updated_at >= LIQUIDITY_REFRESH:
+            self.refresh()
+
+
+class AsyncLiquidityIndex(LiquidityIndex):
+    """
+    Versi AsyncWeb3 untuk async_engine: reserve dibaca sendiri (tanpa Quoter
+    sync) dan di-refresh oleh task background setiap `LIQUIDITY_REFRESH` detik.
+    Satu index di-share semua wallet (lihat wallet_pool.py).
+    """
+
+    def __init__(self, w3, registry, weth_address, factory, tokens, min_liquidity=MIN_LIQUIDITY_WETH):
+        self.web3 = w3
+        self.registry = registry
+        self.weth_address = weth_address
+        self.factory = factory
+        self.tokens = list(tokens)
+        self.min_liquidity = min_liquidity
+        self.swaps = deque()
+        self.last_block = None
+        self.updated_at = 0
+        self._excluded = set()
+        self._reserves = {}
+        self._task = None
+
+    @property
+    def reserves(self):
+        return self._reserves
+
+    async def resolve_pair(self, token):
+        pair = self.registry.get(token, "pair")
+        if pair is None and self.factory is not None:
+            pair = await self.factory.functions.getPair(self.weth_address, token).call()
+            if pair == ZERO_ADDRESS:
+                return None
+            self.registry.update(token, pair=pair)
+        return pair
+
+    async def fetch_reserves(self, token):
+        pair = await self.resolve_pair(token)
+        if not pair:
+            return None
+        contract = self.web3.eth.contract(address=Web3.to_checksum_address(pair), abi=PAIR_ABI)
+        reserve0, reserve1, _ = await contract.functions.getReserves().call()
+        # token0 UniswapV2 = address yang lebih kecil
+        if self.weth_address.lower() < token.lower():
+            return reserve0, reserve1
+        return reserve1, reserve0
+
+    def pairs(self):
+        pairs = {}
+        for token in self.tokens:
+            pair = self.registry.get(token, "pair")
+            if pair:
+                pairs[Web3.to_checksum_address(pair)] = token
+        return pairs
+
+    async def refresh(self):
+        results = await asyncio.gather(*(self.fetch_reserves(t) for t in self.tokens), return_exceptions=True)
+        for token, reserves in zip(self.tokens, results):
+            if isinstance(reserves, tuple):
+                self._reserves[token] = reserves
+            else:
+                self._reserves.pop(token, None)
+        self.registry.save()
+
+        latest = await self.web3.eth.block_number
+        pairs = self.pairs()
+        if pairs:
+            from_block, to_block = self.log_range(latest)
+            try:
+                logs = await self.web3.eth.get_logs({
+                    "address": list(pairs),
+                    "topics": [SWAP_TOPIC],
+                    "fromBlock": from_block,
+                    "toBlock": to_block,
+                })
+                self.add_logs(logs, pairs)
+                self.last_block = to_block
+            except Exception as e:
+                print(f"⚠️ Gagal baca volume swap: {e}")
+        self.trim(latest)
+        self.updated_at = time.time()
+        self.report_excluded(self.ranked())
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"⚠️ Liquidity index: {e}")
+            await asyncio.sleep(LIQUIDITY_REFRESH)
+
+    def start(self):
+        """Dipanggil dari dalam event loop; aman dipanggil berkali-kali."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import asyncio
+from web3 import Web3
+from scripts.journal import decode_receipt
+from scripts.json_cache import update_json
+from scripts.quoter import PAIR_ABI
+
+CACHE_FILE = os.getenv("LP_POSITIONS_FILE", ".cache/lp_positions.json")
+# Detik antar sweep balanceOf semua pair (posisi yang berubah di luar bot ikut terbaca)
+LP_RECONCILE = float(os.getenv("LP_RECONCILE", "300"))
+# Per siklus remove: fraksi LP yang ditarik per pair, jumlah pair, dan toleransi minimum
+LP_REMOVE_FRACTION = float(os.getenv("LP_REMOVE_FRACTION", "0.3"))
+LP_REMOVE_PAIRS = int(os.getenv("LP_REMOVE_PAIRS", "3"))
+LP_REMOVE_SLIPPAGE = float(os.getenv("LP_REMOVE_SLIPPAGE", "0.05"))
+# Pair yang remove-nya belum ada receipt tidak direncanakan ulang; lewat sekian detik dianggap lepas
+LP_INFLIGHT_TIMEOUT = float(os.getenv("LP_INFLIGHT_TIMEOUT", "300"))
+
+LP_ABI = PAIR_ABI + [
+    {"name": "balanceOf", "outputs": [{"type": "uint256"}], "inputs": [{"type": "address"}], "stateMutability": "view", "type": "function"},
+    {"name": "totalSupply", "outputs": [{"type": "uint256"}], "inputs": [], "stateMutability": "view", "type": "function"},
+]
+
+
+def removal_amounts(liquidity, total_supply, reserve_weth, reserve_token):
+    """Sama dengan UniswapV2Pair.burn: bagian reserve sebanding LP yang dibakar."""
+    if total_supply == 0:
+        return 0, 0
+    return liquidity * reserve_weth // total_supply, liquidity * reserve_token // total_supply
+
+
+class LpPositions:
+    """
+    Posisi LP wallet per pair WETH/token: LP yang dipegang, modal (ETH) dan
+    reserve saat add. Diisi dari receipt addLiquidity / removeLiquidity kita
+    sendiri, disimpan di `.cache/lp_positions.json` per chain + wallet.
+
+    Balance sebenarnya disamakan berkala lewat satu sweep balanceOf (batch)
+    untuk semua pair; LP yang ada sebelum ledger ini (atau dari skrip lain)
+    ikut terbaca dengan modal tidak diketahui.
+    """
+
+    def __init__(self, chain_id, owner, weth_address, registry, path=CACHE_FILE):
+        self.key = f"{chain_id}:{owner}"
+        self.owner = Web3.to_checksum_address(owner)
+        self.weth_address = weth_address
+        self.registry = registry
+        self.path = path
+        self.positions = {}      # token -> {"pair", "lp", "cost_eth", "entry_reserves", "opened_at", "removed_at"}
+        self.supply = {}         # token -> totalSupply LP saat sweep terakhir
+        self.inflight = {}       # token -> waktu direncanakan (remove belum ada receipt)
+        self.reconciled_at = 0
+        self.load()
+
+    # ---------- disk ----------
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.positions = json.load(f).get(self.key, {})
+        except (OSError, ValueError):
+            print(f"⚠️ Cache posisi LP {self.path} rusak, diabaikan.")
+            self.positions = {}
+
+    def save(self):
+        # Satu file untuk semua wallet: entri wallet lain (proses lain) tetap utuh
+        update_json(self.path, lambda data: data.update({self.key: self.positions}))
+
+    # ---------- dari receipt ----------
+    def on_add(self, token, pair, receipt, reserves=None):
+        if receipt.status != 1:
+            return
+        _, eth, tokens, lp = decode_receipt(receipt, self.owner, self.weth_address)
+        if lp <= 0:
+            return
+        position = self.positions.setdefault(token, {
+            "pair": pair, "lp": 0, "cost_eth": 0, "entry_reserves": None,
+            "opened_at": time.time(), "removed_at": 0,
+        })
+        position["lp"] += lp
+        if position["cost_eth"] is not None:
+            # Modal = ETH yang masuk pool + token yang masuk, dinilai di harga reserve saat add
+            cost = -eth
+            if reserves:
+                reserve_weth, reserve_token = reserves
+                cost += -tokens * reserve_weth // reserve_token if reserve_token else 0
+                position["entry_reserves"] = [reserve_weth, reserve_token]
+            position["cost_eth"] += cost
+        self.save()
+
+    def on_remove(self, token, receipt):
+        position = self.positions.get(token)
+        if position is None or receipt.status != 1:
+            return
+        _, _, _, lp = decode_receipt(receipt, self.owner, self.weth_address)
+        burned = min(-lp, position["lp"])
+        if burned <= 0:
+            return
+        if position["cost_eth"] is not None:
+            position["cost_eth"] -= position["cost_eth"] * burned // position["lp"]
+        position["lp"] -= burned
+        position["removed_at"] = time.time()
+        if position["lp"] == 0:
+            del self.positions[token]
+        self.save()
+
+    def track_add(self, receipts, tx_hash, token, pair, reserves=None):
+        """Posisi di-update begitu receipt add LP ada; tidak menunggu."""
+        def on_receipt(future):
+            if not future.cancelled() and future.exception() is None:
+                self.on_add(token, pair, future.result(), reserves)
+        receipts.track(tx_hash, on_receipt)
+
+    def track_remove(self, receipts, tx_hash, token):
+        def on_receipt(future):
+            self.release(token)
+            if not future.cancelled() and future.exception() is None:
+                self.on_remove(token, future.result())
+        receipts.track(tx_hash, on_receipt)
+
+    def release(self, token):
+        """Pair boleh direncanakan lagi (receipt remove ada, atau tx-nya tidak jadi dikirim)."""
+        self.inflight.pop(token, None)
+
+    # ---------- sweep ----------
+    def stale(self):
+        return time.time() - self.reconciled_at >= LP_RECONCILE
+
+    def candidates(self, tokens=()):
+        """Token posisi + `tokens` lain yang sudah punya pair (ikut sweep kalau sudah waktunya)."""
+        extra = [t for t in tokens if t not in self.positions and self.registry.get(t, "pair")] if self.stale() else []
+        return list(self.positions) + extra
+
+    def pair(self, token):
+        position = self.positions.get(token)
+        return Web3.to_checksum_address(position["pair"] if position else self.registry.get(token, "pair"))
+
+    def sweep_calls(self, web3, tokens):
+        """(token, field, call): totalSupply tiap pair, + balanceOf kalau sudah waktunya reconcile."""
+        balances = self.stale()
+        calls = []
+        for token in tokens:
+            contract = web3.eth.contract(address=self.pair(token), abi=LP_ABI)
+            calls.append((token, "supply", contract.functions.totalSupply()))
+            if balances:
+                calls.append((token, "lp", contract.functions.balanceOf(self.owner)))
+        return calls
+
+    def apply_sweep(self, calls, results):
+        changed = False
+        balances = False
+        for (token, field, _), value in zip(calls, results):
+            if value is None:
+                continue
+            if field == "supply":
+                self.supply[token] = value
+                continue
+            balances = True
+            position = self.positions.get(token)
+            if value == 0:
+                changed |= self.positions.pop(token, None) is not None
+            elif position is None:
+                self.positions[token] = {
+                    "pair": self.pair(token), "lp": value, "cost_eth": None, "entry_reserves": None,
+                    "opened_at": time.time(), "removed_at": 0,
+                }
+                changed = True
+            elif position["lp"] != value:
+                position["lp"] = value
+                changed = True
+        if balances:
+            self.reconciled_at = time.time()
+        if changed:
+            self.save()
+
+    def refresh(self, web3, batch, tokens):
+        """Sweep ditambahkan ke `batch` Multicall; `apply(results)` dipanggil setelah execute."""
+        calls = self.sweep_calls(web3, tokens)
+        slots = [batch.add(call) for _, _, call in calls]
+
+        def apply(results):
+            self.apply_sweep(calls, [results[slot] for slot in slots])
+        return apply
+
+    async def refresh_async(self, w3, tokens):
+        calls = self.sweep_calls(w3, tokens)
+        results = await asyncio.gather(*(call.call() for _, _, call in calls), return_exceptions=True)
+        self.apply_sweep(calls, [None if isinstance(r, Exception) else r for r in results])
+
+    # ---------- rencana remove ----------
+    def plan(self, reserves, fraction=LP_REMOVE_FRACTION, max_pairs=LP_REMOVE_PAIRS, slippage=LP_REMOVE_SLIPPAGE):
+        """
+        Remove beberapa pair sekaligus: posisi yang paling lama tidak ditarik
+        lebih dulu, lalu yang nilainya terbesar. Minimum ETH/token dihitung
+        dari reserve + totalSupply terbaru, bukan 0.
+
+        Pair yang masuk rencana ditandai in-flight sampai receipt remove-nya
+        ada (`track_remove`) atau `release`, supaya siklus lain yang jalan
+        bersamaan tidak menarik LP yang sama dua kali.
+        """
+        now = time.time()
+        def value(token):
+            if token not in reserves or not self.supply.get(token):
+                return 0
+            return removal_amounts(self.positions[token]["lp"], self.supply[token], *reserves[token])[0]
+
+        order = sorted(self.positions, key=lambda t: (self.positions[t]["removed_at"], -value(t)))
+        plans = []
+        for token in order:
+            if len(plans) >= max_pairs:
+                break
+            if now - self.inflight.get(token, 0) < LP_INFLIGHT_TIMEOUT:
+                continue
+            position = self.positions[token]
+            supply = self.supply.get(token)
+            if token not in reserves or not supply:
+                continue
+            liquidity = int(position["lp"] * fraction)
+            if liquidity == 0:
+                continue
+            amount_eth, amount_token = removal_amounts(liquidity, supply, *reserves[token])
+            if amount_eth == 0 or amount_token == 0:
+                continue
+            cost = position["cost_eth"]
+            plans.append({
+                "token": token,
+                "pair": Web3.to_checksum_address(position["pair"]),
+                "liquidity": liquidity,
+                "amount_eth_min": int(amount_eth * (1 - slippage)),
+                "amount_token_min": int(amount_token * (1 - slippage)),
+                # Nilai bagian yang ditarik (sisi token dinilai di harga pool) vs modal bagian itu
+                "value_eth": amount_eth * 2,
+                "cost_eth": None if cost is None else cost * liquidity // position["lp"],
+            })
+            self.inflight[token] = now
+        return plans
@@ -0,0 +1,249 @@
+import os
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from web3.middleware import Web3Middleware
+
+# Endpoint Prometheus /metrics; 0 = mati (daemon default 9464, lihat daemon.py)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Detik antar baris ringkasan di log; 0 = mati
+METRICS_SUMMARY = float(os.getenv("METRICS_SUMMARY", "60"))
+
+# Batas bucket histogram latency (detik)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # terakhir = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = 0
+        while index < len(BUCKETS) and value > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Perkiraan dari batas atas bucket."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return BUCKETS[index] if index < len(BUCKETS) else float("inf")
+        return float("inf")
+
+
+def rpc_error_kind(response):
+    error = response.get("error") if isinstance(response, dict) else None
+    if not error:
+        return None
+    message = str(error.get("message", "")).lower() if isinstance(error, dict) else str(error).lower()
+    return "revert" if "revert" in message else "rpc_error"
+
+
+class Metrics:
+    """
+    Counter + histogram proses ini: latency per method JSON-RPC dan per
+    langkah strategi, error per kelas, tx per aksi/status dan gas yang
+    dibayar. Dibaca lewat `/metrics` (format Prometheus) dan baris ringkasan.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rpc = {}            # method -> Histogram
+        self.rpc_errors = {}     # (method, kelas) -> jumlah
+        self.steps = {}          # langkah -> Histogram
+        self.errors = {}         # kelas -> jumlah
+        self.txs = {}            # (aksi, status) -> jumlah
+        self.gas_spent = {}      # aksi -> wei
+        self.started_at = time.time()
+
+    def _inc(self, table, key, value=1):
+        with self.lock:
+            table[key] = table.get(key, 0) + value
+
+    def _observe(self, table, key, value):
+        with self.lock:
+            table.setdefault(key, Histogram()).observe(value)
+
+    # ---------- record ----------
+    def rpc_call(self, method, elapsed, error_kind=None):
+        self._observe(self.rpc, method, elapsed)
+        if error_kind is not None:
+            self._inc(self.rpc_errors, (method, error_kind))
+
+    def step_time(self, name, elapsed):
+        self._observe(self.steps, name, elapsed)
+
+    @contextmanager
+    def step(self, name):
+        """`with METRICS.step("swap"): ...` — juga bisa membungkus `await`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.step_time(name, time.perf_counter() - started)
+
+    def error(self, kind):
+        self._inc(self.errors, kind)
+
+    def tx(self, action, receipt):
+        status = "success" if receipt.status == 1 else "revert"
+        self._inc(self.txs, (action, status))
+        price = receipt.get("effectiveGasPrice") or 0
+        self._inc(self.gas_spent, action, receipt.gasUsed * price)
+
+    # ---------- export ----------
+    def render(self):
+        """Format teks Prometheus."""
+        lines = []
+        with self.lock:
+            lines += self._histograms("automega_rpc_latency_seconds", "method", self.rpc)
+            lines.append("# TYPE automega_rpc_errors_total counter")
+            for (method, kind), count in sorted(self.rpc_errors.items()):
+                lines.append(f'automega_rpc_errors_total{{method="{method}",kind="{kind}"}} {count}')
+            lines += self._histograms("automega_step_latency_seconds", "step", self.steps)
+            lines.append("# TYPE automega_errors_total counter")
+            for kind, count in sorted(self.errors.items()):
+                lines.append(f'automega_errors_total{{kind="{kind}"}} {count}')
+            lines.append("# TYPE automega_tx_total counter")
+            for (action, status), count in sorted(self.txs.items()):
+                lines.append(f'automega_tx_total{{action="{action}",status="{status}"}} {count}')
+            lines.append("# TYPE automega_gas_spent_wei_total counter")
+            for action, wei in sorted(self.gas_spent.items()):
+                lines.append(f'automega_gas_spent_wei_total{{action="{action}"}} {wei}')
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histograms(name, label, table):
+        lines = [f"# TYPE {name} histogram"]
+        for key, histogram in sorted(table.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label}="{key}"}} {histogram.sum:.6f}')
+            lines.append(f'{name}_count{{{label}="{key}"}} {histogram.count}')
+        return lines
+
+    def summary(self):
+        """Satu baris: total RPC + 3 method teratas, tx, revert, gas."""
+        with self.lock:
+            calls = sum(h.count for h in self.rpc.values())
+            top = sorted(self.rpc.items(), key=lambda item: item[1].count, reverse=True)[:3]
+            methods = ", ".join(
+                f"{method} {h.count} p50 {h.quantile(0.5) * 1000:.0f}ms p99 {h.quantile(0.99) * 1000:.0f}ms"
+                for method, h in top
+            )
+            txs = sum(self.txs.values())
+            reverts = sum(count for (_, status), count in self.txs.items() if status == "revert")
+            gas = sum(self.gas_spent.values())
+            errors = sum(self.errors.values())
+        minutes = max((time.time() - self.started_at) / 60, 1 / 60)
+        return (f"📈 RPC {calls} call ({calls / minutes:.0f}/menit; {methods or '-'}) | "
+                f"tx {txs} (revert {reverts}) | gas {gas / 10 ** 18:.8f} ETH | error {errors}")
+
+
+METRICS = Metrics()
+
+
+class MetricsMiddleware(Web3Middleware):
+    """Middleware web3: hitung call + latency per method JSON-RPC ke METRICS."""
+
+    def wrap_make_request(self, make_request):
+        def middleware(method, params):
+            started = time.perf_counter()
+            try:
+                response = make_request(method, params)
+            except Exception as e:
+                METRICS.rpc_call(method, time.perf_counter() - started, type(e).__name__)
+                raise
+            METRICS.rpc_call(method, time.perf_counter() - started, rpc_error_kind(response))
+            return response
+        return middleware
+
+    async def async_wrap_make_request(self, make_request):
+        async def middleware(method, params):
+            started = time.perf_counter()
+            try:
+                response = await make_request(method, params)
+            except Exception as e:
+                METRICS.rpc_call(method, time.perf_counter() - started, type(e).__name__)
+                raise
+            METRICS.rpc_call(method, time.perf_counter() - started, rpc_error_kind(response))
+            return response
+        return middleware
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_summary = None
+
+
+def serve(port=METRICS_PORT, host=METRICS_HOST):
+    """HTTP /metrics di thread background; sekali per proses."""
+    global _server
+    if _server is not None or not port:
+        return _server
+    try:
+        _server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ /metrics tidak bisa dibuka di {host}:{port}: {e}")
+        return None
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    print(f"📈 Metrics: http://{host}:{port}/metrics")
+    return _server
+
+
+def summary_thread(interval=METRICS_SUMMARY):
+    global _summary
+    if _summary is not None:
+        return
+    def loop():
+        while True:
+            time.sleep(interval)
+            print(METRICS.summary())
+    _summary = threading.Thread(target=loop, daemon=True)
+    _summary.start()
+
+
+async def summary_loop(interval=METRICS_SUMMARY):
+    """Versi asyncio (daemon): print dari event loop, bukan dari thread lain."""
+    while True:
+        await asyncio.sleep(interval)
+        print(METRICS.summary())
+
+
+def instrument(web3, summary=True):
+    """Pasang middleware metrics ke `web3`, buka /metrics dan ringkasan berkala (skrip sync)."""
+    if "metrics" not in web3.middleware_onion:
+        web3.middleware_onion.add(MetricsMiddleware, "metrics")
+    serve()
+    if summary and METRICS_SUMMARY > 0:
+        summary_thread(METRICS_SUMMARY)
+    return web3
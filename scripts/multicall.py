@@ -0,0 +1,138 @@
+import os
+from web3 import Web3
+from scripts.rpc import warn_no_batch
+
+try:
+    from web3.exceptions import Web3TypeError
+except ImportError:  # web3 v6: belum ada batch_requests
+    Web3TypeError = TypeError
+
+# Alamat Multicall3 sama di hampir semua chain EVM
+MULTICALL3_ADDRESS = Web3.to_checksum_address(
+    os.getenv("MULTICALL_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+)
+
+MULTICALL3_ABI = [
+    {
+        "name": "aggregate3",
+        "type": "function",
+        "stateMutability": "payable",
+        "inputs": [{
+            "name": "calls",
+            "type": "tuple[]",
+            "components": [
+                {"name": "target", "type": "address"},
+                {"name": "allowFailure", "type": "bool"},
+                {"name": "callData", "type": "bytes"},
+            ],
+        }],
+        "outputs": [{
+            "name": "returnData",
+            "type": "tuple[]",
+            "components": [
+                {"name": "success", "type": "bool"},
+                {"name": "returnData", "type": "bytes"},
+            ],
+        }],
+    },
+    {"name": "getEthBalance", "type": "function", "stateMutability": "view",
+     "inputs": [{"name": "addr", "type": "address"}], "outputs": [{"name": "balance", "type": "uint256"}]},
+    {"name": "getBlockNumber", "type": "function", "stateMutability": "view",
+     "inputs": [], "outputs": [{"name": "blockNumber", "type": "uint256"}]},
+]
+
+
+class ReadBatch:
+    """Kumpulan view call satu round; `add` mengembalikan index hasil di `execute()`."""
+
+    def __init__(self, multicall):
+        self.multicall = multicall
+        self.calls = []
+
+    def add(self, fn):
+        self.calls.append(fn)
+        return len(self.calls) - 1
+
+    def add_eth_balance(self, address):
+        return self.add(self.multicall.contract.functions.getEthBalance(address))
+
+    def add_block_number(self):
+        return self.add(self.multicall.contract.functions.getBlockNumber())
+
+    def execute(self):
+        return self.multicall.execute(self.calls)
+
+
+class Multicall:
+    """
+    Kirim banyak view call dalam satu `eth_call` lewat Multicall3 `aggregate3`.
+
+    Call yang gagal menghasilkan None tanpa menggagalkan call lain. Kalau
+    Multicall3 tidak ada di chain, fallback ke JSON-RPC batch, lalu ke call
+    satu per satu.
+    """
+
+    def __init__(self, web3, address=MULTICALL3_ADDRESS):
+        self.web3 = web3
+        self.contract = web3.eth.contract(address=address, abi=MULTICALL3_ABI)
+        self._deployed = None
+
+    def batch(self):
+        return ReadBatch(self)
+
+    def is_deployed(self):
+        if self._deployed is None:
+            self._deployed = len(self.web3.eth.get_code(self.contract.address)) > 0
+        return self._deployed
+
+    def decode(self, fn, success, data):
+        if not success or not data:
+            return None
+        types = [output["type"] for output in fn.abi["outputs"]]
+        try:
+            values = self.web3.codec.decode(types, data)
+        except Exception:
+            return None
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def execute(self, fns):
+        if not fns:
+            return []
+        if not self.is_deployed():
+            return self.execute_fallback(fns)
+
+        calls = [(fn.address, True, fn._encode_transaction_data()) for fn in fns]
+        results = self.contract.functions.aggregate3(calls).call()
+        return [self.decode(fn, success, data) for fn, (success, data) in zip(fns, results)]
+
+    def native_request(self, eth, fn):
+        """Helper Multicall3 (saldo ETH, block number) diganti RPC biasa saat fallback."""
+        if fn.address != self.contract.address:
+            return None
+        if fn.fn_name == "getEthBalance":
+            return lambda: eth.get_balance(fn.args[0])
+        if fn.fn_name == "getBlockNumber":
+            return lambda: eth.get_block_number()
+        return None
+
+    def execute_fallback(self, fns):
+        if hasattr(self.web3, "batch_requests"):
+            try:
+                with self.web3.batch_requests() as batch:
+                    for fn in fns:
+                        native = self.native_request(self.web3.eth, fn)
+                        batch.add(native() if native else fn)
+                    return list(batch.execute())
+            except Web3TypeError as e:
+                warn_no_batch(self.web3.provider, e)
+            except Exception:
+                pass  # satu call error → ulang satu per satu supaya error per call
+
+        results = []
+        for fn in fns:
+            try:
+                native = self.native_request(self.web3.eth, fn)
+                results.append(native() if native else fn.call())
+            except Exception:
+                results.append(None)
+        return results
@@ -0,0 +1,108 @@
+import threading
+from scripts.receipt_tracker import ReceiptTracker
+from scripts.metrics import METRICS
+
+
+class NonceManager:
+    """
+    Pembagi nonce lokal per wallet.
+
+    Nonce dibagikan dari counter di memory sehingga wrap → approve → swap bisa
+    di-broadcast berurutan tanpa menunggu receipt satu per satu. Sync ke chain
+    hanya dilakukan saat start, atau saat ada gap (tx gagal kirim / drop).
+    """
+
+    def __init__(self, web3, address, receipts=None):
+        self.web3 = web3
+        self.address = address
+        # Tracker bisa di-share; None → tracker sendiri (dibuat saat wait pertama)
+        self.receipts = receipts
+        self.pending = {}      # nonce -> tx_hash yang sudah di-broadcast
+        self.confirmed = -1    # nonce tertinggi yang sudah masuk block
+        self._next = None
+        self.epoch = 0         # naik tiap sync ulang; tx pre-signed dari epoch lama tidak valid
+        self._lock = threading.Lock()
+
+    def sync(self):
+        """Ambil ulang nonce dari chain dan buang tx pending yang sudah tidak ada."""
+        with self._lock:
+            return self._sync()
+
+    def _sync(self):
+        # Lock harus dipegang: fetch + reset satu langkah, thread lain tidak ikut sync
+        # lalu membagikan nonce yang sama
+        chain_nonce = self.web3.eth.get_transaction_count(self.address, "pending")
+        self.reset(chain_nonce)
+        return chain_nonce
+
+    def reset(self, chain_nonce):
+        # Dipanggil dengan lock dipegang (atau dari event loop async yang single-thread)
+        self._next = chain_nonce
+        self.epoch += 1
+        for nonce in [n for n in self.pending if n >= chain_nonce]:
+            # Tidak ada di mempool lagi → dianggap drop
+            del self.pending[nonce]
+
+    def needs_sync(self):
+        return self._next is None
+
+    def allocate(self):
+        with self._lock:
+            if self._next is None:
+                self._sync()
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def mark_sent(self, nonce, tx_hash):
+        with self._lock:
+            self.pending[nonce] = tx_hash
+
+    def nonce_of(self, tx_hash):
+        for nonce, pending_hash in self.pending.items():
+            if pending_hash == tx_hash:
+                return nonce
+        return None
+
+    def release(self, nonce):
+        """Kembalikan nonce yang gagal di-broadcast."""
+        with self._lock:
+            if self._next is not None and nonce == self._next - 1:
+                self._next = nonce
+            else:
+                # Ada nonce di atasnya yang sudah terpakai → gap, sync ulang nanti
+                self._next = None
+
+    def confirm(self, nonce):
+        """Receipt nonce N berarti semua nonce ≤ N sudah masuk block."""
+        with self._lock:
+            self.confirmed = max(self.confirmed, nonce)
+            for n in [n for n in self.pending if n <= nonce]:
+                del self.pending[n]
+
+    def drop(self, nonce):
+        """Tx tidak kunjung masuk block → paksa sync ulang sebelum alokasi berikutnya."""
+        with self._lock:
+            self.pending.pop(nonce, None)
+            self._next = None
+
+    def invalidate(self):
+        """Nonce yang sudah dibagikan mungkin tidak pernah terkirim → sync ulang."""
+        with self._lock:
+            self._next = None
+
+    def wait(self, tx_hash, timeout=None):
+        """Tunggu receipt tx terakhir di satu round lalu update status nonce."""
+        if self.receipts is None:
+            self.receipts = ReceiptTracker(self.web3)
+        nonce = self.nonce_of(tx_hash)
+        try:
+            with METRICS.step("receipt_wait"):
+                receipt = self.receipts.wait(tx_hash, timeout=timeout)
+        except Exception:
+            if nonce is not None:
+                self.drop(nonce)
+            raise
+        if nonce is not None:
+            self.confirm(nonce)
+        return receipt
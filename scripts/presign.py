@@ -0,0 +1,192 @@
+import os
+import time
+import asyncio
+from scripts.metrics import METRICS
+from scripts.events import track_tx
+
+# Round yang sudah di-sign lebih lama dari ini dibuang (quote & fee sudah basi)
+PRESIGN_MAX_AGE = float(os.getenv("PRESIGN_MAX_AGE", "60"))
+
+
+class SignedTx:
+    def __init__(self, nonce, action, raw, gas_limit, value=0):
+        self.nonce = nonce
+        self.action = action
+        self.raw = raw
+        self.gas_limit = gas_limit
+        self.value = value
+
+
+class PreparedRound:
+    """
+    Tx satu round yang sudah di-build + sign dengan nonce yang di-reserve.
+
+    `check()` (opsional) dipanggil tepat sebelum broadcast; False berarti
+    quote sudah tidak valid (amountOutMin akan revert).
+    """
+
+    def __init__(self, epoch, txs, meta=None, check=None):
+        self.epoch = epoch
+        self.txs = txs
+        self.meta = meta or {}
+        self.check = check
+        self.created_at = time.time()
+
+    @property
+    def nonces(self):
+        return [tx.nonce for tx in self.txs]
+
+
+class TxSigner:
+    """
+    Build + sign tx tanpa broadcast, supaya round berikutnya bisa disiapkan
+    selagi round sekarang menunggu receipt. `send()` = prepare + broadcast
+    langsung, dipakai untuk tx biasa.
+    """
+
+    def __init__(self, web3, private_key, chain_id, nonces, gas, sender):
+        self.web3 = web3
+        self.private_key = private_key
+        self.address = web3.eth.account.from_key(private_key).address
+        self.chain_id = chain_id
+        self.nonces = nonces
+        self.gas = gas
+        self.sender = sender
+
+    def sign(self, fn, action, params, nonce):
+        tx = fn.build_transaction({
+            **self.gas.params(action),
+            **(params or {}),
+            'from': self.address,
+            'nonce': nonce,
+            'chainId': self.chain_id
+        })
+        signed = self.web3.eth.account.sign_transaction(tx, self.private_key)
+        return SignedTx(nonce, action, signed.raw_transaction, tx['gas'], tx.get('value', 0))
+
+    def prepare(self, steps, meta=None, check=None, nonces=None):
+        """
+        `steps`: [(fn, action, params)]. `nonces` dipakai ulang dari round
+        yang quote-nya basi (jumlahnya harus sama dengan jumlah step).
+        """
+        reserved = list(nonces) if nonces else [self.nonces.allocate() for _ in steps]
+        # Dibaca sesudah allocate: allocate pertama bisa memicu sync (epoch naik)
+        epoch = self.nonces.epoch
+        try:
+            txs = [self.sign(fn, action, params, nonce) for (fn, action, params), nonce in zip(steps, reserved)]
+        except BaseException:
+            # Termasuk KeyboardInterrupt: nonce yang di-reserve tidak boleh hilang
+            self.release(reserved)
+            raise
+        return PreparedRound(epoch, txs, meta, check)
+
+    def nonce_valid(self, prepared):
+        return prepared.epoch == self.nonces.epoch and not self.nonces.needs_sync()
+
+    def valid(self, prepared):
+        if not self.nonce_valid(prepared):
+            return False
+        if time.time() - prepared.created_at > PRESIGN_MAX_AGE:
+            return False
+        return prepared.check is None or prepared.check()
+
+    def release(self, nonces):
+        # Urut turun supaya nonce teratas dikembalikan lebih dulu (tanpa gap)
+        for nonce in sorted(nonces, reverse=True):
+            self.nonces.release(nonce)
+
+    def discard(self, prepared):
+        # Nonce dari epoch lama sudah tidak berlaku, tidak perlu dikembalikan
+        if self.nonce_valid(prepared):
+            self.release(prepared.nonces)
+
+    def broadcast(self, prepared):
+        hashes = []
+        for index, tx in enumerate(prepared.txs):
+            try:
+                tx_hash = self.sender.send_raw(tx.raw)
+            except Exception:
+                self.release(prepared.nonces[index:])
+                raise
+            self.nonces.mark_sent(tx.nonce, tx_hash)
+            self.gas.track(tx_hash, tx.action, tx.gas_limit)
+            track_tx(self.gas.receipts, tx_hash, tx.action, tx.nonce, tx.value)
+            hashes.append(tx_hash)
+        return hashes
+
+    def send(self, fn, action, params=None):
+        with METRICS.step(action):
+            return self.broadcast(self.prepare([(fn, action, params)]))[0]
+
+
+class AsyncTxSigner(TxSigner):
+    """TxSigner untuk AsyncWeb3 (async_engine)."""
+
+    def __init__(self, w3, account, chain_id, nonces, gas, sender):
+        self.web3 = w3
+        self.private_key = account.key
+        self.address = account.address
+        self.chain_id = chain_id
+        self.nonces = nonces
+        self.gas = gas
+        self.sender = sender
+        # Hanya satu coroutine yang sync ke chain; yang lain menunggu hasilnya
+        self.sync_lock = asyncio.Lock()
+
+    async def allocate(self):
+        # Tanpa await antara cek terakhir dan allocate → tidak ada reset lain di sela-selanya
+        while self.nonces.needs_sync():
+            async with self.sync_lock:
+                if self.nonces.needs_sync():
+                    self.nonces.reset(await self.web3.eth.get_transaction_count(self.address, "pending"))
+        return self.nonces.allocate()
+
+    async def sign(self, fn, action, params, nonce):
+        tx = await fn.build_transaction({
+            **(await self.gas.params(action)),
+            **(params or {}),
+            'from': self.address,
+            'nonce': nonce,
+            'chainId': self.chain_id
+        })
+        signed = self.web3.eth.account.sign_transaction(tx, self.private_key)
+        return SignedTx(nonce, action, signed.raw_transaction, tx['gas'], tx.get('value', 0))
+
+    async def prepare(self, steps, meta=None, check=None, nonces=None):
+        reserved = list(nonces) if nonces else []
+        try:
+            if not nonces:
+                for _ in steps:
+                    reserved.append(await self.allocate())
+            epoch = self.nonces.epoch
+            txs = [await self.sign(fn, action, params, nonce) for (fn, action, params), nonce in zip(steps, reserved)]
+        except BaseException:
+            # Termasuk CancelledError (daemon stop di tengah sign): nonce dikembalikan
+            self.release(reserved)
+            raise
+        return PreparedRound(epoch, txs, meta, check)
+
+    async def valid(self, prepared):
+        if not self.nonce_valid(prepared):
+            return False
+        if time.time() - prepared.created_at > PRESIGN_MAX_AGE:
+            return False
+        return prepared.check is None or await prepared.check()
+
+    async def broadcast(self, prepared):
+        hashes = []
+        for index, tx in enumerate(prepared.txs):
+            try:
+                tx_hash = await self.sender.send_raw(tx.raw)
+            except Exception:
+                self.release(prepared.nonces[index:])
+                raise
+            self.nonces.mark_sent(tx.nonce, tx_hash)
+            self.gas.track(tx_hash, tx.action, tx.gas_limit)
+            track_tx(self.gas.receipts, tx_hash, tx.action, tx.nonce, tx.value)
+            hashes.append(tx_hash)
+        return hashes
+
+    async def send(self, fn, action, params=None):
+        with METRICS.step(action):
+            return (await self.broadcast(await self.prepare([(fn, action, params)])))[0]
@@ -0,0 +1,202 @@
+import math
+import time
+from scripts.multicall import Multicall
+
+# UniswapV2: fee 0.3% → amount_in dikali 997/1000
+FEE_NUMERATOR = 997
+FEE_DENOMINATOR = 1000
+
+PAIR_ABI = [
+    {"name": "getReserves", "type": "function", "stateMutability": "view", "inputs": [],
+     "outputs": [{"name": "reserve0", "type": "uint112"}, {"name": "reserve1", "type": "uint112"},
+                 {"name": "blockTimestampLast", "type": "uint32"}]},
+]
+
+
+def get_amount_out(amount_in, reserve_in, reserve_out):
+    """Sama persis dengan UniswapV2Library.getAmountOut (integer, dibulatkan ke bawah)."""
+    if amount_in <= 0 or reserve_in <= 0 or reserve_out <= 0:
+        return 0
+    amount_in_with_fee = amount_in * FEE_NUMERATOR
+    return (amount_in_with_fee * reserve_out) // (reserve_in * FEE_DENOMINATOR + amount_in_with_fee)
+
+
+def get_amount_in(amount_out, reserve_in, reserve_out):
+    """Sama persis dengan UniswapV2Library.getAmountIn; None kalau melebihi reserve."""
+    if amount_out <= 0 or reserve_in <= 0 or amount_out >= reserve_out:
+        return None
+    return (reserve_in * amount_out * FEE_DENOMINATOR) // ((reserve_out - amount_out) * FEE_NUMERATOR) + 1
+
+
+def quote_liquidity(amount_a, reserve_a, reserve_b):
+    """Sama dengan UniswapV2Library.quote: pasangan amount_a di rasio reserve (tanpa fee)."""
+    if amount_a <= 0 or reserve_a <= 0 or reserve_b <= 0:
+        return 0
+    return amount_a * reserve_b // reserve_a
+
+
+def optimal_swap_amount(amount_in, reserve_in):
+    """
+    Bagian `amount_in` yang di-swap supaya sisa + hasil swap pas dengan rasio
+    pool sesudah swap (zap satu sisi). Akar positif dari
+    γ·s² + r·(1+γ)·s − r·A = 0, dengan γ = 997/1000:
+    s = (√(r²(d+n)² + 4·n·d·r·A) − r(d+n)) / 2n
+    """
+    if amount_in <= 0 or reserve_in <= 0:
+        return 0
+    n, d = FEE_NUMERATOR, FEE_DENOMINATOR
+    root = math.isqrt(reserve_in * (reserve_in * (d + n) ** 2 + 4 * n * d * amount_in))
+    return (root - reserve_in * (d + n)) // (2 * n)
+
+
+def plan_zap(amount_in, reserve_in, reserve_out, slippage=0):
+    """
+    Rencana swap → add liquidity untuk `amount_in` WETH: berapa yang di-swap,
+    token yang didapat, dan amount kedua sisi LP di rasio reserve sesudah
+    swap. None kalau swap-nya menghasilkan 0 token.
+
+    Sisi token LP paling banyak hasil swap minimum (`amount_out_min` =
+    quote x (1 - slippage), sama dengan amountOutMin swap), jadi add LP
+    tidak revert kalau swap dapat lebih sedikit dari quote; sisi WETH
+    ikut disesuaikan ke rasio yang sama.
+    """
+    swap_in = optimal_swap_amount(amount_in, reserve_in)
+    token_out = get_amount_out(swap_in, reserve_in, reserve_out)
+    if token_out == 0:
+        return None
+    reserve_in, reserve_out = reserve_in + swap_in, reserve_out - token_out
+    amount_out_min = int(token_out * (1 - slippage))
+    weth_for_lp = amount_in - swap_in
+    token_for_lp = quote_liquidity(weth_for_lp, reserve_in, reserve_out)
+    if token_for_lp > amount_out_min:
+        # Slippage / pembulatan: sisi token yang membatasi
+        token_for_lp = amount_out_min
+        weth_for_lp = quote_liquidity(amount_out_min, reserve_out, reserve_in)
+    return {
+        "swap_in": swap_in,
+        "token_out": token_out,
+        "amount_out_min": amount_out_min,
+        "weth_for_lp": weth_for_lp,
+        "token_for_lp": token_for_lp,
+    }
+
+
+class Quoter:
+    """
+    Quote WETH/token dihitung lokal dari reserve pair yang di-cache.
+
+    `refresh()` mengambil getReserves semua pair dalam satu Multicall (bisa
+    digabung ke batch lain), sesudah itu quote tidak memakai RPC sama sekali.
+    Pair diambil dari TokenRegistry; token tanpa pair tidak bisa di-quote
+    lokal (None) sehingga pemanggil kembali ke router.getAmountsOut.
+    """
+
+    def __init__(self, web3, registry, weth_address, multicall=None):
+        self.web3 = web3
+        self.registry = registry
+        self.weth_address = weth_address
+        self.multicall = multicall or Multicall(web3)
+        self.reserves = {}   # token -> (reserve_weth, reserve_token)
+        self.block = None
+        self.updated_at = 0
+
+    def refresh(self, tokens, batch=None):
+        """
+        Tanpa `batch`: langsung eksekusi. Dengan `batch`: call ditambahkan ke
+        batch itu dan fungsi `apply(results)` dikembalikan untuk dipanggil
+        setelah batch dieksekusi.
+        """
+        own_batch = batch is None
+        if own_batch:
+            batch = self.multicall.batch()
+
+        slots = []
+        for token in tokens:
+            pair_address = self.registry.pair(token)
+            if pair_address is None:
+                continue
+            pair = self.web3.eth.contract(address=pair_address, abi=PAIR_ABI)
+            slots.append((token, batch.add(pair.functions.getReserves())))
+        block_slot = batch.add_block_number()
+
+        def apply(results):
+            for token, index in slots:
+                reserves = results[index]
+                if reserves is None:
+                    self.reserves.pop(token, None)
+                    continue
+                reserve0, reserve1 = reserves[0], reserves[1]
+                # token0 UniswapV2 = address yang lebih kecil
+                if self.weth_address.lower() < token.lower():
+                    self.reserves[token] = (reserve0, reserve1)
+                else:
+                    self.reserves[token] = (reserve1, reserve0)
+            if results[block_slot] is not None:
+                self.block = results[block_slot]
+            self.updated_at = time.time()
+
+        if own_batch:
+            apply(batch.execute())
+            return None
+        return apply
+
+    def refresh_if_stale(self, tokens, max_age=1.0):
+        if time.time() - self.updated_at >= max_age:
+            self.refresh(tokens)
+
+    def _reserves_for(self, path):
+        if len(path) != 2:
+            return None
+        token_in, token_out = path
+        if token_in == self.weth_address and token_out in self.reserves:
+            return self.reserves[token_out]
+        if token_out == self.weth_address and token_in in self.reserves:
+            reserve_weth, reserve_token = self.reserves[token_in]
+            return reserve_token, reserve_weth
+        return None
+
+    def get_amounts_out(self, amount_in, path):
+        """Format sama dengan router.getAmountsOut; None kalau reserve belum ada."""
+        reserves = self._reserves_for(path)
+        if reserves is None:
+            return None
+        amount_out = get_amount_out(amount_in, *reserves)
+        if amount_out == 0:
+            return None
+        return [amount_in, amount_out]
+
+    def get_amounts_in(self, amount_out, path):
+        reserves = self._reserves_for(path)
+        if reserves is None:
+            return None
+        amount_in = get_amount_in(amount_out, *reserves)
+        if amount_in is None:
+            return None
+        return [amount_in, amount_out]
+
+    def plan_zap(self, amount_in, token, slippage=0):
+        """plan_zap dari reserve cache; None kalau pair belum di-cache."""
+        if token not in self.reserves:
+            return None
+        return plan_zap(amount_in, *self.reserves[token], slippage)
+
+    def quote_all(self, amount_in):
+        """Quote WETH → token untuk semua pair yang di-cache sekaligus."""
+        return {
+            token: get_amount_out(amount_in, reserve_weth, reserve_token)
+            for token, (reserve_weth, reserve_token) in self.reserves.items()
+        }
+
+    def rank(self, amount_in):
+        """
+        Urutkan token dari price impact terkecil untuk swap `amount_in` WETH.
+        Skor = hasil swap / hasil di harga spot (1.0 = tanpa impact, di luar fee).
+        """
+        scores = []
+        for token, amount_out in self.quote_all(amount_in).items():
+            reserve_weth, reserve_token = self.reserves[token]
+            if amount_out == 0 or reserve_weth == 0:
+                continue
+            scores.append((amount_out * reserve_weth / (amount_in * reserve_token), token))
+        scores.sort(reverse=True)
+        return [token for _, token in scores]
@@ -0,0 +1,194 @@
+import os
+import time
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from scripts.metrics import METRICS, rpc_error_kind
+
+# REALTIME_TX=auto (default): cek dulu apakah RPC mendukung kirim tx + receipt
+# dalam satu call; 1 = paksa pakai, 0 = selalu send_raw_transaction biasa.
+REALTIME_TX = os.getenv("REALTIME_TX", "auto").lower()
+
+# Urutan dicoba saat probe: nama standar (EIP-7966) lalu nama lama MegaETH
+REALTIME_METHODS = ["eth_sendRawTransactionSync", "realtime_sendRawTransaction"]
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+# Error yang pasti berarti node menolak tx (tidak masuk mempool) → nonce boleh dipakai ulang.
+# Error lain (timeout, dll.) → tx mungkin sudah di mempool, dianggap terkirim.
+REJECTED_ERRORS = [
+    "nonce too low", "nonce too high", "insufficient funds", "underpriced",
+    "intrinsic gas", "exceeds block gas limit", "invalid sender", "invalid signature",
+]
+
+RECEIPT_INT_FIELDS = [
+    "blockNumber", "cumulativeGasUsed", "effectiveGasPrice", "gasUsed",
+    "status", "transactionIndex", "type",
+]
+
+
+def format_receipt(raw):
+    """Receipt JSON-RPC mentah → AttributeDict seperti hasil get_transaction_receipt."""
+    receipt = dict(raw)
+    for field in RECEIPT_INT_FIELDS:
+        if isinstance(receipt.get(field), str):
+            receipt[field] = int(receipt[field], 16)
+    for field in ["transactionHash", "blockHash"]:
+        if receipt.get(field):
+            receipt[field] = HexBytes(receipt[field])
+    return AttributeDict(receipt)
+
+
+def is_unsupported(response):
+    error = response.get("error")
+    if not error:
+        return False
+    message = str(error.get("message", "")).lower()
+    return error.get("code") == METHOD_NOT_FOUND or "not found" in message or "not supported" in message
+
+
+def is_rejected(error):
+    message = str(error.get("message", "")).lower()
+    return error.get("code") == INVALID_PARAMS or any(text in message for text in REJECTED_ERRORS)
+
+
+def make_request(web3, method, params):
+    """
+    `provider.make_request` langsung (response error perlu dibaca mentah,
+    bukan di-raise), tapi tetap dicatat ke METRICS seperti MetricsMiddleware.
+    """
+    started = time.perf_counter()
+    try:
+        response = web3.provider.make_request(method, params)
+    except Exception as e:
+        METRICS.rpc_call(method, time.perf_counter() - started, type(e).__name__)
+        raise
+    METRICS.rpc_call(method, time.perf_counter() - started, rpc_error_kind(response))
+    return response
+
+
+async def async_make_request(w3, method, params):
+    started = time.perf_counter()
+    try:
+        response = await w3.provider.make_request(method, params)
+    except Exception as e:
+        METRICS.rpc_call(method, time.perf_counter() - started, type(e).__name__)
+        raise
+    METRICS.rpc_call(method, time.perf_counter() - started, rpc_error_kind(response))
+    return response
+
+
+def pick_method(responses):
+    """`responses`: [(method, response | None)] dari probe; method pertama yang dikenal RPC."""
+    for method, response in responses:
+        if response is not None and not is_unsupported(response):
+            return method
+    return None
+
+
+class RealtimeSender:
+    """
+    Kirim raw tx lewat method realtime (receipt langsung di response) kalau
+    RPC mendukung, selain itu `send_raw_transaction` biasa.
+
+    Receipt yang didapat langsung diserahkan ke ReceiptTracker sehingga
+    `nonces.wait()` selesai tanpa polling. Hanya penolakan eksplisit yang
+    di-raise (nonce dikembalikan); timeout / error lain dianggap terkirim dan
+    receipt-nya dipantau seperti tx biasa (hilang dari mempool = drop).
+    """
+
+    def __init__(self, web3, receipts, mode=REALTIME_TX):
+        self.web3 = web3
+        self.receipts = receipts
+        self.method = None
+        if mode == "1":
+            self.method = REALTIME_METHODS[0]
+        elif mode == "auto":
+            self.method = self.probe()
+        if self.method:
+            print(f"⚡ Realtime tx aktif ({self.method})")
+
+    def probe(self):
+        # Raw tx kosong: RPC yang mendukung method ini menolak parameternya,
+        # yang tidak mendukung menjawab "method not found"
+        responses = []
+        for method in REALTIME_METHODS:
+            try:
+                responses.append((method, make_request(self.web3, method, ["0x"])))
+            except Exception:
+                responses.append((method, None))
+        return pick_method(responses)
+
+    def send_raw(self, raw_tx):
+        if self.method is None:
+            return self.web3.eth.send_raw_transaction(raw_tx)
+
+        tx_hash = Web3.keccak(raw_tx)
+        try:
+            response = make_request(self.web3, self.method, [Web3.to_hex(raw_tx)])
+        except Exception as e:
+            # Request putus / timeout: tx bisa saja sudah diterima node → receipt dipantau ReceiptTracker
+            print(f"⚠️ {self.method}: {e}; tx dianggap terkirim, receipt dipantau")
+            return tx_hash
+        if is_unsupported(response):
+            print(f"⚠️ {self.method} tidak didukung, kembali ke send_raw_transaction")
+            self.method = None
+            return self.web3.eth.send_raw_transaction(raw_tx)
+        error = response.get("error")
+        if error:
+            if is_rejected(error):
+                raise ValueError(error)
+            print(f"⚠️ {self.method}: {error.get('message')}; tx dianggap terkirim, receipt dipantau")
+            return tx_hash
+
+        self.receipts.add_receipt(tx_hash, format_receipt(response["result"]))
+        return tx_hash
+
+
+class AsyncRealtimeSender:
+    """RealtimeSender untuk AsyncWeb3; probe dijalankan sekali saat `send_raw` pertama."""
+
+    def __init__(self, w3, receipts, mode=REALTIME_TX):
+        self.w3 = w3
+        self.receipts = receipts
+        self.mode = mode
+        self.method = REALTIME_METHODS[0] if mode == "1" else None
+        self.probed = mode != "auto"
+
+    async def probe(self):
+        responses = []
+        for method in REALTIME_METHODS:
+            try:
+                responses.append((method, await async_make_request(self.w3, method, ["0x"])))
+            except Exception:
+                responses.append((method, None))
+        self.method = pick_method(responses)
+        self.probed = True
+        if self.method:
+            print(f"⚡ Realtime tx aktif ({self.method})")
+
+    async def send_raw(self, raw_tx):
+        if not self.probed:
+            await self.probe()
+        if self.method is None:
+            return await self.w3.eth.send_raw_transaction(raw_tx)
+
+        tx_hash = Web3.keccak(raw_tx)
+        try:
+            response = await async_make_request(self.w3, self.method, [Web3.to_hex(raw_tx)])
+        except Exception as e:
+            # Request putus / timeout: tx bisa saja sudah diterima node → receipt dipantau ReceiptTracker
+            print(f"⚠️ {self.method}: {e}; tx dianggap terkirim, receipt dipantau")
+            return tx_hash
+        if is_unsupported(response):
+            print(f"⚠️ {self.method} tidak didukung, kembali ke send_raw_transaction")
+            self.method = None
+            return await self.w3.eth.send_raw_transaction(raw_tx)
+        error = response.get("error")
+        if error:
+            if is_rejected(error):
+                raise ValueError(error)
+            print(f"⚠️ {self.method}: {error.get('message')}; tx dianggap terkirim, receipt dipantau")
+            return tx_hash
+
+        self.receipts.add_receipt(tx_hash, format_receipt(response["result"]))
+        return tx_hash
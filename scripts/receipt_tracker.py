@@ -0,0 +1,295 @@
+import os
+import time
+import asyncio
+from concurrent.futures import Future
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from scripts.rpc import warn_no_batch
+
+try:
+    from web3.exceptions import Web3TypeError
+except ImportError:  # web3 v6: belum ada batch_requests
+    Web3TypeError = TypeError
+
+# Batas tunggu receipt (detik) dan interval cek block baru
+RECEIPT_TIMEOUT = float(os.getenv("RECEIPT_TIMEOUT", "120"))
+RECEIPT_POLL_INTERVAL = float(os.getenv("RECEIPT_POLL_INTERVAL", "0.5"))
+# Tx yang belum masuk block setelah sekian detik dicek: masih di mempool atau drop
+RECEIPT_DROP_AFTER = float(os.getenv("RECEIPT_DROP_AFTER", "30"))
+# Lebih dari ini block terlewat → cek receipt langsung, tidak scan block satu per satu
+MAX_SCAN_BLOCKS = 20
+# Receipt yang sudah ada tapi belum di-wait (mis. dari realtime send) disimpan sebanyak ini
+MAX_RESOLVED = 1024
+
+
+class TxDropped(Exception):
+    """Tx sudah tidak ada di mempool dan tidak pernah masuk block."""
+
+
+class PendingTx:
+    def __init__(self, tx_hash, future, timeout):
+        self.tx_hash = tx_hash
+        self.future = future
+        self.sent_at = time.time()
+        self.deadline = self.sent_at + timeout
+        self.checked_at = self.sent_at
+
+
+def not_found(result):
+    """Node menjawab pasti tidak ada (null / TransactionNotFound), bukan error RPC."""
+    return result is None or isinstance(result, TransactionNotFound)
+
+
+def found(result):
+    return result is not None and not isinstance(result, Exception)
+
+
+def normalize_hash(tx_hash):
+    if isinstance(tx_hash, (bytes, bytearray)):
+        return "0x" + bytes(tx_hash).hex()
+    return tx_hash.lower() if tx_hash.startswith("0x") else "0x" + tx_hash.lower()
+
+
+class ReceiptTracker:
+    """
+    Satu pemantau receipt untuk semua tx di proses ini.
+
+    Setiap block baru diambil sekali (hash tx saja), semua tx pending yang ada
+    di block itu di-resolve, lalu receipt-nya diambil dalam satu batch request.
+    Tx yang lama tidak muncul dicek langsung: kalau sudah tidak ada di mempool
+    → TxDropped, lewat batas waktu → TimeExhausted.
+
+    `track()` mengembalikan Future (bisa ditambah callback), `wait()` memblok
+    sampai receipt ada sambil menjalankan polling.
+    """
+
+    def __init__(self, web3, timeout=RECEIPT_TIMEOUT, poll_interval=RECEIPT_POLL_INTERVAL,
+                 drop_after=RECEIPT_DROP_AFTER):
+        self.web3 = web3
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.drop_after = drop_after
+        self.pending = {}        # tx_hash -> PendingTx
+        self.resolved = {}       # tx_hash -> Future yang sudah selesai (terbatas MAX_RESOLVED)
+        self.last_block = None   # block terakhir yang sudah di-scan
+
+    # ---------- API ----------
+    def new_future(self):
+        return Future()
+
+    def finish(self, key, receipt=None, error=None):
+        """Selesaikan future tx ini; hasilnya tetap bisa di-track/wait sesudahnya."""
+        entry = self.pending.pop(key, None)
+        future = entry.future if entry else self.new_future()
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(receipt)
+        self.resolved[key] = future
+        while len(self.resolved) > MAX_RESOLVED:
+            self.resolved.pop(next(iter(self.resolved)))
+
+    def add_receipt(self, tx_hash, receipt):
+        """Receipt yang sudah didapat di luar polling (realtime send)."""
+        self.finish(normalize_hash(tx_hash), receipt)
+
+    def track(self, tx_hash, callback=None, timeout=None):
+        key = normalize_hash(tx_hash)
+        if key in self.resolved:
+            future = self.resolved[key]
+            if callback is not None:
+                future.add_done_callback(callback)
+            return future
+        entry = self.pending.get(key)
+        if entry is None:
+            entry = PendingTx(key, self.new_future(), timeout or self.timeout)
+            self.pending[key] = entry
+        if callback is not None:
+            entry.future.add_done_callback(callback)
+        return entry.future
+
+    def wait(self, tx_hash, timeout=None):
+        future = self.track(tx_hash, timeout=timeout)
+        while not future.done():
+            self.poll()
+            if not future.done():
+                time.sleep(self.poll_interval)
+        return future.result()
+
+    # ---------- polling ----------
+    def batch(self, calls):
+        """Jalankan beberapa request RPC sekaligus; request yang error → exception-nya (tidak di-raise)."""
+        if hasattr(self.web3, "batch_requests"):
+            try:
+                with self.web3.batch_requests() as batch:
+                    for call in calls:
+                        batch.add(call(self.web3.eth))
+                    return list(batch.execute())
+            except Web3TypeError as e:
+                warn_no_batch(self.web3.provider, e)
+            except Exception:
+                pass  # satu request error → ulang satu per satu
+        results = []
+        for call in calls:
+            try:
+                results.append(call(self.web3.eth))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def poll(self):
+        if not self.pending:
+            return
+        block_number = self.web3.eth.block_number
+        if self.last_block is None:
+            self.last_block = block_number - 1
+
+        mined = set()
+        if block_number > self.last_block:
+            if block_number - self.last_block <= MAX_SCAN_BLOCKS:
+                numbers = range(self.last_block + 1, block_number + 1)
+                blocks = self.batch([lambda eth, n=n: eth.get_block(n) for n in numbers])
+                for block in blocks:
+                    if not found(block):
+                        continue
+                    mined.update(normalize_hash(h) for h in block["transactions"])
+                mined &= self.pending.keys()
+            else:
+                mined = set(self.pending)
+            self.last_block = block_number
+
+        now = time.time()
+        # Yang lama tidak terlihat di block ikut dicek receipt-nya langsung
+        stale = {h for h, entry in self.pending.items() if now - entry.checked_at >= self.drop_after}
+        self.resolve(mined | stale, stale, now)
+
+        for key in [h for h, entry in self.pending.items() if now >= entry.deadline]:
+            self.finish(key, error=TimeExhausted(f"Receipt {key} tidak muncul dalam {self.timeout}s"))
+
+    def resolve(self, hashes, stale, now):
+        hashes = list(hashes)
+        if not hashes:
+            return
+        receipts = self.batch([lambda eth, h=h: eth.get_transaction_receipt(h) for h in hashes])
+        missing = []
+        for key, receipt in zip(hashes, receipts):
+            if found(receipt):
+                self.finish(key, receipt)
+            elif key in stale and not_found(receipt):
+                missing.append(key)
+
+        if not missing:
+            return
+        txs = self.batch([lambda eth, h=h: eth.get_transaction(h) for h in missing])
+        for key, tx in zip(missing, txs):
+            if not_found(tx):
+                self.finish(key, error=TxDropped(f"Tx {key} hilang dari mempool"))
+            elif found(tx) and key in self.pending:
+                self.pending[key].checked_at = now
+            # Error RPC (timeout, 5xx, rate limit): belum pasti drop, dicek lagi poll berikutnya
+
+
+class AsyncReceiptTracker:
+    """
+    Versi asyncio dari ReceiptTracker untuk async_engine / wallet_pool.
+
+    Satu task background memantau block baru untuk semua wallet yang memakai
+    tracker ini; task berhenti sendiri saat tidak ada tx pending.
+    """
+
+    def __init__(self, w3, timeout=RECEIPT_TIMEOUT, poll_interval=RECEIPT_POLL_INTERVAL,
+                 drop_after=RECEIPT_DROP_AFTER):
+        self.w3 = w3
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.drop_after = drop_after
+        self.pending = {}
+        self.resolved = {}
+        self.last_block = None
+        self._task = None
+
+    def new_future(self):
+        return asyncio.get_running_loop().create_future()
+
+    finish = ReceiptTracker.finish
+    add_receipt = ReceiptTracker.add_receipt
+
+    def track(self, tx_hash, callback=None, timeout=None):
+        key = normalize_hash(tx_hash)
+        if key in self.resolved:
+            future = self.resolved[key]
+            if callback is not None:
+                future.add_done_callback(callback)
+            return future
+        entry = self.pending.get(key)
+        if entry is None:
+            entry = PendingTx(key, self.new_future(), timeout or self.timeout)
+            self.pending[key] = entry
+        if callback is not None:
+            entry.future.add_done_callback(callback)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return entry.future
+
+    async def wait(self, tx_hash, timeout=None):
+        # shield: wait() yang dibatalkan tidak membatalkan future milik pemanggil lain
+        return await asyncio.shield(self.track(tx_hash, timeout=timeout))
+
+    async def run(self):
+        while self.pending:
+            try:
+                await self.poll()
+            except Exception as e:
+                print(f"⚠️ Receipt tracker: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def gather(self, calls):
+        return await asyncio.gather(*(call(self.w3.eth) for call in calls), return_exceptions=True)
+
+    async def poll(self):
+        block_number = await self.w3.eth.block_number
+        if self.last_block is None:
+            self.last_block = block_number - 1
+
+        mined = set()
+        if block_number > self.last_block:
+            if block_number - self.last_block <= MAX_SCAN_BLOCKS:
+                numbers = range(self.last_block + 1, block_number + 1)
+                blocks = await self.gather([lambda eth, n=n: eth.get_block(n) for n in numbers])
+                for block in blocks:
+                    if not found(block):
+                        continue
+                    mined.update(normalize_hash(h) for h in block["transactions"])
+                mined &= self.pending.keys()
+            else:
+                mined = set(self.pending)
+            self.last_block = block_number
+
+        now = time.time()
+        stale = {h for h, entry in self.pending.items() if now - entry.checked_at >= self.drop_after}
+        await self.resolve(mined | stale, stale, now)
+
+        for key in [h for h, entry in self.pending.items() if now >= entry.deadline]:
+            self.finish(key, error=TimeExhausted(f"Receipt {key} tidak muncul dalam {self.timeout}s"))
+
+    async def resolve(self, hashes, stale, now):
+        hashes = list(hashes)
+        if not hashes:
+            return
+        receipts = await self.gather([lambda eth, h=h: eth.get_transaction_receipt(h) for h in hashes])
+        missing = []
+        for key, receipt in zip(hashes, receipts):
+            if found(receipt):
+                self.finish(key, receipt)
+            elif key in stale and not_found(receipt):
+                missing.append(key)
+
+        if not missing:
+            return
+        txs = await self.gather([lambda eth, h=h: eth.get_transaction(h) for h in missing])
+        for key, tx in zip(missing, txs):
+            if not_found(tx):
+                self.finish(key, error=TxDropped(f"Tx {key} hilang dari mempool"))
+            elif found(tx) and key in self.pending:
+                self.pending[key].checked_at = now
+            # Error RPC (timeout, 5xx, rate limit): belum pasti drop, dicek lagi poll berikutnya
@@ -0,0 +1,347 @@
+import os
+import time
+import random
+import asyncio
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3, AsyncWeb3
+from web3.providers import JSONBaseProvider
+from web3.providers.async_base import AsyncJSONBaseProvider
+
+# RPC_URLS=url1,url2,... (opsional): endpoint tambahan selain RPC_URL
+RPC_URLS = os.getenv("RPC_URLS", "")
+# Endpoint khusus kirim tx; default endpoint pertama (RPC_URL)
+RPC_SEND_URL = os.getenv("RPC_SEND_URL")
+# Jumlah koneksi keep-alive per endpoint, samakan dengan jumlah round paralel x wallet
+RPC_POOL_SIZE = int(os.getenv("RPC_POOL_SIZE", "20"))
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", "10"))
+
+# Endpoint error → tidak dipakai selama ini (detik), naik dua kali lipat tiap error beruntun
+COOLDOWN = 2.0
+MAX_COOLDOWN = 60.0
+LATENCY_ALPHA = 0.2      # bobot EWMA latency
+EXPLORE_RATE = 0.05      # sesekali pakai endpoint lain supaya latency-nya tetap terukur
+
+# Method yang harus ke node yang sama: tx yang dikirim, nonce pending-nya, dan
+# cek tx / receipt (node read bisa belum menerima tx → dikira hilang dari mempool)
+SEND_METHODS = {
+    "eth_sendRawTransaction",
+    "eth_sendRawTransactionSync",
+    "realtime_sendRawTransaction",
+    "eth_getTransactionCount",
+    "eth_getTransactionByHash",
+    "eth_getTransactionReceipt",
+}
+# Jumlah retry per method (ke endpoint lain); kirim tx tidak di-retry supaya tidak dobel
+RETRIES = {
+    "eth_sendRawTransaction": 0,
+    "eth_sendRawTransactionSync": 0,
+    "realtime_sendRawTransaction": 0,
+}
+DEFAULT_RETRIES = 2
+BACKOFF = 0.1
+
+# Error JSON-RPC yang berarti endpoint-nya bermasalah (rate limit dsb), bukan request-nya
+RATE_LIMIT_CODES = {-32005, -32029, 429}
+# Provider yang batch-nya sudah pernah ditolak (peringatan cukup sekali)
+NO_BATCH_WARNED = set()
+
+
+def rpc_urls(primary):
+    urls = [primary] + [url.strip() for url in RPC_URLS.split(",")]
+    return list(dict.fromkeys(url for url in urls if url))
+
+
+def warn_no_batch(provider, error):
+    """Batch ditolak web3 (provider bukan JSON) → sekali peringatan, bukan diam-diam satu per satu."""
+    name = type(provider).__name__
+    if name not in NO_BATCH_WARNED:
+        NO_BATCH_WARNED.add(name)
+        print(f"⚠️ Batch JSON-RPC tidak jalan di {name} ({error}); request dikirim satu per satu")
+
+
+def is_endpoint_error(response):
+    error = response.get("error") if isinstance(response, dict) else None
+    if not error:
+        return False
+    message = str(error.get("message", "")).lower()
+    return error.get("code") in RATE_LIMIT_CODES or "rate limit" in message or "too many requests" in message
+
+
+class Endpoint:
+    """Satu node RPC beserta statistik latency dan error-nya."""
+
+    def __init__(self, url, provider):
+        self.url = url
+        self.provider = provider
+        self.latency = None        # EWMA detik
+        self.requests = 0
+        self.batches = 0           # batch JSON-RPC (satu HTTP request untuk banyak call)
+        self.errors = 0
+        self.failures = 0          # error beruntun
+        self.cooldown_until = 0
+
+    def healthy(self, now):
+        return now >= self.cooldown_until
+
+    def score(self):
+        # Endpoint yang belum pernah diukur dicoba lebih dulu
+        return self.latency if self.latency is not None else 0
+
+    def record(self, elapsed):
+        self.requests += 1
+        self.failures = 0
+        self.latency = elapsed if self.latency is None else (
+            LATENCY_ALPHA * elapsed + (1 - LATENCY_ALPHA) * self.latency
+        )
+
+    def fail(self):
+        self.requests += 1
+        self.errors += 1
+        self.failures += 1
+        self.cooldown_until = time.time() + min(COOLDOWN * 2 ** (self.failures - 1), MAX_COOLDOWN)
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "latency_ms": None if self.latency is None else round(self.latency * 1000, 1),
+            "requests": self.requests,
+            "batches": self.batches,
+            "error_rate": round(self.errors / self.requests, 3) if self.requests else 0,
+            "healthy": self.healthy(time.time()),
+        }
+
+
+class Router:
+    """Pilih endpoint: read ke yang tercepat & sehat, send tetap di satu node."""
+
+    def __init__(self, endpoints, send_url=RPC_SEND_URL):
+        self.endpoints = endpoints
+        self.send = next((e for e in endpoints if e.url == send_url), endpoints[0])
+
+    def for_read(self, exclude=()):
+        now = time.time()
+        candidates = [e for e in self.endpoints if e not in exclude and e.healthy(now)]
+        if not candidates:
+            # Semua cooldown → pakai yang cooldown-nya paling cepat habis
+            candidates = sorted(
+                (e for e in self.endpoints if e not in exclude), key=lambda e: e.cooldown_until
+            )[:1]
+        if not candidates:
+            return None
+        if len(candidates) > 1 and random.random() < EXPLORE_RATE:
+            return random.choice(candidates)
+        return min(candidates, key=Endpoint.score)
+
+    def for_send(self, exclude=()):
+        if self.send not in exclude and self.send.healthy(time.time()):
+            return self.send
+        # Node send bermasalah → pindah pin ke node sehat tercepat
+        endpoint = self.for_read(exclude)
+        if endpoint is not None and endpoint is not self.send:
+            print(f"⚠️ RPC send dipindah ke {endpoint.url}")
+            self.send = endpoint
+        return endpoint
+
+    def exclude(self, tried):
+        # Semua endpoint sudah dicoba (mis. cuma satu endpoint) → boleh ulang ke mana saja
+        return tried if len(tried) < len(self.endpoints) else ()
+
+    def pick(self, method, exclude=()):
+        return self.for_send(exclude) if method in SEND_METHODS else self.for_read(exclude)
+
+    def pick_batch(self, requests_):
+        # Satu method send di batch → seluruh batch ke node send
+        if any(method in SEND_METHODS for method, _ in requests_):
+            return self.for_send()
+        return self.for_read()
+
+    def stats(self):
+        return [e.stats() for e in self.endpoints]
+
+
+def http_provider(url, session, timeout):
+    kwargs = {"session": session, "request_kwargs": {"timeout": timeout}}
+    try:
+        # Retry bawaan web3 dimatikan, diganti retry per method di bawah
+        return Web3.HTTPProvider(url, exception_retry_configuration=None, **kwargs)
+    except TypeError:
+        return Web3.HTTPProvider(url, **kwargs)  # web3 v6
+
+
+def async_http_provider(url, timeout):
+    kwargs = {"request_kwargs": {"timeout": aiohttp.ClientTimeout(total=timeout)}}
+    try:
+        return AsyncWeb3.AsyncHTTPProvider(url, exception_retry_configuration=None, **kwargs)
+    except TypeError:
+        return AsyncWeb3.AsyncHTTPProvider(url, **kwargs)  # web3 v6
+
+
+def make_async_session(pool_size=RPC_POOL_SIZE, timeout=RPC_TIMEOUT):
+    # Session bawaan web3 memakai force_close (tanpa keep-alive); di sini pool dibatasi RPC_POOL_SIZE
+    return aiohttp.ClientSession(
+        raise_for_status=True,
+        connector=aiohttp.TCPConnector(limit=pool_size),
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+def make_session(pool_size=RPC_POOL_SIZE):
+    session = requests.Session()
+    # max_retries=0: retry diatur di sini per method, bukan di urllib3
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class MultiEndpointProvider(JSONBaseProvider):
+    """
+    Provider web3 di atas beberapa endpoint HTTP.
+
+    Tiap endpoint punya session keep-alive sendiri (pool `RPC_POOL_SIZE`).
+    Read diarahkan ke endpoint sehat dengan latency EWMA terendah, kirim tx,
+    nonce pending dan cek tx / receipt di-pin ke satu node. Error koneksi /
+    rate limit → endpoint di-cooldown dan request diulang ke endpoint lain
+    dengan backoff.
+
+    Turunan JSONBaseProvider: web3 hanya mengizinkan `batch_requests()` di
+    provider JSON, jadi batch benar-benar dikirim sebagai satu request.
+    """
+
+    def __init__(self, urls, pool_size=RPC_POOL_SIZE, timeout=RPC_TIMEOUT):
+        super().__init__()
+        endpoints = [
+            Endpoint(url, http_provider(url, make_session(pool_size), timeout))
+            for url in urls
+        ]
+        self.router = Router(endpoints)
+
+    def make_request(self, method, params):
+        tried = []
+        last_error = None
+        for attempt in range(RETRIES.get(method, DEFAULT_RETRIES) + 1):
+            endpoint = self.router.pick(method, self.router.exclude(tried))
+            if endpoint is None:
+                break
+            if attempt:
+                time.sleep(BACKOFF * 2 ** (attempt - 1))
+            started = time.time()
+            try:
+                response = endpoint.provider.make_request(method, params)
+            except (requests.RequestException, OSError) as e:
+                endpoint.fail()
+                tried.append(endpoint)
+                last_error = e
+                continue
+            if is_endpoint_error(response):
+                endpoint.fail()
+                tried.append(endpoint)
+                last_error = response
+                continue
+            endpoint.record(time.time() - started)
+            return response
+        if isinstance(last_error, dict):
+            return last_error
+        raise last_error or ConnectionError("Tidak ada endpoint RPC yang bisa dipakai")
+
+    def make_batch_request(self, requests_):
+        endpoint = self.router.pick_batch(requests_)
+        started = time.time()
+        try:
+            response = endpoint.provider.make_batch_request(requests_)
+        except (requests.RequestException, OSError):
+            endpoint.fail()
+            raise
+        endpoint.record(time.time() - started)
+        endpoint.batches += 1
+        return response
+
+    def is_connected(self, show_traceback=False):
+        return any(e.provider.is_connected() for e in self.router.endpoints)
+
+    def stats(self):
+        return self.router.stats()
+
+
+class AsyncMultiEndpointProvider(AsyncJSONBaseProvider):
+    """
+    Versi AsyncWeb3 dari MultiEndpointProvider: session aiohttp keep-alive
+    per endpoint dengan pool `RPC_POOL_SIZE` dan timeout `RPC_TIMEOUT` yang
+    sama. Session dibuat di event loop yang memakainya (aiohttp terikat loop).
+    """
+
+    def __init__(self, urls, pool_size=RPC_POOL_SIZE, timeout=RPC_TIMEOUT):
+        super().__init__()
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session_loop = None
+        self.session_task = None
+        endpoints = [Endpoint(url, async_http_provider(url, timeout)) for url in urls]
+        self.router = Router(endpoints)
+
+    async def ensure_sessions(self):
+        # Request lain di loop yang sama menunggu task yang sama, supaya tidak
+        # ada yang keburu memakai (dan meng-cache) session bawaan web3
+        loop = asyncio.get_running_loop()
+        if self.session_loop is not loop:
+            self.session_loop = loop
+            self.session_task = loop.create_task(self.cache_sessions())
+        await self.session_task
+
+    async def cache_sessions(self):
+        for endpoint in self.router.endpoints:
+            await endpoint.provider.cache_async_session(make_async_session(self.pool_size, self.timeout))
+
+    async def make_request(self, method, params):
+        await self.ensure_sessions()
+        tried = []
+        last_error = None
+        for attempt in range(RETRIES.get(method, DEFAULT_RETRIES) + 1):
+            endpoint = self.router.pick(method, self.router.exclude(tried))
+            if endpoint is None:
+                break
+            if attempt:
+                await asyncio.sleep(BACKOFF * 2 ** (attempt - 1))
+            started = time.time()
+            try:
+                response = await endpoint.provider.make_request(method, params)
+            except (asyncio.TimeoutError, aiohttp.ClientError, OSError) as e:
+                endpoint.fail()
+                tried.append(endpoint)
+                last_error = e
+                continue
+            if is_endpoint_error(response):
+                endpoint.fail()
+                tried.append(endpoint)
+                last_error = response
+                continue
+            endpoint.record(time.time() - started)
+            return response
+        if isinstance(last_error, dict):
+            return last_error
+        raise last_error or ConnectionError("Tidak ada endpoint RPC yang bisa dipakai")
+
+    async def make_batch_request(self, requests_):
+        await self.ensure_sessions()
+        endpoint = self.router.pick_batch(requests_)
+        started = time.time()
+        try:
+            response = await endpoint.provider.make_batch_request(requests_)
+        except (asyncio.TimeoutError, aiohttp.ClientError, OSError):
+            endpoint.fail()
+            raise
+        endpoint.record(time.time() - started)
+        endpoint.batches += 1
+        return response
+
+    async def is_connected(self, show_traceback=False):
+        await self.ensure_sessions()
+        for endpoint in self.router.endpoints:
+            if await endpoint.provider.is_connected():
+                return True
+        return False
+
+    def stats(self):
+        return self.router.stats()
@@ -0,0 +1,140 @@
+import os
+import time
+import random
+import asyncio
+from scripts.metrics import METRICS
+from scripts import events
+
+# Target round per menit per wallet. Kosong = 8 per round paralel (≈ jeda lama 5-10 detik)
+ROUNDS_PER_MINUTE = os.getenv("ROUNDS_PER_MINUTE")
+DEFAULT_ROUNDS_PER_MINUTE = 8.0
+# Batas total semua wallet dalam satu proses (daemon / wallet pool); 0 = tanpa batas
+GLOBAL_ROUNDS_PER_MINUTE = float(os.getenv("GLOBAL_ROUNDS_PER_MINUTE", "0"))
+# Round yang boleh langsung jalan beruntun setelah idle
+ROUND_BURST = float(os.getenv("ROUND_BURST", "1"))
+# Jitter acak sebagai fraksi interval round (0.5 = tambah 0-50%); 0 = tanpa jitter
+ROUND_JITTER = float(os.getenv("ROUND_JITTER", "0"))
+
+# Backoff per kelas error: (jeda awal, jeda maksimal) detik, dobel tiap error beruntun
+BACKOFF = {
+    "rpc": (1.0, 30.0),        # timeout, koneksi putus, rate limit
+    "nonce": (0.5, 5.0),       # nonce too low / replacement: nonce manager sudah re-sync
+    "balance": (15.0, 120.0),  # saldo kurang
+    "skip": (5.0, 60.0),       # round di-skip (tidak ada pool, quote 0, dsb)
+    "other": (2.0, 60.0),
+}
+
+RPC_ERRORS = ("timeout", "timed out", "connection", "rate limit", "too many requests", "429", "503")
+
+
+def classify(error):
+    """Kelas error untuk backoff (lihat BACKOFF)."""
+    message = str(error).lower()
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return "rpc"
+    if any(key in message for key in RPC_ERRORS):
+        return "rpc"
+    if "nonce" in message or "replacement transaction" in message:
+        return "nonce"
+    if "insufficient funds" in message:
+        return "balance"
+    return "other"
+
+
+def rounds_per_minute(concurrency=1):
+    if ROUNDS_PER_MINUTE:
+        return float(ROUNDS_PER_MINUTE)
+    return DEFAULT_ROUNDS_PER_MINUTE * concurrency
+
+
+class TokenBucket:
+    """
+    Token bucket dengan reservasi: `reserve()` langsung mengambil satu token
+    dan mengembalikan berapa detik harus menunggu (token boleh minus = antre).
+    Tanpa lock, cukup untuk satu thread / satu event loop.
+    """
+
+    def __init__(self, per_minute, burst=ROUND_BURST):
+        self.rate = per_minute / 60
+        self.capacity = max(burst, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, cost=1):
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= cost
+        return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class Scheduler:
+    """
+    Pengatur laju round: round berikutnya jalan begitu bucket wallet (dan
+    bucket global, kalau ada) punya kapasitas, bukan setelah sleep tetap.
+    Error di-backoff sesuai kelasnya, reset setelah round sukses.
+    """
+
+    def __init__(self, per_minute=None, shared=None, jitter=ROUND_JITTER, bucket=None):
+        # `bucket` = bucket wallet yang sudah ada (di-share semua strategi di wallet itu)
+        self.bucket = bucket or TokenBucket(rounds_per_minute() if per_minute is None else per_minute)
+        self.shared = shared
+        self.jitter = jitter
+        self.failures = {}   # kelas -> error beruntun
+
+    def next_delay(self):
+        delay = self.bucket.reserve()
+        if self.shared is not None:
+            delay = max(delay, self.shared.reserve())
+        if self.jitter and self.bucket.rate > 0:
+            delay += random.uniform(0, self.jitter / self.bucket.rate)
+        return delay
+
+    def backoff_delay(self, kind):
+        count = self.failures.get(kind, 0)
+        self.failures[kind] = count + 1
+        METRICS.error(kind)
+        base, cap = BACKOFF[kind]
+        return min(base * 2 ** count, cap)
+
+    def succeeded(self):
+        self.failures.clear()
+
+    def wait(self):
+        delay = self.next_delay()
+        if delay > 0:
+            time.sleep(delay)
+
+    def backoff(self, kind):
+        delay = self.backoff_delay(kind)
+        print(f"⏳ Tunggu {delay:.1f} detik ({kind})...")
+        time.sleep(delay)
+
+    def failed(self, error):
+        kind = classify(error)
+        events.emit("error", kind=kind, message=str(error))
+        delay = self.backoff_delay(kind)
+        print(f"🔁 Retry dalam {delay:.1f} detik ({kind})...\n")
+        time.sleep(delay)
+
+
+class AsyncScheduler(Scheduler):
+    """
+    Scheduler untuk async_engine; satu per strategi (backoff sendiri), dipakai
+    semua worker-nya. Bucket laju-nya satu per wallet, di-share antar strategi.
+    """
+
+    async def wait(self):
+        delay = self.next_delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def backoff(self, kind):
+        await asyncio.sleep(self.backoff_delay(kind))
+
+    async def failed(self, error):
+        kind = classify(error)
+        events.emit("error", kind=kind, message=str(error))
+        await asyncio.sleep(self.backoff_delay(kind))
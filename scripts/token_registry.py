@@ -0,0 +1,137 @@
+import os
+import json
+import time
+from web3 import Web3
+from scripts.multicall import Multicall
+from scripts.json_cache import update_json
+
+CACHE_FILE = os.getenv("TOKEN_CACHE_FILE", ".cache/tokens.json")
+# Field yang gagal dibaca (mis. pair belum dibuat) dicoba lagi setelah sekian detik
+RETRY_FAILED = float(os.getenv("TOKEN_RETRY_FAILED", "300"))
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+TOKEN_META_ABI = [
+    {"name": "symbol", "outputs": [{"type": "string"}], "inputs": [], "stateMutability": "view", "type": "function"},
+    {"name": "decimals", "outputs": [{"type": "uint8"}], "inputs": [], "stateMutability": "view", "type": "function"},
+]
+
+FACTORY_ABI = [{
+    "name": "getPair",
+    "type": "function",
+    "inputs": [
+        { "name": "tokenA", "type": "address" },
+        { "name": "tokenB", "type": "address" }
+    ],
+    "outputs": [
+        { "name": "pair", "type": "address" }
+    ],
+    "stateMutability": "view"
+}]
+
+
+class TokenRegistry:
+    """
+    Metadata token yang tidak pernah berubah: symbol, decimals, dan pair WETH.
+
+    Disimpan di `.cache/tokens.json` per chain id, di-load saat start dan
+    di-warm sekaligus dalam satu batch Multicall. Field yang sudah ada tidak
+    pernah dibaca ulang dari RPC. Pair yang belum ada (address nol) tidak
+    di-cache karena bisa dibuat kapan saja.
+    """
+
+    def __init__(self, web3, chain_id, weth_address, factory_address=None, path=CACHE_FILE):
+        self.web3 = web3
+        self.chain_id = str(chain_id)
+        self.weth_address = Web3.to_checksum_address(weth_address)
+        self.factory_address = Web3.to_checksum_address(factory_address) if factory_address else None
+        self.path = path
+        self.tokens = {}
+        self.failed = {}  # (token, field) -> waktu gagal dibaca; dicoba ulang setelah RETRY_FAILED
+        self.load()
+
+    # ---------- disk ----------
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.tokens = json.load(f).get(self.chain_id, {})
+        except (OSError, ValueError):
+            print(f"⚠️ Cache token {self.path} rusak, diabaikan.")
+            self.tokens = {}
+
+    def save(self):
+        def update(data):
+            # Digabung per token: proses lain (wallet / strategi lain) bisa menulis file yang sama
+            tokens = data.setdefault(self.chain_id, {})
+            for token, entry in self.tokens.items():
+                tokens.setdefault(token, {}).update(entry)
+            self.tokens = tokens
+        update_json(self.path, update)
+
+    # ---------- lookup ----------
+    def get(self, token, field):
+        return self.tokens.get(Web3.to_checksum_address(token), {}).get(field)
+
+    def update(self, token, **fields):
+        entry = self.tokens.setdefault(Web3.to_checksum_address(token), {})
+        entry.update({k: v for k, v in fields.items() if v is not None})
+
+    def missing(self, token):
+        entry = self.tokens.get(token, {})
+        fields = ["symbol", "decimals"]
+        if self.factory_address and token != self.weth_address:
+            fields.append("pair")
+        now = time.time()
+        return [
+            field for field in fields
+            if field not in entry and now - self.failed.get((token, field), 0) >= RETRY_FAILED
+        ]
+
+    def warm(self, tokens):
+        """Lengkapi field yang belum ada untuk semua token dalam satu batch."""
+        tokens = [Web3.to_checksum_address(t) for t in tokens]
+        todo = [(token, self.missing(token)) for token in tokens]
+        todo = [(token, fields) for token, fields in todo if fields]
+        if not todo or self.web3 is None:
+            return
+
+        factory = None
+        if self.factory_address:
+            factory = self.web3.eth.contract(address=self.factory_address, abi=FACTORY_ABI)
+
+        batch = Multicall(self.web3).batch()
+        slots = []
+        for token, fields in todo:
+            contract = self.web3.eth.contract(address=token, abi=TOKEN_META_ABI)
+            for field in fields:
+                if field == "pair":
+                    slots.append((token, field, batch.add(factory.functions.getPair(self.weth_address, token))))
+                else:
+                    slots.append((token, field, batch.add(getattr(contract.functions, field)())))
+        results = batch.execute()
+
+        for token, field, index in slots:
+            value = results[index]
+            if value is None or (field == "pair" and value == ZERO_ADDRESS):
+                self.failed[(token, field)] = time.time()
+                continue
+            self.update(token, **{field: value})
+        self.save()
+
+    def symbol(self, token):
+        if self.get(token, "symbol") is None:
+            self.warm([token])
+        return self.get(token, "symbol") or "UNKNOWN"
+
+    def decimals(self, token):
+        if self.get(token, "decimals") is None:
+            self.warm([token])
+        decimals = self.get(token, "decimals")
+        return 18 if decimals is None else decimals
+
+    def pair(self, token):
+        """Pair WETH/token, None kalau belum ada pool."""
+        if self.get(token, "pair") is None:
+            self.warm([token])
+        return self.get(token, "pair")
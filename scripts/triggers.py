@@ -0,0 +1,443 @@
+"""
+Order limit / stop-loss per token, dipicu dari event Sync pair WETH/token.
+
+Threshold semua order open ada di dua heap per token: "below" (buy_limit,
+stop_loss: terpicu kalau harga <= threshold) dan "above" (take_profit,
+buy_stop: harga >= threshold). Tiap update reserve cukup cek puncak heap,
+jadi yang dievaluasi hanya order yang benar-benar terlewati. Harga dibaca
+dari satu eth_getLogs Sync per block untuk semua pair, bukan getAmountsOut
+per order.
+
+    python -m scripts.triggers add <buy_limit|buy_stop|take_profit|stop_loss> <token> <jumlah> <harga_eth> [slippage]
+    python -m scripts.triggers list
+    python -m scripts.triggers cancel <id>
+    python -m scripts.triggers run
+
+Jumlah order beli dalam ETH, order jual dalam token. Harga = ETH per 1 token.
+"""
+import os
+import sys
+import json
+import math
+import time
+import heapq
+import uuid
+from decimal import Decimal
+from web3 import Web3
+from scripts.quoter import get_amount_out
+from scripts.json_cache import locked, write_json
+
+ORDERS_FILE = os.getenv("ORDERS_FILE", ".cache/orders.json")
+# Detik antar cek block baru
+TRIGGER_POLL = float(os.getenv("TRIGGER_POLL", "1"))
+# Slippage default; order limit juga dibatasi harga limitnya sendiri
+TRIGGER_SLIPPAGE = float(os.getenv("TRIGGER_SLIPPAGE", "0.05"))
+# Order yang gagal kirim / revert dipasang lagi, maksimal sekian kali
+TRIGGER_MAX_ATTEMPTS = int(os.getenv("TRIGGER_MAX_ATTEMPTS", "3"))
+# Maksimal block per eth_getLogs
+MAX_LOG_RANGE = 1000
+
+SYNC_TOPIC = Web3.to_hex(Web3.keccak(text="Sync(uint112,uint112)"))
+
+# Jenis order → (sisi, arah trigger)
+KINDS = {
+    "buy_limit": ("buy", "below"),      # beli saat harga turun ke limit
+    "buy_stop": ("buy", "above"),       # beli saat harga tembus ke atas
+    "take_profit": ("sell", "above"),   # jual saat harga naik ke target
+    "stop_loss": ("sell", "below"),     # jual saat harga turun ke stop
+}
+LIMIT_KINDS = {"buy_limit", "take_profit"}
+
+
+def decode_sync(data):
+    """Data event Sync UniswapV2: reserve0, reserve1."""
+    raw = bytes(data) if not isinstance(data, str) else bytes.fromhex(data[2:])
+    return int.from_bytes(raw[0:32], "big"), int.from_bytes(raw[32:64], "big")
+
+
+def spot_price(reserve_weth, reserve_token):
+    """Harga spot dalam wei WETH per unit terkecil token (threshold order disimpan di satuan ini)."""
+    return reserve_weth / reserve_token if reserve_token else math.inf
+
+
+def amount_out_min(order, amount_out):
+    """
+    Minimum hasil swap order dari quote sekarang. Limit: tidak boleh lebih
+    buruk dari harga limit, None kalau quote (sesudah fee + impact) belum
+    memenuhi. Stop: quote dikurangi slippage.
+    """
+    minimum = int(amount_out * (1 - order["slippage"]))
+    if order["kind"] in LIMIT_KINDS:
+        if KINDS[order["kind"]][0] == "buy":
+            limit_out = math.ceil(order["amount"] / order["threshold"])
+        else:
+            limit_out = math.ceil(order["amount"] * order["threshold"])
+        if amount_out < limit_out:
+            return None
+        minimum = max(minimum, limit_out)
+    return minimum if minimum >= 1 else None
+
+
+class TriggerBook:
+    """
+    Order per chain + wallet di `.cache/orders.json`, plus heap trigger per
+    (token, arah). Cancel tidak menghapus dari heap; entri yang order-nya
+    sudah tidak open dilewati saat di-pop.
+
+    CLI dan runner bisa jalan bersamaan: order baru / cancel dari file
+    digabung ke book saat file berubah dan setiap kali book disimpan.
+    """
+
+    def __init__(self, chain_id, owner, path=ORDERS_FILE):
+        self.key = f"{chain_id}:{Web3.to_checksum_address(owner)}"
+        self.path = path
+        self.orders = {}     # id -> order
+        self.heaps = {}      # (token, "below" | "above") -> [(key, seq, id)]
+        self.seq = 0
+        self.mtime = None
+        self.dirty = False
+        self.reload()
+
+    # ---------- disk ----------
+    def read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠️ File order {self.path} rusak, diabaikan.")
+            return {}
+
+    def merge(self, orders):
+        """Order baru / cancel dari proses lain (CLI) masuk ke book."""
+        for order_id, order in orders.items():
+            own = self.orders.get(order_id)
+            if own is None:
+                self.orders[order_id] = order
+                if order["status"] == "open":
+                    self.push(order)
+            elif order["status"] == "cancelled" and own["status"] == "open":
+                own["status"] = "cancelled"
+
+    def reload(self):
+        """Baca ulang file hanya kalau berubah sejak terakhir dibaca / disimpan."""
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime != self.mtime:
+            self.merge(self.read().get(self.key, {}))
+            self.mtime = mtime
+
+    def save(self):
+        # Baca-gabung-tulis di bawah lock: cancel dari CLI tidak tertimpa runner (dan sebaliknya)
+        with locked(self.path):
+            data = self.read()
+            self.merge(data.get(self.key, {}))
+            data[self.key] = self.orders
+            write_json(self.path, data)
+            self.mtime = os.path.getmtime(self.path)
+        self.dirty = False
+
+    def flush(self):
+        """Simpan sekali per tick runner, bukan per order yang berubah status."""
+        if self.dirty:
+            self.save()
+
+    # ---------- order ----------
+    def push(self, order):
+        direction = KINDS[order["kind"]][1]
+        # heapq = min-heap: arah "below" disimpan negatif supaya threshold tertinggi di puncak
+        key = -order["threshold"] if direction == "below" else order["threshold"]
+        self.seq += 1
+        heapq.heappush(self.heaps.setdefault((order["token"], direction), []), (key, self.seq, order["id"]))
+
+    def add(self, kind, token, amount, price, threshold, slippage=TRIGGER_SLIPPAGE):
+        if kind not in KINDS:
+            raise ValueError(f"❌ Jenis order tidak dikenal: {kind}")
+        order = {
+            "id": uuid.uuid4().hex[:8],
+            "kind": kind,
+            "token": Web3.to_checksum_address(token),
+            "amount": amount,
+            "price": str(price),
+            "threshold": threshold,
+            "slippage": slippage,
+            "status": "open",
+            "attempts": 0,
+            "created_at": time.time(),
+            "tx": None,
+        }
+        self.orders[order["id"]] = order
+        self.push(order)
+        self.save()
+        return order
+
+    def cancel(self, order_id):
+        order = self.orders.get(order_id)
+        if order is None or order["status"] != "open":
+            return False
+        order["status"] = "cancelled"
+        self.save()
+        return True
+
+    def rearm(self, order):
+        order["status"] = "open"
+        self.push(order)
+
+    def open_count(self):
+        return sum(1 for order in self.orders.values() if order["status"] == "open")
+
+    def tokens(self):
+        """Token yang masih punya entri heap (bisa termasuk order yang sudah di-cancel)."""
+        return {token for (token, _), heap in self.heaps.items() if heap}
+
+    def crossed(self, token, low, high):
+        """
+        Order open yang threshold-nya terlewati harga di rentang [low, high]
+        sejak update terakhir; dikeluarkan dari heap.
+        """
+        fired = []
+        heap = self.heaps.get((token, "below"))
+        while heap and -heap[0][0] >= low:
+            order = self.orders.get(heapq.heappop(heap)[2])
+            if order is not None and order["status"] == "open":
+                fired.append(order)
+        heap = self.heaps.get((token, "above"))
+        while heap and heap[0][0] <= high:
+            order = self.orders.get(heapq.heappop(heap)[2])
+            if order is not None and order["status"] == "open":
+                fired.append(order)
+        return fired
+
+
+class TriggerEngine:
+    """
+    Runner order: reserve dari event Sync (ikut memperbarui cache Quoter),
+    order yang terpicu dikirim lewat `buy(token, amount_in, amount_out_min)`
+    / `sell(...)` dan status-nya diselesaikan dari receipt.
+    """
+
+    def __init__(self, web3, book, quoter, receipts, allowances, buy, sell):
+        self.web3 = web3
+        self.book = book
+        self.quoter = quoter
+        self.registry = quoter.registry
+        self.weth_address = quoter.weth_address
+        self.receipts = receipts
+        self.allowances = allowances
+        self.buy = buy
+        self.sell = sell
+        self.pairs = {}          # pair -> token
+        self.watched = set()
+        self.last_block = None
+
+    # ---------- harga ----------
+    def reserves_of(self, token, reserve0, reserve1):
+        # token0 UniswapV2 = address yang lebih kecil
+        if self.weth_address.lower() < token.lower():
+            return reserve0, reserve1
+        return reserve1, reserve0
+
+    def watch(self):
+        """Token order baru: cari pair + seed reserve dalam satu Multicall, lalu evaluasi sekali."""
+        tokens = [token for token in self.book.tokens() if token not in self.watched]
+        if not tokens:
+            return
+        self.quoter.refresh(tokens)
+        if self.last_block is None:
+            self.last_block = self.quoter.block or self.web3.eth.block_number
+        for token in tokens:
+            self.watched.add(token)
+            pair = self.registry.pair(token)
+            if pair is None:
+                print(f"⚠️ {self.registry.symbol(token)} belum punya pair WETH, order-nya tidak dipantau.")
+                continue
+            self.pairs[Web3.to_checksum_address(pair)] = token
+            if token in self.quoter.reserves:
+                price = spot_price(*self.quoter.reserves[token])
+                self.trigger(token, price, price)
+
+    def apply_logs(self, logs):
+        """Sync per pair → rentang harga (min, max) sejak poll terakhir; reserve terakhir ke Quoter."""
+        ranges = {}
+        for log in logs:
+            token = self.pairs.get(Web3.to_checksum_address(log["address"]))
+            if token is None:
+                continue
+            reserves = self.reserves_of(token, *decode_sync(log["data"]))
+            self.quoter.reserves[token] = reserves
+            price = spot_price(*reserves)
+            low, high = ranges.get(token, (price, price))
+            ranges[token] = (min(low, price), max(high, price))
+        for token, (low, high) in ranges.items():
+            self.trigger(token, low, high)
+
+    def poll(self):
+        head = self.web3.eth.block_number
+        if self.last_block is None:
+            self.last_block = head
+        while self.last_block < head:
+            from_block = self.last_block + 1
+            to_block = min(from_block + MAX_LOG_RANGE - 1, head)
+            if self.pairs:
+                self.apply_logs(self.web3.eth.get_logs({
+                    "address": list(self.pairs),
+                    "topics": [SYNC_TOPIC],
+                    "fromBlock": from_block,
+                    "toBlock": to_block,
+                }))
+            self.last_block = to_block
+
+    # ---------- eksekusi ----------
+    def trigger(self, token, low, high):
+        fired = self.book.crossed(token, low, high)
+        for order in fired:
+            self.execute(order)
+        if fired:
+            self.book.dirty = True
+
+    def execute(self, order):
+        token = order["token"]
+        side = KINDS[order["kind"]][0]
+        reserve_weth, reserve_token = self.quoter.reserves[token]
+        if side == "buy":
+            amount_out = get_amount_out(order["amount"], reserve_weth, reserve_token)
+        else:
+            amount_out = get_amount_out(order["amount"], reserve_token, reserve_weth)
+        minimum = amount_out_min(order, amount_out)
+        if minimum is None:
+            # Spot sudah lewat tapi harga eksekusi belum → tunggu update harga berikutnya
+            self.book.rearm(order)
+            return
+
+        symbol = self.registry.symbol(token)
+        print(f"🎯 Order {order['id']} {order['kind']} {symbol} terpicu (harga {order['price']} ETH)")
+        order["status"] = "pending"
+        try:
+            if side == "buy":
+                tx_hash = self.buy(token, order["amount"], minimum)
+            else:
+                tx_hash = self.sell(token, order["amount"], minimum)
+        except Exception as e:
+            print(f"⚠️ Order {order['id']}: {e}")
+            tx_hash = None
+        if tx_hash is None:
+            self.failed(order)
+            return
+        order["tx"] = Web3.to_hex(tx_hash)
+        self.receipts.track(tx_hash, lambda future: self.on_receipt(order, future))
+
+    def on_receipt(self, order, future):
+        ok = not future.cancelled() and future.exception() is None and future.result().status == 1
+        if KINDS[order["kind"]][0] == "sell":
+            if ok:
+                self.allowances.spend(order["token"], order["amount"])
+            else:
+                self.allowances.forget(order["token"])
+        if ok:
+            order["status"] = "filled"
+            order["filled_at"] = time.time()
+            print(f"✅ Order {order['id']} {order['kind']} terisi: {order['tx']}")
+        else:
+            self.failed(order)
+        self.book.dirty = True
+
+    def failed(self, order):
+        order["attempts"] += 1
+        if order["attempts"] >= TRIGGER_MAX_ATTEMPTS:
+            order["status"] = "failed"
+            print(f"❌ Order {order['id']} gagal {order['attempts']}x, dihentikan.")
+            return
+        print(f"⚠️ Order {order['id']} gagal, dipasang lagi ({order['attempts']}/{TRIGGER_MAX_ATTEMPTS}).")
+        self.book.rearm(order)
+
+    def resume(self):
+        """
+        Order yang masih `pending` dari run sebelumnya (runner di-restart):
+        receipt tx-nya dipantau lagi, yang belum sempat punya tx dipasang lagi.
+        """
+        for order in self.book.orders.values():
+            if order["status"] != "pending":
+                continue
+            if order["tx"]:
+                self.receipts.track(order["tx"], lambda future, order=order: self.on_receipt(order, future))
+            else:
+                self.book.rearm(order)
+                self.book.dirty = True
+
+    def run(self):
+        self.resume()
+        print(f"🎯 Trigger engine jalan: {self.book.open_count()} order open")
+        while True:
+            try:
+                self.book.reload()
+                self.watch()
+                self.poll()
+                self.receipts.poll()
+                self.book.flush()
+            except Exception as e:
+                print(f"⚠️ Trigger engine: {e}")
+            time.sleep(TRIGGER_POLL)
+
+
+# ==================== CLI ====================
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if command == "run":
+        from scripts import auto_swap as trader
+        from scripts import events
+        events.bind(wallet=trader.account.address, strategy="triggers")
+        book = TriggerBook(trader.CHAIN_ID, trader.account.address)
+        engine = TriggerEngine(
+            trader.web3, book, trader.quoter, trader.receipts, trader.allowances,
+            buy=lambda token, amount, minimum: trader.swap_weth_to_token(token, amount, True, minimum),
+            sell=trader.swap_token_to_weth,
+        )
+        engine.run()
+        return
+
+    from scripts.rpc import MultiEndpointProvider, rpc_urls
+    from scripts.token_registry import TokenRegistry
+
+    chain_id = int(os.getenv("CHAIN_ID"))
+    weth_address = Web3.to_checksum_address("0x776401b9bc8aae31a685731b7147d4445fd9fb19")
+    web3 = Web3(MultiEndpointProvider(rpc_urls(os.getenv("RPC_URL"))))
+    owner = web3.eth.account.from_key(os.getenv("PRIVATE_KEY")).address
+    registry = TokenRegistry(web3, chain_id, weth_address, os.getenv("FACTORY_ADDRESS"))
+    book = TriggerBook(chain_id, owner)
+
+    if command == "add":
+        kind, token = sys.argv[2], Web3.to_checksum_address(sys.argv[3])
+        if kind not in KINDS:
+            raise ValueError(f"❌ Jenis order tidak dikenal: {kind} ({' / '.join(KINDS)})")
+        decimals = registry.decimals(token)
+        side = KINDS[kind][0]
+        amount = int(Decimal(sys.argv[4]) * 10 ** (18 if side == "buy" else decimals))
+        price = Decimal(sys.argv[5])
+        threshold = float(price * 10 ** 18 / 10 ** decimals)
+        slippage = float(sys.argv[6]) if len(sys.argv) > 6 else TRIGGER_SLIPPAGE
+        order = book.add(kind, token, amount, price, threshold, slippage)
+        print(f"✅ Order {order['id']}: {kind} {sys.argv[4]} {'ETH' if side == 'buy' else registry.symbol(token)} @ {price} ETH")
+    elif command == "list":
+        orders = sorted(book.orders.values(), key=lambda order: order["created_at"])
+        if not orders:
+            print("ℹ️ Belum ada order.")
+        for order in orders:
+            token = order["token"]
+            side = KINDS[order["kind"]][0]
+            amount = Decimal(order["amount"]) / 10 ** (18 if side == "buy" else registry.decimals(token))
+            unit = "ETH" if side == "buy" else registry.symbol(token)
+            print(f"  {order['id']}  {order['kind']:<11} {amount} {unit} @ {order['price']} ETH  {order['status']}")
+    elif command == "cancel":
+        if book.cancel(sys.argv[2]):
+            print(f"🛑 Order {sys.argv[2]} dibatalkan")
+        else:
+            print(f"ℹ️ Order {sys.argv[2]} tidak ada / sudah tidak open")
+    else:
+        raise ValueError(f"❌ Perintah tidak dikenal: {command} (add / list / cancel / run)")
+
+
+if __name__ == "__main__":
+    main()
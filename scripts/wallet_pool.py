@@ -0,0 +1,80 @@
+import os
+import sys
+import asyncio
+from dotenv import load_dotenv
+from web3 import AsyncWeb3, Web3
+from scripts.async_engine import AsyncEngine, RPC_URL, CHAIN_ID, WETH_ADDRESS, FACTORY_ADDRESS
+from scripts.token_registry import TokenRegistry, FACTORY_ABI
+from scripts.token_outs import TOKEN_OUTS
+from scripts.rpc import AsyncMultiEndpointProvider, rpc_urls
+from scripts.receipt_tracker import AsyncReceiptTracker
+from scripts.realtime import AsyncRealtimeSender
+from scripts.gas_policy import AsyncGasPolicy
+from scripts.liquidity_index import AsyncLiquidityIndex
+from scripts.scheduler import TokenBucket, GLOBAL_ROUNDS_PER_MINUTE
+from scripts.metrics import MetricsMiddleware, summary_loop, serve, METRICS_SUMMARY
+
+# ==================== SETUP ====================
+load_dotenv()
+
+KEYS_FILE = os.getenv("PRIVATE_KEYS_FILE", "keys.txt")
+
+def load_private_keys():
+    """
+    Ambil daftar private key dari env PRIVATE_KEYS (dipisah koma) atau dari
+    file PRIVATE_KEYS_FILE (default keys.txt, satu key per baris, # = komentar).
+    """
+    keys = []
+    env_keys = os.getenv("PRIVATE_KEYS")
+    if env_keys:
+        keys = [k.strip() for k in env_keys.split(",")]
+    elif os.path.exists(KEYS_FILE):
+        with open(KEYS_FILE) as f:
+            keys = [line.split("#", 1)[0].strip() for line in f]
+    elif os.getenv("PRIVATE_KEY"):
+        keys = [os.getenv("PRIVATE_KEY")]
+
+    keys = [k for k in keys if k]
+    if not keys:
+        raise EnvironmentError("❌ Tidak ada private key: isi PRIVATE_KEYS atau keys.txt")
+    # Key duplikat akan berebut nonce yang sama
+    return list(dict.fromkeys(keys))
+
+# ==================== POOL ====================
+def build_engines(keys, concurrency=1, w3=None):
+    # Satu provider → satu connection pool HTTP untuk semua wallet
+    w3 = w3 or AsyncWeb3(AsyncMultiEndpointProvider(rpc_urls(RPC_URL)))
+    if "metrics" not in w3.middleware_onion:
+        w3.middleware_onion.add(MetricsMiddleware, "metrics")
+    registry = TokenRegistry(None, CHAIN_ID, WETH_ADDRESS, FACTORY_ADDRESS)
+    # Satu tracker → satu polling block untuk receipt semua wallet
+    receipts = AsyncReceiptTracker(w3)
+    sender = AsyncRealtimeSender(w3, receipts)
+    # Sample gasUsed semua wallet dikumpulkan di satu policy
+    gas = AsyncGasPolicy(w3, receipts, CHAIN_ID)
+    # Satu index → reserve & volume TOKEN_OUTS dibaca sekali untuk semua wallet
+    factory = None
+    if FACTORY_ADDRESS:
+        factory = w3.eth.contract(address=Web3.to_checksum_address(FACTORY_ADDRESS), abi=FACTORY_ABI)
+    index = AsyncLiquidityIndex(w3, registry, WETH_ADDRESS, factory, TOKEN_OUTS)
+    # Batas round/menit gabungan semua wallet (GLOBAL_ROUNDS_PER_MINUTE=0 → tanpa batas)
+    pacing = TokenBucket(GLOBAL_ROUNDS_PER_MINUTE) if GLOBAL_ROUNDS_PER_MINUTE > 0 else None
+    engines = [
+        AsyncEngine(key, concurrency, w3=w3, registry=registry, receipts=receipts, sender=sender, gas=gas, index=index, pacing=pacing)
+        for key in keys
+    ]
+    return engines
+
+async def run_pool(strategy_name, keys, concurrency=1):
+    engines = build_engines(keys, concurrency)
+    print(f"🚀 Wallet pool {strategy_name}: {len(engines)} wallet x{concurrency} round paralel")
+    serve()
+    if METRICS_SUMMARY > 0:
+        asyncio.create_task(summary_loop())
+    await asyncio.gather(*(engine.run(strategy_name) for engine in engines))
+
+
+if __name__ == "__main__":
+    strategy_name = sys.argv[1] if len(sys.argv) > 1 else "swap"
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    asyncio.run(run_pool(strategy_name, load_private_keys(), concurrency))